@@ -15,6 +15,8 @@ from .models import (
     Gifts,
     ReferrerUpdateQueue,
     ReferralPayment,
+    Broadcast,
+    MediaFile,
 )
 
 
@@ -698,9 +700,10 @@ class PrivateChannelAdmin(ModelAdmin):
 # MANDATORYCHANNEL ADMIN
 @admin.register(MandatoryChannel)
 class MandatoryChannelAdmin(ModelAdmin):
-    list_display = ("name", "telegram_id", "is_telegram", "is_private", "is_active")
+    list_display = ("name", "telegram_id", "is_telegram", "is_private", "is_active", "bot_is_admin")
     search_fields = ("name", "telegram_id")
-    list_filter = ("is_telegram", "is_private", "is_active", "created_at")
+    list_filter = ("is_telegram", "is_private", "is_active", "bot_is_admin", "created_at")
+    readonly_fields = ("resolved_chat_id", "resolved_at")
     ordering = ("name",)
 
 
@@ -764,7 +767,7 @@ class TelegramUserAdmin(ModelAdmin):
             "Tasdiqlash",
             {"fields": ("is_confirmed", "confirmed_by", "confirmation_date")},
         ),
-        ("Huquqlar", {"fields": ("is_admin", "is_blocked", "is_looser", "deadline_for_activation", "is_active")}),
+        ("Huquqlar", {"fields": ("is_admin", "is_blocked", "blocked_at", "is_looser", "deadline_for_activation", "is_active")}),
         ("Faoliyat", {"fields": ("registration_date",), "classes": ("collapse",)}),
     )
 
@@ -772,6 +775,7 @@ class TelegramUserAdmin(ModelAdmin):
         "registration_date",
         "referral_count",
         "age",
+        "blocked_at",
     )
 
 
@@ -848,9 +852,16 @@ class LooserUserAdmin(ModelAdmin):
 
 @admin.register(Notification)
 class NotificationAdmin(ModelAdmin):
-    list_display = ("title", "recipient", "notification_type", "is_read", "created_at")
+    list_display = (
+        "title",
+        "recipient",
+        "notification_type",
+        "is_read",
+        "created_at",
+        "delivered_at",
+    )
     search_fields = ("title", "message", "recipient__full_name")
-    list_filter = ("is_read", "notification_type", "created_at")
+    list_filter = ("is_read", "notification_type", "created_at", "delivered_at", "failed_at")
     ordering = ("-created_at",)
 
     fieldsets = (
@@ -868,10 +879,29 @@ class NotificationAdmin(ModelAdmin):
         ),
         ("Holat", {"fields": ("is_read", "read_at")}),
         ("Vaqt", {"fields": ("created_at",)}),
-        ("Qo'shimcha", {"fields": ("extra_data",), "classes": ("collapse",)}),
+        (
+            "Yetkazish",
+            {
+                "fields": (
+                    "delivered_at",
+                    "failed_at",
+                    "attempts",
+                    "next_attempt_at",
+                    "last_error",
+                )
+            },
+        ),
+        ("Qo'shimcha", {"fields": ("extra_data", "payload"), "classes": ("collapse",)}),
     )
 
-    readonly_fields = ("created_at", "read_at")
+    readonly_fields = (
+        "created_at",
+        "read_at",
+        "delivered_at",
+        "failed_at",
+        "attempts",
+        "last_error",
+    )
 
 
 @admin.register(Gifts)
@@ -911,6 +941,25 @@ class ReferrerUpdateQueueAdmin(ModelAdmin):
     )
 
 
+@admin.register(Broadcast)
+class BroadcastAdmin(ModelAdmin):
+    list_display = ("id", "created_by", "status", "total", "sent_count", "failed_count", "created_at", "finished_at")
+    list_filter = ("status", "created_at")
+    readonly_fields = (
+        "created_by", "from_chat_id", "message_id", "total", "sent_count", "failed_count",
+        "lease_token", "heartbeat_at", "created_at", "started_at", "finished_at",
+    )
+    ordering = ("-created_at",)
+
+
+@admin.register(MediaFile)
+class MediaFileAdmin(ModelAdmin):
+    list_display = ("path", "file_type", "content_hash", "created_at")
+    list_filter = ("file_type",)
+    search_fields = ("path",)
+    readonly_fields = ("path", "content_hash", "file_type", "file_id", "created_at")
+
+
 # Admin panelni sozlash
 admin.site.site_header = "Konkurs Bot Boshqaruvi"
 admin.site.site_title = "Konkurs Bot Admin"
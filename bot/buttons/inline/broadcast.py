@@ -0,0 +1,14 @@
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+
+def get_broadcast_keyboard(broadcast_id: int, paused: bool) -> InlineKeyboardMarkup:
+    """Reklama holati xabari uchun: to'xtatish/davom ettirish va bekor qilish"""
+    toggle = (
+        InlineKeyboardButton(text="▶️ Davom ettirish", callback_data=f"broadcast_resume_{broadcast_id}")
+        if paused
+        else InlineKeyboardButton(text="⏸ To'xtatish", callback_data=f"broadcast_pause_{broadcast_id}")
+    )
+    return InlineKeyboardMarkup(inline_keyboard=[[
+        toggle,
+        InlineKeyboardButton(text="❌ Bekor qilish", callback_data=f"broadcast_cancel_{broadcast_id}"),
+    ]])
@@ -14,6 +14,7 @@ from .project_about import router as project_about_router
 from .help import router as help_router
 from .gifts import router as gifts_router
 from .send_ad import router as send_ad_router
+from .chat_member import router as chat_member_router
 
 
 router = Router()
@@ -34,6 +35,7 @@ router.include_router(project_about_router)
 router.include_router(help_router)
 router.include_router(gifts_router)
 router.include_router(send_ad_router)
+router.include_router(chat_member_router)
 
 
 
@@ -12,7 +12,7 @@ from bot.selectors import (
     handle_user_level_advancement_workflow,
     check_and_handle_referrer_level_advancement
 )
-from bot.services.notification import send_message_to_all_admins
+from bot.services.notification import queue_message_to_all_admins
 from bot.constants import Messages
 from bot.states import BuyCourseState
 from aiogram.fsm.state import State, StatesGroup
@@ -137,7 +137,10 @@ async def notify_admin_about_referrer_issue(check_result: dict):
         """
         
        
-        await send_message_to_all_admins(admin_message)
+        # Busy paytda har bir hodisa alohida xabar bo'lmasligi uchun digest'ga jamlanadi
+        await queue_message_to_all_admins(
+            admin_message, "REFERRER_ISSUE", "Referrer darajasi muammolari"
+        )
         print("Admin notification would be sent:")
         print(admin_message)
         
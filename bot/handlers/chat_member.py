@@ -0,0 +1,50 @@
+import logging
+from aiogram import Router, F
+from aiogram.types import ChatMemberUpdated
+
+from bot.services.delivery import amark_users_blocked, aunblock_user
+from bot.services.membership import (
+    ADMIN_STATUSES,
+    NOT_MEMBER_STATUSES,
+    membership_cache,
+    save_chat_membership,
+    set_bot_admin_status,
+)
+
+router = Router()
+
+# Shaxsiy chatlardagi my_chat_member - foydalanuvchi botni bloklagani (bot_blocked_by_user)
+CHANNEL_CHAT_TYPES = {"channel", "supergroup", "group"}
+
+
+@router.my_chat_member(F.chat.type.in_(CHANNEL_CHAT_TYPES))
+async def bot_chat_member_updated(event: ChatMemberUpdated):
+    """Bot kanalda admin qilinganda/olib tashlanganda bot_is_admin'ni yangilash"""
+    is_admin = event.new_chat_member.status in ADMIN_STATUSES
+    updated = await set_bot_admin_status(event.chat.id, event.chat.username, is_admin)
+    if updated:
+        logging.info(
+            f"Bot admin status in chat {event.chat.id} changed to {is_admin} "
+            f"({updated} mandatory channels)"
+        )
+
+
+@router.my_chat_member(F.chat.type == "private")
+async def bot_blocked_by_user(event: ChatMemberUpdated):
+    """Foydalanuvchi botni bloklaganda/blokdan chiqarganda is_blocked'ni yangilash"""
+    if event.new_chat_member.status == "kicked":
+        await amark_users_blocked([event.from_user.id])
+    elif event.new_chat_member.status == "member":
+        await aunblock_user(event.from_user.id)
+
+
+@router.chat_member(F.chat.type.in_(CHANNEL_CHAT_TYPES))
+async def user_chat_member_updated(event: ChatMemberUpdated):
+    """Foydalanuvchi kanalga qo'shildi/chiqdi - indeks va keshni yangilash"""
+    member = event.new_chat_member
+    channel_ids = await save_chat_membership(
+        event.chat.id, event.chat.username, member.user.id, member.status
+    )
+    is_member = member.status not in NOT_MEMBER_STATUSES
+    for channel_id in channel_ids:
+        await membership_cache.set(member.user.id, channel_id, is_member)
@@ -2,12 +2,12 @@ import logging
 from typing import List, Optional
 from aiogram import Router, Bot, F
 from aiogram.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, Message
-from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
 from aiogram.utils.markdown import hbold
 from aiogram.fsm.context import FSMContext
 
 from bot.handlers.registration import verify_and_show_content
 from bot.selectors import (
+    UserContext,
     get_all_channels,
     get_user,
     get_user_level,
@@ -17,72 +17,38 @@ from bot.selectors import (
 )
 from bot.constants import Messages
 from bot.buttons.default.menu import get_menu_keyboard
+from bot.services.membership import membership_checker
 import html
 
 router = Router()
 
 
 async def check_user_subscriptions(bot: Bot, user_id: int, channels: List) -> List:
-    """Check user subscriptions with same logic as middleware"""
-    not_subscribed = []
-    telegram_channels = [ch for ch in channels if ch.is_telegram]
-    for channel in telegram_channels:
-        chat_identifier = None
-
-        if channel.telegram_id:
-            chat_identifier = channel.telegram_id
-            try:
-                member = await bot.get_chat_member(
-                    chat_id=chat_identifier,
-                    user_id=user_id
-                )
-                if member.status in ["left", "kicked"]:
-                    not_subscribed.append(channel)
-                continue
-
-            except (TelegramBadRequest, TelegramForbiddenError) as e:
-                logging.warning(f"Telegram ID {channel.telegram_id} bilan xatolik: {e}. Username bilan urinib ko'ramiz.")
-            except Exception as e:
-                logging.warning(f"Unexpected error with telegram_id: {e}")
-
-        # Fallback to username from link
-        if channel.link and channel.link.startswith("https://t.me/"):
-            username = channel.link.split("/")[-1]
-            chat_identifier = "@" + username
-
-            try:
-                member = await bot.get_chat_member(
-                    chat_id=chat_identifier,
-                    user_id=user_id
-                )
-                if member.status in ["left", "kicked"]:
-                    not_subscribed.append(channel)
-            except (TelegramBadRequest, TelegramForbiddenError):
-                not_subscribed.append(channel)
-            except Exception as e:
-                logging.error(f"Error checking channel {channel.name}: {e}")
-                not_subscribed.append(channel)
-        else:
-            not_subscribed.append(channel)
+    """
+    Check user subscriptions with same logic as middleware.
 
-    return not_subscribed
+    Keshni o'qimaydi (majburiy yangilash), lekin natijani keshga yozadi -
+    shunda middleware ham yangi holatni ko'radi.
+    """
+    result = await membership_checker.check(bot, user_id, channels, use_cache=False)
+    return result.missing
 
 
-async def handle_verified_user(message: Message, user_id: int):
+async def handle_verified_user(message: Message, user_id: int, user_ctx: Optional[UserContext] = None):
     """Handle post-verification flow consistent with middleware"""
     try:
         # Skip check for admins (same as middleware)
         admin_ids = await get_all_admins()
         if user_id in admin_ids:
-            return await show_user_content(message, user_id)
+            return await show_user_content(message, user_id, user_ctx)
 
-        user = await get_user(user_id)
+        user = await get_user(user_id, user_ctx=user_ctx)
         if not user:
             await message.answer("❌ Foydalanuvchi topilmadi!")
             return
 
         # Check purchased courses first
-        if await get_user_buy_course(telegram_id=user_id):
+        if await get_user_buy_course(telegram_id=user_id, user_ctx=user_ctx):
             await message.answer(
                 text=Messages.welcome_message.value.format(full_name=hbold(user.full_name)),
                 reply_markup=get_menu_keyboard(),
@@ -91,37 +57,37 @@ async def handle_verified_user(message: Message, user_id: int):
             return
 
         # Show course based on level
-        await show_level_content(message, user_id)
+        await show_level_content(message, user_id, user_ctx)
 
     except Exception as e:
         logging.error(f"Verified user flow error: {e}")
         await message.answer(Messages.system_error.value)
 
 
-async def show_user_content(message: Message, user_id: int):
+async def show_user_content(message: Message, user_id: int, user_ctx: Optional[UserContext] = None):
     """Show appropriate content for verified user"""
     try:
-        user = await get_user(user_id)
+        user = await get_user(user_id, user_ctx=user_ctx)
         if not user:
             await message.answer("❌ Foydalanuvchi topilmadi!")
             return
 
-        if await get_user_buy_course(telegram_id=user_id):
+        if await get_user_buy_course(telegram_id=user_id, user_ctx=user_ctx):
             await message.answer(
                 text=Messages.welcome_message.value.format(full_name=hbold(user.full_name)),
                 reply_markup=get_menu_keyboard(),
                 parse_mode="HTML"
             )
         else:
-            await show_level_content(message, user_id)
+            await show_level_content(message, user_id, user_ctx)
     except Exception as e:
         logging.error(f"Error showing user content: {e}")
         await message.answer(Messages.system_error.value)
 
 
-async def show_level_content(message: Message, user_id: int):
+async def show_level_content(message: Message, user_id: int, user_ctx: Optional[UserContext] = None):
     """Show content based on user level"""
-    user_level = await get_user_level(telegram_id=user_id)
+    user_level = await get_user_level(telegram_id=user_id, user_ctx=user_ctx)
     course = await get_level_kurs(level=user_level)
     
     if not course:
@@ -197,7 +163,9 @@ async def show_subscription_request(
 
 
 @router.callback_query(F.data == "check_subscription")
-async def handle_subscription_check(callback: CallbackQuery, bot: Bot, state: FSMContext):
+async def handle_subscription_check(
+    callback: CallbackQuery, bot: Bot, state: FSMContext, user_ctx: UserContext = None
+):
     """Handle subscription check with same logic as middleware"""
     user_id = callback.from_user.id
     await callback.answer("⏳ Tekshirilmoqda...", show_alert=False)
@@ -206,7 +174,7 @@ async def handle_subscription_check(callback: CallbackQuery, bot: Bot, state: FS
         channels = await get_all_channels()
         if not channels:
             await callback.answer("✅ Majburiy kanallar mavjud emas")
-            return await handle_verified_user(callback.message, user_id)
+            return await handle_verified_user(callback.message, user_id, user_ctx)
 
         # Separate channel types like middleware
         telegram_channels = [ch for ch in channels if ch.is_telegram]
@@ -221,7 +189,7 @@ async def handle_subscription_check(callback: CallbackQuery, bot: Bot, state: FS
         else:
             await callback.answer("✅ A'zolik tasdiqlandi!")
             await callback.message.delete()
-            await verify_and_show_content(callback.message, user_id)
+            await verify_and_show_content(callback.message, user_id, user_ctx=user_ctx)
 
     except Exception as e:
         logging.error(f"Subscription check error: {e}")
@@ -1,6 +1,7 @@
 from aiogram import Router, F, types
 from bot.selectors import get_gifts_is_active
 from bot.buttons.default.back import get_back_keyboard
+from bot.services.media import media_registry
 
 router = Router()
 
@@ -20,8 +21,11 @@ async def gifts_handler(message: types.Message):
     # Rasm bor bo'lsa rasm + caption jo'natamiz
     if gift.image:
         file_path = gift.image.path  # to‘liq fayl yo‘li
-        await message.answer_photo(
-            photo=types.FSInputFile(file_path),
+        # Birinchi marta yuklanadi, keyin saqlangan file_id bilan yuboriladi
+        await media_registry.send_photo(
+            message.bot,
+            message.chat.id,
+            file_path,
             caption=gifts_text,
             reply_markup=get_back_keyboard(),
             parse_mode="HTML",
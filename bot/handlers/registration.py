@@ -1,12 +1,12 @@
 import logging
+from typing import Optional
 from aiogram import Router, types, F, Bot
 from aiogram.fsm.context import FSMContext
 from aiogram.types import (
     InlineKeyboardMarkup,
     InlineKeyboardButton,
 )
-from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
-from bot.selectors import get_course_by_user_level, get_user_level, get_user_purchased_courses_with_levels
+from bot.selectors import UserContext, get_course_by_user_level, get_user_level, get_user_purchased_courses_with_levels
 from bot.states import UserRegistrationState
 from bot.constants import Messages, REGIONS, PROFESSIONS, Button
 from bot.buttons.inline.age import get_age_button
@@ -19,6 +19,7 @@ from bot.utils.helpers import get_region_code_by_name, get_gender_code_by_name
 from bot.services.user import create_user, get_user_by_referral_code
 from bot.handlers.stages import get_stages_keyboard
 from bot.selectors import get_all_channels
+from bot.services.membership import membership_checker
 
 
 router = Router()
@@ -238,13 +239,18 @@ async def complete_registration(message: types.Message, state: FSMContext, user_
         await message.answer(Messages.system_error.value)
 
 
-async def verify_and_show_content(message: types.Message, user_id: int, referral_message: str = ""):
+async def verify_and_show_content(
+    message: types.Message,
+    user_id: int,
+    referral_message: str = "",
+    user_ctx: Optional[UserContext] = None,
+):
     """Verify subscription and show appropriate content using middleware logic"""
     try:
         # Get all channels
         channels = await get_all_channels()
         if not channels:
-            await show_stages_content(message, user_id, referral_message)
+            await show_stages_content(message, user_id, referral_message, user_ctx)
             return
 
         # Separate telegram and other channels
@@ -264,7 +270,7 @@ async def verify_and_show_content(message: types.Message, user_id: int, referral
             )
         else:
             # Show stages content
-            await show_stages_content(message, user_id, referral_message)
+            await show_stages_content(message, user_id, referral_message, user_ctx)
     except Exception as e:
         logging.error(f"Error in verify_and_show_content: {e}")
         await message.answer(Messages.system_error.value)
@@ -272,35 +278,8 @@ async def verify_and_show_content(message: types.Message, user_id: int, referral
 
 async def check_subscription_status(bot: Bot, user_id: int, channels: list) -> list:
     """Check which channels user is not subscribed to (middleware-style)"""
-    not_subscribed = []
-
-    for channel in channels:
-        try:
-            # Try both telegram_id and link as identifier
-            chat_identifier = None
-            if channel.telegram_id:
-                chat_identifier = channel.telegram_id
-            elif channel.link and channel.link.startswith("https://t.me/"):
-                chat_identifier = f"@{channel.link.split('/')[-1]}"
-
-            if not chat_identifier:
-                logging.warning(f"No valid identifier for channel {channel.name}")
-                not_subscribed.append(channel)
-                continue
-
-            # Check membership status
-            member = await bot.get_chat_member(chat_id=chat_identifier, user_id=user_id)
-            if member.status in ["left", "kicked"]:
-                not_subscribed.append(channel)
-
-        except (TelegramBadRequest, TelegramForbiddenError) as e:
-            logging.warning(f"Subscription check failed for {channel.name}: {e}")
-            not_subscribed.append(channel)
-        except Exception as e:
-            logging.error(f"Unexpected error checking channel {channel.name}: {e}")
-            not_subscribed.append(channel)
-
-    return not_subscribed
+    result = await membership_checker.check(bot, user_id, channels)
+    return result.missing
 
 
 async def show_subscription_request(
@@ -366,9 +345,14 @@ async def show_subscription_request(
         )
 
 
-async def show_stages_content(message: types.Message, user_id: int, referral_message: str = ""):
+async def show_stages_content(
+    message: types.Message,
+    user_id: int,
+    referral_message: str = "",
+    user_ctx: Optional[UserContext] = None,
+):
     """Show stages content after verification"""
-    user_level = await get_user_level(telegram_id=user_id)
+    user_level = await get_user_level(telegram_id=user_id, user_ctx=user_ctx)
     purchased_course_levels = await get_user_purchased_courses_with_levels(user_id)
     course = await get_course_by_user_level(user_level)
     price_formatted = "{:,}".format(course.price)
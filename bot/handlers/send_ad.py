@@ -1,11 +1,22 @@
-import asyncio
 import logging
-from aiogram import Router, types, Bot
-from aiogram.filters import Command
+from aiogram import F, Router, types, Bot
+from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
 
+from bot.buttons.inline.broadcast import get_broadcast_keyboard
 from bot.selectors import get_user
-from bot.models import TelegramUser
+from bot.services.broadcast import (
+    create_broadcast,
+    get_broadcast,
+    set_broadcast_status,
+    set_status_message,
+)
+from bot.services.segments import (
+    DEFAULT_RECIPIENT_FILTERS,
+    count_recipients,
+    describe_recipient_filters,
+    parse_recipient_filters,
+)
 from asgiref.sync import sync_to_async
 
 router = Router()
@@ -13,16 +24,13 @@ router = Router()
 logger = logging.getLogger(__name__)
 
 
-@sync_to_async
-def get_all_users():
-    """Get all active users for advertisement broadcasting"""
-    return list(TelegramUser.objects.filter(is_active=True).values_list('telegram_id', flat=True))
-
-
 @router.message(Command("send_ad"))
-async def send_advertisement_command(message: types.Message, state: FSMContext, bot: Bot):
+async def send_advertisement_command(message: types.Message, state: FSMContext, bot: Bot, command: CommandObject):
     """
-    Handle /send_ad command - allows admin to send advertisements to all users
+    Handle /send_ad command - allows admin to send advertisements to users
+
+    Argumentlar bilan segmentga yuboriladi, masalan:
+    /send_ad region=tashkent level=2 gender=F purchased=no from=2024-01-01
     """
     user_id = str(message.from_user.id)
     
@@ -44,22 +52,30 @@ async def send_advertisement_command(message: types.Message, state: FSMContext,
             "📢 Reklama yuborish uchun:\n\n"
             "1. Yubormoqchi bo'lgan xabarni yozing\n"
             "2. Shu xabarga javob sifatida /send_ad buyrug'ini yuboring\n\n"
-            "⚠️ Barcha foydalanuvchilarga yuboriladi, ehtiyot bo'ling!"
+            "🎯 Segment (ixtiyoriy): region=tashkent level=0..7 gender=M|F "
+            "confirmed=yes|no purchased=yes|no from=YYYY-MM-DD to=YYYY-MM-DD\n\n"
+            "⚠️ Filtrsiz barcha foydalanuvchilarga yuboriladi, ehtiyot bo'ling!"
         )
         return
+
+    try:
+        filters = parse_recipient_filters(command.args)
+    except ValueError as e:
+        await message.reply(f"⚠️ {e}")
+        return
     
-    # Get all users
+    # Qabul qiluvchilar ro'yxati emas, filter saqlanadi - worker ularni chunk'lab o'qiydi
     try:
-        all_users = await get_all_users()
-        if not all_users:
-            await message.reply("⚠️ Hech qanday faol foydalanuvchi topilmadi.")
+        total_users = await count_recipients(filters)
+        if not total_users:
+            await message.reply("⚠️ Segmentga mos faol foydalanuvchi topilmadi.")
             return
         
         # Confirm before sending
         await state.update_data(
             ad_message_id=message.reply_to_message.message_id,
             ad_chat_id=message.reply_to_message.chat.id,
-            target_users=all_users
+            recipient_filters=filters
         )
         
         ad_preview = (
@@ -70,7 +86,8 @@ async def send_advertisement_command(message: types.Message, state: FSMContext,
         
         confirm_text = (
             f"📊 Statistika:\n"
-            f"👥 Jami foydalanuvchilar: {len(all_users)}\n"
+            f"{describe_recipient_filters(filters)}\n"
+            f"👥 Jami foydalanuvchilar: {total_users}\n"
             f"📢 Reklama matn: {ad_preview}...\n\n"
             f"✅ Tasdiqlash uchun: /confirm_ad\n"
             f"❌ Bekor qilish uchun: /cancel_ad"
@@ -86,7 +103,7 @@ async def send_advertisement_command(message: types.Message, state: FSMContext,
 @router.message(Command("confirm_ad"))
 async def confirm_advertisement(message: types.Message, state: FSMContext, bot: Bot):
     """
-    Confirm and send advertisement to all users
+    Confirm advertisement: Broadcast yaratib Celery worker'ga topshirish
     """
     user_id = str(message.from_user.id)
     user = await get_user(user_id)
@@ -106,51 +123,73 @@ async def confirm_advertisement(message: types.Message, state: FSMContext, bot:
     
     ad_message_id = data['ad_message_id']
     ad_chat_id = data['ad_chat_id']
-    target_users = data['target_users']
-    
-    # Start broadcasting
-    status_message = await message.reply("📤 Reklama yuborilmoqda...")
-    
-    success_count = 0
-    failed_count = 0
-    
+    filters = data.get('recipient_filters', DEFAULT_RECIPIENT_FILTERS)
+
     try:
-        for user_telegram_id in target_users:
-            try:
-                # Copy the message without showing sender info (hides sender name)
-                await bot.copy_message(
-                    chat_id=user_telegram_id,
-                    from_chat_id=ad_chat_id,
-                    message_id=ad_message_id,
-                    protect_content=False
-                )
-                success_count += 1
-                
-                if success_count % 30 == 0:
-                    await asyncio.sleep(1)
-                    
-            except Exception as e:
-                failed_count += 1
-                logger.warning(f"Failed to send ad to user {user_telegram_id}: {e}")
-                continue
-        
-        # Update status
-        final_text = (
-            f"✅ Reklama yuborish yakunlandi!\n\n"
-            f"📊 Natijalar:\n"
-            f"✅ Muvaffaqiyatli: {success_count}\n"
-            f"❌ Muvaffaqiyatsiz: {failed_count}\n"
-            f"📈 Umumiy: {len(target_users)}"
-        )
-        
-        await status_message.edit_text(final_text)
-        
-        # Clear state
-        await state.clear()
-        
+        broadcast = await create_broadcast(user, ad_chat_id, ad_message_id, filters)
+    except Exception as e:
+        logger.error(f"Error creating broadcast: {e}")
+        await message.reply("❌ Reklama yuborishda xatolik yuz berdi.")
+        return
+
+    status_message = await message.reply(
+        f"📤 Reklama #{broadcast.pk} navbatga qo'yildi.\n"
+        f"👥 Jami: {broadcast.total}",
+        reply_markup=get_broadcast_keyboard(broadcast.pk, paused=False),
+    )
+    # Worker shu xabarni progress bilan yangilab boradi
+    await set_status_message(broadcast.pk, status_message.chat.id, status_message.message_id)
+
+    # Yuborish Celery worker'da - webhook so'rovi darhol qaytadi, restart'dan keyin davom etadi
+    await enqueue_broadcast(broadcast.pk)
+    await state.clear()
+
+
+@sync_to_async
+def enqueue_broadcast(broadcast_id: int):
+    from bot.tasks import run_broadcast
+
+    run_broadcast.delay(broadcast_id)
+
+
+@router.callback_query(F.data.startswith("broadcast_"))
+async def broadcast_control(callback: types.CallbackQuery):
+    """Reklamani to'xtatish / davom ettirish / bekor qilish"""
+    user = await get_user(str(callback.from_user.id))
+    if not user or not user.is_admin:
+        await callback.answer("❌ Faqat adminlar uchun!", show_alert=True)
+        return
+
+    _, action, broadcast_id = callback.data.split("_")
+    broadcast_id = int(broadcast_id)
+
+    if action == "pause":
+        # RUNNING worker keyingi checkpoint'da to'xtaydi
+        changed = await set_broadcast_status(broadcast_id, "PAUSED", ("PENDING", "RUNNING"))
+        text, keyboard = "⏸ To'xtatildi", get_broadcast_keyboard(broadcast_id, paused=True)
+    elif action == "resume":
+        changed = await set_broadcast_status(broadcast_id, "PENDING", ("PAUSED",))
+        if changed:
+            await enqueue_broadcast(broadcast_id)
+        text, keyboard = "▶️ Davom ettirilmoqda", get_broadcast_keyboard(broadcast_id, paused=False)
+    elif action == "cancel":
+        changed = await set_broadcast_status(broadcast_id, "CANCELLED", ("PENDING", "RUNNING", "PAUSED"))
+        text, keyboard = "❌ Bekor qilindi", None
+    else:
+        await callback.answer()
+        return
+
+    if not changed:
+        broadcast = await get_broadcast(broadcast_id)
+        status = broadcast.get_status_display() if broadcast else "topilmadi"
+        await callback.answer(f"⚠️ Reklama holati: {status}", show_alert=True)
+        return
+
+    await callback.answer(text)
+    try:
+        await callback.message.edit_reply_markup(reply_markup=keyboard)
     except Exception as e:
-        logger.error(f"Error during advertisement broadcasting: {e}")
-        await status_message.edit_text("❌ Reklama yuborishda xatolik yuz berdi.")
+        logger.warning(f"Could not update broadcast keyboard: {e}")
 
 
 @router.message(Command("cancel_ad"))
@@ -7,7 +7,7 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
 from bot.selectors import (
-    fetch_user,
+    UserContext,
     get_user,
     get_user_level,
     get_level_kurs,
@@ -80,12 +80,12 @@ def get_stages_keyboard(
 
 
 @router.message(F.text == "⚡️ Bosqichlar")
-async def show_stages(message: types.Message, state: FSMContext):
+async def show_stages(message: types.Message, state: FSMContext, user_ctx: UserContext = None):
     """Bosqichlar haqida ma'lumot ko'rsatish"""
     user_id = str(message.from_user.id)
 
     # Foydalanuvchini olish
-    user = await get_user(user_id)
+    user = await get_user(user_id, user_ctx=user_ctx)
     if not user:
         await message.answer(
             "❌ Foydalanuvchi topilmadi. Iltimos /start buyrug'ini bosing."
@@ -93,7 +93,7 @@ async def show_stages(message: types.Message, state: FSMContext):
         return
 
     # Foydalanuvchi levelini olish
-    user_level = await get_user_level(user_id)
+    user_level = await get_user_level(user_id, user_ctx=user_ctx)
     if not user_level:
         user_level = "0-bosqich"
 
@@ -124,7 +124,7 @@ Sizning hozirgi darajangiz: <b>{user_level}</b>
 
 
 @router.callback_query(F.data.startswith("stage_"))
-async def handle_stage_callback(callback: types.CallbackQuery, state: FSMContext):
+async def handle_stage_callback(callback: types.CallbackQuery, state: FSMContext, user_ctx: UserContext = None):
     """Bosqich tugmalarini boshqarish"""
     user_id = str(callback.from_user.id)
     action_data = callback.data.split("_")
@@ -137,7 +137,7 @@ async def handle_stage_callback(callback: types.CallbackQuery, state: FSMContext
     level_num = int(action_data[2])
     level_name = f"{level_num}-bosqich"
 
-    user = await fetch_user(user_id)
+    user = await get_user(user_id, user_ctx=user_ctx)
     if not user:
         await callback.answer("❌ Foydalanuvchi topilmadi")
         return
@@ -225,16 +225,16 @@ async def handle_stage_callback(callback: types.CallbackQuery, state: FSMContext
 
 
 @router.callback_query(F.data == "back_to_stages")
-async def back_to_stages(callback: types.CallbackQuery, state: FSMContext):
+async def back_to_stages(callback: types.CallbackQuery, state: FSMContext, user_ctx: UserContext = None):
     """Bosqichlar menyusiga qaytish"""
     user_id = str(callback.from_user.id)
 
-    user = await get_user(user_id)
+    user = await get_user(user_id, user_ctx=user_ctx)
     if not user:
         await callback.answer("❌ Foydalanuvchi topilmadi")
         return
 
-    user_level = await get_user_level(user_id)
+    user_level = await get_user_level(user_id, user_ctx=user_ctx)
     if not user_level:
         user_level = "0-bosqich"
 
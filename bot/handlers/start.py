@@ -5,6 +5,7 @@ from aiogram.filters import CommandStart
 from aiogram.fsm.context import FSMContext
 
 from bot.selectors import (
+    UserContext,
     get_user,
     check_user_referral_code,
     get_user_buy_course,
@@ -19,9 +20,9 @@ router = Router()
 
 
 @router.message(CommandStart())
-async def start_command(message: types.Message, state: FSMContext):
+async def start_command(message: types.Message, state: FSMContext, user_ctx: UserContext = None):
     user_id = message.from_user.id
-    user = await get_user(user_id)
+    user = await get_user(user_id, user_ctx=user_ctx)
 
     # Extract referral code from /start command
     args = message.text.split()
@@ -90,11 +91,11 @@ async def start_command(message: types.Message, state: FSMContext):
         await state.set_state(UserRegistrationState.GET_FULL_NAME)
         return
 
-    user_level = await get_user_level(telegram_id=user_id)
+    user_level = await get_user_level(telegram_id=user_id, user_ctx=user_ctx)
 
     # Agar foydalanuvchi birinchi bosqichda bo'lsa
     if user_level == "1-bosqich":
-        has_course = await get_user_buy_course(user_id)
+        has_course = await get_user_buy_course(user_id, user_ctx=user_ctx)
 
         if has_course:
             # Agar kurs sotib olingan bo'lsa → menyu
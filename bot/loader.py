@@ -0,0 +1,92 @@
+"""
+Bot va Dispatcher'ni birinchi ishlatilganda yaratish.
+
+aiogram va handlerlar grafi import qilinishi qimmat, shuning uchun Celery
+worker/beat va manage.py buyruqlari ular kerak bo'lmasa import qilmaydi.
+Web process ularni ASGI lifespan startup'da oldindan tayyorlaydi.
+"""
+import asyncio
+import weakref
+
+from django.conf import settings
+
+_bot = None
+# aiohttp sessiyasi event loop'ga bog'langan - har bir loop uchun alohida Bot
+_loop_bots = weakref.WeakKeyDictionary()
+_dispatcher = None
+
+
+def _create_bot():
+    from aiogram import Bot
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from bot.middlewares.send_rate import SendRateMiddleware
+    from bot.services.send_scheduler import send_scheduler
+
+    session = AiohttpSession(limit=settings.TELEGRAM_SESSION_POOL_SIZE)
+    # Barcha chiquvchi xabarlar umumiy limitlar bo'yicha navbatga qo'yiladi
+    session.middleware(
+        SendRateMiddleware(
+            send_scheduler, max_retry_after=settings.TELEGRAM_SEND_MAX_RETRY_AFTER
+        )
+    )
+    return Bot(token=settings.TELEGRAM_BOT_TOKEN, session=session)
+
+
+def get_bot():
+    """
+    Joriy event loop uchun Bot (pool'langan aiohttp sessiya bilan).
+
+    Uzoq yashaydigan loop'da (ASGI lifespan, runbot) sessiya update'lar orasida
+    qayta ishlatiladi. Loop'dan tashqarida (Celery vazifasi o'z loop'ini
+    ochishdan oldin) process uchun umumiy Bot qaytadi - uning sessiyasini
+    chaqiruvchi yopadi.
+    """
+    global _bot
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+
+    if loop is None:
+        if _bot is None:
+            _bot = _create_bot()
+        return _bot
+
+    bot = _loop_bots.get(loop)
+    if bot is None:
+        bot = _create_bot()
+        _loop_bots[loop] = bot
+    return bot
+
+
+def get_dispatcher():
+    """Middleware va handlerlar ulangan Dispatcher"""
+    global _dispatcher
+
+    if _dispatcher is None:
+        from aiogram import Dispatcher
+        from bot.handlers import router
+        from bot.middlewares.check_subscribe import ChannelMembershipMiddleware
+        from bot.middlewares.throttling import ThrottlingMiddleware
+        from bot.middlewares.user_context import UserContextMiddleware
+
+        dp = Dispatcher()
+
+        # Flood DB'ga yetib bormasligi uchun throttling eng birinchi
+        throttling = ThrottlingMiddleware(
+            rate=settings.THROTTLE_RATE, burst=settings.THROTTLE_BURST
+        )
+        dp.callback_query.outer_middleware(throttling)
+        dp.message.outer_middleware(throttling)
+
+        # Foydalanuvchi bir marta yuklanadi va data["user_ctx"] orqali uzatiladi
+        dp.callback_query.outer_middleware(UserContextMiddleware())
+        dp.message.outer_middleware(UserContextMiddleware())
+        # Bot har bir update bilan data["bot"] orqali keladi (loop'ga bog'langan)
+        dp.callback_query.middleware(ChannelMembershipMiddleware(skip_admins=True))
+        dp.message.middleware(ChannelMembershipMiddleware(skip_admins=True))
+
+        dp.include_router(router)
+        _dispatcher = dp
+    return _dispatcher
@@ -0,0 +1,91 @@
+import asyncio
+import time
+
+from aiohttp import web
+from aiogram.client.telegram import TelegramAPIServer
+
+# Benchmarklar uchun soxta token (aiogram token formatini tekshiradi)
+STUB_TOKEN = "123456:benchmark-token"
+
+
+class StubTelegramServer:
+    """
+    Minimal local stand-in for api.telegram.org used by the benchmark commands.
+
+    Answers ``getMe`` and ``sendMessage`` with valid payloads after an optional
+    artificial delay and counts requests and distinct TCP connections.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.requests = 0
+        self._transports = set()
+        self._message_id = 0
+        self._runner = None
+        self.port = None
+
+    @property
+    def connections(self) -> int:
+        return len(self._transports)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def api(self) -> TelegramAPIServer:
+        return TelegramAPIServer.from_base(self.base_url)
+
+    def reset(self):
+        self.requests = 0
+        self._transports = set()
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        self._transports.add(id(request.transport))
+
+        if request.content_type == "application/json":
+            payload = await request.json()
+        else:
+            payload = dict(await request.post())
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        method = request.match_info["method"]
+        if method == "getMe":
+            result = {"id": 1, "is_bot": True, "first_name": "Stub", "username": "stub_bot"}
+        elif method == "sendMessage":
+            self._message_id += 1
+            result = {
+                "message_id": self._message_id,
+                "date": int(time.time()),
+                "chat": {"id": int(payload.get("chat_id", 0)), "type": "private"},
+                "text": str(payload.get("text", "")),
+            }
+        else:
+            return web.json_response(
+                {"ok": False, "error_code": 404, "description": "Not Found"}, status=404
+            )
+
+        return web.json_response({"ok": True, "result": result})
+
+
+def percentile(values: list, percent: float) -> float:
+    """Oddiy percentile hisoblash (values bo'sh bo'lmasligi kerak)"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
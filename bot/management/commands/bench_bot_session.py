@@ -0,0 +1,91 @@
+import asyncio
+import time
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from django.core.management.base import BaseCommand
+
+from ._stub_telegram import STUB_TOKEN, StubTelegramServer, percentile
+
+
+class Command(BaseCommand):
+    help = (
+        "Bot sessiyasini benchmark qilish: har bir update uchun yangi sessiya "
+        "va doimiy (keep-alive) sessiyani lokal stub server orqali solishtirish"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--updates", type=int, default=500)
+        parser.add_argument("--calls-per-update", type=int, default=3)
+        parser.add_argument("--concurrency", type=int, default=20)
+        parser.add_argument("--latency-ms", type=float, default=5.0)
+        parser.add_argument("--pool-size", type=int, default=100)
+
+    def handle(self, *args, **options):
+        asyncio.run(self.run(options))
+
+    async def run(self, options):
+        server = StubTelegramServer(latency=options["latency_ms"] / 1000)
+        await server.start()
+        try:
+            for name, scenario in (
+                ("per-update session", self.per_update_session),
+                ("persistent session", self.persistent_session),
+            ):
+                server.reset()
+                elapsed, latencies = await scenario(server, options)
+                calls = options["updates"] * options["calls_per_update"]
+                self.stdout.write(
+                    f"{name:<20} calls/sec={calls / elapsed:8.1f}  "
+                    f"p50={percentile(latencies, 50) * 1000:7.2f}ms  "
+                    f"p99={percentile(latencies, 99) * 1000:7.2f}ms  "
+                    f"connections={server.connections}"
+                )
+        finally:
+            await server.stop()
+
+        self.stdout.write(
+            "Eslatma: stub server lokal va TLS'siz, real api.telegram.org bilan "
+            "har bir yangi ulanish qo'shimcha TCP+TLS handshake talab qiladi."
+        )
+
+    async def _drive(self, options, handle_update):
+        semaphore = asyncio.Semaphore(options["concurrency"])
+        latencies = []
+
+        async def timed():
+            async with semaphore:
+                started = time.perf_counter()
+                await handle_update()
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(timed() for _ in range(options["updates"])))
+        return time.perf_counter() - started, latencies
+
+    async def per_update_session(self, server, options):
+        # Eski xatti-harakat: har bir update oxirida sessiya yopiladi
+        async def handle_update():
+            bot = Bot(token=STUB_TOKEN, session=AiohttpSession(api=server.api))
+            try:
+                for _ in range(options["calls_per_update"]):
+                    await bot.get_me()
+            finally:
+                await bot.session.close()
+
+        return await self._drive(options, handle_update)
+
+    async def persistent_session(self, server, options):
+        bot = Bot(
+            token=STUB_TOKEN,
+            session=AiohttpSession(api=server.api, limit=options["pool_size"]),
+        )
+
+        async def handle_update():
+            for _ in range(options["calls_per_update"]):
+                await bot.get_me()
+
+        try:
+            return await self._drive(options, handle_update)
+        finally:
+            await bot.session.close()
@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import time
+
+import aiohttp
+from django.core.management.base import BaseCommand
+
+from ._stub_telegram import STUB_TOKEN, StubTelegramServer, percentile
+
+
+class Command(BaseCommand):
+    help = (
+        "TelegramNotification.send_message'ni benchmark qilish: har bir xabar uchun "
+        "yangi ClientSession va umumiy (pooled) sessiyani lokal stub server orqali solishtirish"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=1000)
+        parser.add_argument("--concurrency", type=int, default=20)
+        parser.add_argument("--latency-ms", type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        asyncio.run(self.run(options))
+
+    async def run(self, options):
+        from bot.services import notification
+        from bot.services.send_scheduler import send_scheduler
+        from bot.utils.event_loops import register_long_lived_loop
+
+        # Benchmark loop'i oxirigacha yashaydi - pool'langan sessiya ishlatiladi
+        register_long_lived_loop()
+
+        # Har bir xabar uchun INFO log benchmark natijasini buzmasligi uchun
+        logging.getLogger(notification.__name__).setLevel(logging.WARNING)
+
+        server = StubTelegramServer(latency=options["latency_ms"] / 1000)
+        await server.start()
+
+        # Faqat HTTP qismi o'lchanadi - send_scheduler limitlari o'chiriladi
+        async def no_wait(*args, **kwargs):
+            return None
+
+        original_base_url = notification.TelegramNotification.base_url
+        original_acquire = send_scheduler.acquire
+        notification.TelegramNotification.base_url = f"{server.base_url}/bot{STUB_TOKEN}"
+        send_scheduler.acquire = no_wait
+        try:
+            for name, scenario in (
+                ("session per message", self.session_per_message),
+                ("pooled session", self.pooled_session),
+            ):
+                server.reset()
+                elapsed, latencies = await self._drive(options, scenario)
+                self.stdout.write(
+                    f"{name:<20} messages/sec={options['messages'] / elapsed:8.1f}  "
+                    f"p50={percentile(latencies, 50) * 1000:7.2f}ms  "
+                    f"p99={percentile(latencies, 99) * 1000:7.2f}ms  "
+                    f"connections={server.connections}"
+                )
+        finally:
+            await notification.TelegramNotification.close()
+            notification.TelegramNotification.base_url = original_base_url
+            send_scheduler.acquire = original_acquire
+            await server.stop()
+
+        self.stdout.write(
+            "Eslatma: stub server lokal va TLS'siz, real api.telegram.org bilan "
+            "har bir yangi ulanish qo'shimcha TCP+TLS handshake talab qiladi."
+        )
+
+    async def _drive(self, options, send):
+        semaphore = asyncio.Semaphore(options["concurrency"])
+        latencies = []
+
+        async def timed(index):
+            async with semaphore:
+                started = time.perf_counter()
+                await send(index)
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(timed(index) for index in range(options["messages"])))
+        return time.perf_counter() - started, latencies
+
+    @staticmethod
+    async def session_per_message(index):
+        # Eski xatti-harakat: har bir xabar uchun yangi ClientSession (yangi TCP ulanish)
+        from bot.services.notification import TelegramNotification
+
+        url = f"{TelegramNotification.base_url}/sendMessage"
+        async with aiohttp.ClientSession() as session:
+            async with session.post(url, json={"chat_id": index, "text": "benchmark"}) as response:
+                await response.json()
+
+    @staticmethod
+    async def pooled_session(index):
+        from bot.services.notification import TelegramNotification
+
+        result = await TelegramNotification.send_message(index, "benchmark")
+        if not result["success"]:
+            raise RuntimeError(result["error"])
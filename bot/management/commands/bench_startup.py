@@ -0,0 +1,96 @@
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Har bir entry point uchun alohida, toza interpreter'da bajariladigan kod
+ENTRY_POINTS = {
+    "web": (
+        "import django; django.setup(); import core.asgi; "
+        "from django.urls import resolve; resolve('/webhook/')"
+    ),
+    "worker": (
+        "import core.celery; import django; django.setup(); "
+        "from core.celery import app; app.loader.import_default_modules()"
+    ),
+    "beat": "import core.celery; import django; django.setup()",
+    "manage": "import django; django.setup()",
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Startup vaqtini o'lchash: web, Celery worker/beat va manage.py entry "
+        "point'lari uchun `python -X importtime` hisoboti"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "entry_points", nargs="*",
+            help=f"O'lchanadigan entry point'lar: {', '.join(ENTRY_POINTS)} (default: hammasi)",
+        )
+        parser.add_argument("--top", type=int, default=10, help="Eng sekin modullar soni")
+        parser.add_argument(
+            "--budget-ms", type=float, default=None,
+            help="Import vaqti shu chegaradan oshsa xatolik bilan tugash",
+        )
+
+    def handle(self, *args, **options):
+        names = options["entry_points"] or list(ENTRY_POINTS)
+        unknown = set(names) - set(ENTRY_POINTS)
+        if unknown:
+            raise CommandError(f"Unknown entry points: {', '.join(sorted(unknown))}")
+        over_budget = []
+
+        for name in names:
+            total_ms, modules = self.measure(ENTRY_POINTS[name])
+            aiogram_modules = [m for m in modules if m[0].startswith("aiogram")]
+            handler_modules = [m for m in modules if m[0].startswith("bot.handlers")]
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f"[{name}]"))
+            self.stdout.write(
+                f"  wall={total_ms:.0f}ms  modules={len(modules)}  "
+                f"aiogram={len(aiogram_modules)}  bot.handlers={len(handler_modules)}"
+            )
+            self.stdout.write(f"  top {options['top']} by cumulative import time:")
+            for module, self_us, cumulative_us in sorted(
+                modules, key=lambda m: m[2], reverse=True
+            )[: options["top"]]:
+                self.stdout.write(
+                    f"    {cumulative_us / 1000:8.1f}ms  (self {self_us / 1000:6.1f}ms)  {module}"
+                )
+
+            if options["budget_ms"] is not None and total_ms > options["budget_ms"]:
+                over_budget.append(f"{name}={total_ms:.0f}ms")
+
+        if over_budget:
+            raise CommandError(
+                f"Import-time budget {options['budget_ms']:.0f}ms exceeded: {', '.join(over_budget)}"
+            )
+
+    def measure(self, code: str):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE="core.settings")
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        total_ms = (time.perf_counter() - started) * 1000
+
+        if result.returncode != 0:
+            raise CommandError(result.stderr.strip().splitlines()[-1])
+
+        modules = []
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "[us]" in line:
+                continue
+            self_us, cumulative_us, module = line[len("import time:"):].split("|")
+            # Faqat top-level importlar (ichki importlar cumulative ichida hisoblangan)
+            modules.append((module.strip(), int(self_us), int(cumulative_us)))
+        return total_ms, modules
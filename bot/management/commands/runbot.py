@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import signal
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from bot.services.sharding import ShardSupervisor
+from bot.services.update_queue import UpdateQueue
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Botni getUpdates long polling rejimida ishga tushirish. Webhook o'rniga "
+        "ishlatiladi: Django request/response qatlamisiz, o'sha dp va handlerlar bilan"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=100,
+            help="Bitta getUpdates so'rovida olinadigan update'lar soni (1-100)",
+        )
+        parser.add_argument(
+            "--timeout", type=int, default=30,
+            help="Long polling kutish vaqti (soniya)",
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=settings.TELEGRAM_UPDATE_WORKERS,
+            help="Bir vaqtda ishlaydigan handler tasklari soni",
+        )
+        parser.add_argument(
+            "--processes", type=int, default=settings.TELEGRAM_DISPATCH_PROCESSES,
+            help=(
+                "Worker process'lar soni. 1 dan katta bo'lsa update'lar chat id bo'yicha "
+                "process'larga taqsimlanadi (SIGTTIN/SIGTTOU: +1/-1 worker)"
+            ),
+        )
+        parser.add_argument(
+            "--offset-file", default=str(Path(settings.BASE_DIR) / ".runbot_offset"),
+            help="Oxirgi qayta ishlangan offset saqlanadigan fayl",
+        )
+        parser.add_argument(
+            "--drop-pending", action="store_true",
+            help="Webhook o'chirilganda kutilayotgan update'larni tashlab yuborish",
+        )
+
+    def handle(self, *args, **options):
+        asyncio.run(self.run(options))
+
+    async def run(self, options):
+        from bot.loader import get_bot, get_dispatcher
+        from bot.services.notification import TelegramNotification
+        from bot.utils.event_loops import register_long_lived_loop
+        from bot.utils.redis import close_redis
+        from bot.views import process_update
+
+        register_long_lived_loop()
+        bot = get_bot()
+        dp = get_dispatcher()
+
+        batch_size = max(1, min(100, options["batch_size"]))
+        offset_file = Path(options["offset_file"])
+        supervisor = None
+        monitor_task = None
+
+        if options["processes"] > 1:
+            supervisor = ShardSupervisor(
+                workers=options["processes"],
+                concurrency=options["concurrency"],
+                heartbeat_timeout=settings.TELEGRAM_DISPATCH_HEARTBEAT_TIMEOUT,
+            )
+            supervisor.start()
+            monitor_task = asyncio.create_task(supervisor.monitor())
+            dispatch, join = supervisor.dispatch, supervisor.join
+        else:
+            # Bitta chatdan butun batch kelsa ham sig'ishi uchun
+            queue = UpdateQueue(
+                handler=process_update,
+                maxsize=batch_size * options["concurrency"],
+                workers=options["concurrency"],
+            )
+            dispatch, join = queue.put, queue.join
+
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop_event.set)
+            except NotImplementedError:  # Windows
+                pass
+
+        if supervisor:
+            def resize(delta):
+                asyncio.create_task(supervisor.resize(len(supervisor.worker_ids) + delta))
+
+            loop.add_signal_handler(signal.SIGTTIN, resize, 1)
+            loop.add_signal_handler(signal.SIGTTOU, resize, -1)
+
+        await bot.delete_webhook(drop_pending_updates=options["drop_pending"])
+        allowed_updates = dp.resolve_used_update_types()
+        offset = self.load_offset(offset_file)
+        backoff = 1
+
+        self.stdout.write(
+            f"Polling started: batch={batch_size}, processes={options['processes']}, "
+            f"concurrency={options['concurrency']}, "
+            f"offset={offset}, updates={allowed_updates}"
+        )
+
+        try:
+            while not stop_event.is_set():
+                try:
+                    updates = await bot.get_updates(
+                        offset=offset,
+                        limit=batch_size,
+                        timeout=options["timeout"],
+                        allowed_updates=allowed_updates,
+                        request_timeout=options["timeout"] + 10,
+                    )
+                    backoff = 1
+                except Exception as e:
+                    logger.error(f"getUpdates failed: {e}. Retrying in {backoff}s")
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, 30)
+                    continue
+
+                if not updates:
+                    continue
+
+                for update in updates:
+                    await dispatch(update)
+                # Offset faqat batch to'liq qayta ishlangach saqlanadi
+                await join()
+
+                offset = updates[-1].update_id + 1
+                self.save_offset(offset_file, offset)
+        finally:
+            if supervisor:
+                monitor_task.cancel()
+                await supervisor.stop()
+            else:
+                await queue.stop(drain=True)
+            await bot.session.close()
+            await TelegramNotification.close()
+            await close_redis()
+            self.stdout.write("Polling stopped")
+
+    @staticmethod
+    def load_offset(path: Path):
+        try:
+            return int(path.read_text().strip())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    @staticmethod
+    def save_offset(path: Path, offset: int):
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(str(offset))
+        tmp_path.replace(path)
@@ -0,0 +1,46 @@
+import asyncio
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Webhook'ni ro'yxatdan o'tkazish. allowed_updates handlerlar ishlatadigan "
+        "update turlaridan olinadi - chat_member (kanal a'zoligi indeksi) ham kiradi, "
+        "Telegram uni so'ralmasa yubormaydi"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url", default=settings.TELEGRAM_WEBHOOK_URL,
+            help="Webhook URL (standart: TELEGRAM_WEBHOOK_URL)",
+        )
+        parser.add_argument(
+            "--drop-pending", action="store_true",
+            help="Kutilayotgan update'larni tashlab yuborish",
+        )
+
+    def handle(self, *args, **options):
+        if not options["url"]:
+            self.stdout.write(self.style.WARNING("TELEGRAM_WEBHOOK_URL berilmagan - o'tkazib yuborildi"))
+            return
+        asyncio.run(self.run(options["url"], options["drop_pending"]))
+
+    async def run(self, url: str, drop_pending: bool):
+        from bot.loader import get_bot, get_dispatcher
+        from bot.utils.redis import close_redis
+
+        bot = get_bot()
+        allowed_updates = get_dispatcher().resolve_used_update_types()
+        try:
+            await bot.set_webhook(
+                url, allowed_updates=allowed_updates, drop_pending_updates=drop_pending
+            )
+        finally:
+            await bot.session.close()
+            await close_redis()
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Webhook set: {url}, updates={allowed_updates}")
+        )
@@ -7,17 +7,17 @@ from aiogram.types import (
     InlineKeyboardMarkup,
     InlineKeyboardButton,
 )
-from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
 from aiogram.dispatcher.middlewares.base import BaseMiddleware
 from aiogram.fsm.context import FSMContext
 from bot.selectors import get_all_channels, get_all_admins, get_user
+from bot.services.membership import membership_checker
 from bot.constants import Messages
 from bot.states import UserRegistrationState
 import html
 
 
 class ChannelMembershipMiddleware(BaseMiddleware):
-    def __init__(self, bot: Bot, skip_admins: bool = True):
+    def __init__(self, bot: Bot = None, skip_admins: bool = True):
         super().__init__()
         self.bot = bot
         self.skip_admins = skip_admins
@@ -51,7 +51,7 @@ class ChannelMembershipMiddleware(BaseMiddleware):
     
             return await handler(event, data)
 
-        user = await get_user(str(user_id))
+        user = await get_user(str(user_id), user_ctx=data.get("user_ctx"))
         if not user:
             # Foydalanuvchi bazada yo'q bo'lsa (registratsiya qilmagan), middleware'ni o'tkazib yuborish
             return await handler(event, data)
@@ -73,56 +73,12 @@ class ChannelMembershipMiddleware(BaseMiddleware):
         if not channels:
             return await handler(event, data)
 
-        not_subscribed_channels = []
-        telegram_channels = [ch for ch in channels if ch.is_telegram]
         other_channels = [ch for ch in channels if not ch.is_telegram]
 
         # 🔹 Faqat Telegram kanallarini tekshiramiz (majburiy a'zolik uchun)
-        for channel in telegram_channels:
-            chat_identifier = None
-
-            # Avval telegram_id bilan urinish
-            if channel.telegram_id:
-                chat_identifier = channel.telegram_id
-                try:
-                    member = await self.bot.get_chat_member(
-                        chat_id=chat_identifier,
-                        user_id=user_id
-                    )
-                    if member.status in ["left", "kicked"]:
-                        not_subscribed_channels.append(channel)
-                    continue  # Muvaffaqiyatli bo'lsa, keyingi kanalga o'tamiz
-                
-                except (TelegramBadRequest, TelegramForbiddenError) as e:
-                    logging.warning(f"Telegram ID {channel.telegram_id} bilan xatolik: {e}. Username bilan urinib ko'ramiz.")
-                except Exception as e:
-                    logging.warning(f"Telegram ID bilan kutilmagan xatolik: {e}. Username bilan urinib ko'ramiz.")
-
-            # Agar telegram_id ishlamasa yoki yo'q bo'lsa, username bilan urinish
-            if channel.link and channel.link.startswith("https://t.me/"):
-                username = channel.link.split("/")[-1]
-                chat_identifier = "@" + username
-                
-                try:
-                    member = await self.bot.get_chat_member(
-                        chat_id=chat_identifier,
-                        user_id=user_id
-                    )
-                    if member.status in ["left", "kicked"]:
-                        not_subscribed_channels.append(channel)
-                    continue  # Muvaffaqiyatli bo'lsa, keyingi kanalga o'tamiz
-
-                except (TelegramBadRequest, TelegramForbiddenError) as e:
-                    logging.error(f"Username @{username} bilan ham xatolik: {e}")
-                    # API xatoligi bo'lsa, kanalga a'zo emas deb hisoblaymiz
-                    not_subscribed_channels.append(channel)
-                except Exception as e:
-                    logging.error(f"Username bilan kutilmagan xatolik: {e}")
-                    not_subscribed_channels.append(channel)
-            else:
-                # Agar hech qanday identifikator yo'q bo'lsa
-                logging.error(f"Kanal {channel.name} uchun hech qanday to'g'ri identifikator topilmadi")
-                not_subscribed_channels.append(channel)
+        bot = data.get("bot") or self.bot
+        result = await membership_checker.check(bot, user_id, channels)
+        not_subscribed_channels = result.missing
 
         # 🔹 Agar Telegram kanallaridan birortasiga a'zo bo'lmasa - foydalanuvchini bloklash
         if not_subscribed_channels:
@@ -0,0 +1,68 @@
+import logging
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from bot.services.send_scheduler import BULK, SendScheduler, send_lane
+
+logger = logging.getLogger(__name__)
+
+# Xabar yuboruvchi (limitga tushadigan) metodlar
+SEND_METHOD_PREFIXES = ("send", "copyMessage", "forwardMessage")
+EXCLUDED_METHODS = {"sendChatAction"}
+
+
+def is_send_method(method: TelegramMethod) -> bool:
+    api_method = method.__api_method__
+    return api_method.startswith(SEND_METHOD_PREFIXES) and api_method not in EXCLUDED_METHODS
+
+
+class SendRateMiddleware(BaseRequestMiddleware):
+    """
+    Bot session middleware: har bir xabar yuborishdan oldin SendScheduler'dan navbat oladi.
+
+    TelegramRetryAfter bo'lsa chat bloklanadi; interaktiv yuborish qayta
+    uriniladi, BULK yuborishda esa butun lane to'xtatiladi va xato
+    chaqiruvchiga qaytariladi (send_bulk qayta urinadi).
+    """
+
+    def __init__(self, scheduler: SendScheduler, max_retries: int = 2, max_retry_after: float = 30):
+        self.scheduler = scheduler
+        self.max_retries = max_retries
+        self.max_retry_after = max_retry_after
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None or not is_send_method(method):
+            return await make_request(bot, method)
+
+        lane = send_lane.get()
+        attempt = 0
+        while True:
+            await self.scheduler.acquire(chat_id, lane)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                attempt += 1
+                if lane == BULK:
+                    await self.scheduler.block(chat_id, e.retry_after, lane=BULK)
+                    raise
+
+                await self.scheduler.block(chat_id, e.retry_after)
+                if attempt > self.max_retries or e.retry_after > self.max_retry_after:
+                    raise
+                logger.warning(
+                    f"{method.__api_method__} to {chat_id} hit flood control, "
+                    f"retrying in {e.retry_after}s"
+                )
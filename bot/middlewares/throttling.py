@@ -1,15 +1,34 @@
-import time
 from aiogram import BaseMiddleware
 from aiogram.types import Message, CallbackQuery
+from django.conf import settings
 from bot.constants import Messages
-from typing import Callable, Dict, Any, Awaitable, Union
+from bot.services.rate_limit import TokenBucketLimiter
+from typing import Callable, Dict, Any, Awaitable, Optional, Tuple, Union
+
+# Buyruq/tugma uchun alohida limitlar: (soniyasiga token, burst)
+DEFAULT_COMMAND_LIMITS: Dict[str, Tuple[float, float]] = {
+    "/start": (0.2, 3),
+    "check_subscription": (0.5, 3),
+    "check_subscription_middleware": (0.5, 3),
+}
+
+# "Juda ko'p so'rov" ogohlantirishi foydalanuvchiga 30 soniyada bir martadan ko'p yuborilmaydi
+WARNING_RATE = 1 / 30
 
 
 class ThrottlingMiddleware(BaseMiddleware):
-    def __init__(self, slow_mode_delay=0.5):
+    def __init__(
+        self,
+        rate: float = 2,
+        burst: float = 5,
+        command_limits: Optional[Dict[str, Tuple[float, float]]] = None,
+        limiter: Optional[TokenBucketLimiter] = None,
+    ):
         super().__init__()
-        self.user_timeouts = {}
-        self.slow_mode_delay = slow_mode_delay
+        self.rate = rate
+        self.burst = burst
+        self.command_limits = DEFAULT_COMMAND_LIMITS if command_limits is None else command_limits
+        self.limiter = limiter or TokenBucketLimiter(maxsize=settings.THROTTLE_LOCAL_MAXSIZE)
 
     async def __call__(
         self,
@@ -20,15 +39,30 @@ class ThrottlingMiddleware(BaseMiddleware):
         data: Dict[str, Any],
     ) -> Any:
         user_id = event.from_user.id
-        current_time = time.time()
-
-        last_request_time = self.user_timeouts.get(user_id, 0)
-        if current_time - last_request_time < self.slow_mode_delay:
-            if isinstance(event, Message):
-                await event.answer(text=Messages.too_requests.value)
-            elif isinstance(event, CallbackQuery):
-                await event.answer(text=Messages.too_requests.value, show_alert=True)
-            return
-        else:
-            self.user_timeouts[user_id] = current_time
-            return await handler(event, data)
+
+        command = self.get_command(event)
+        if command in self.command_limits:
+            rate, burst = self.command_limits[command]
+            if not await self.limiter.allow(f"cmd:{command}:{user_id}", rate, burst):
+                return await self.reject(event, user_id)
+
+        if not await self.limiter.allow(f"user:{user_id}", self.rate, self.burst):
+            return await self.reject(event, user_id)
+
+        return await handler(event, data)
+
+    @staticmethod
+    def get_command(event: Union[Message, CallbackQuery]) -> Optional[str]:
+        if isinstance(event, CallbackQuery):
+            return event.data
+        if event.text and event.text.startswith("/"):
+            # "/start abc" va "/start@bot" -> "/start"
+            return event.text.split()[0].split("@")[0]
+        return None
+
+    async def reject(self, event: Union[Message, CallbackQuery], user_id: int):
+        if isinstance(event, CallbackQuery):
+            # Callback'ga javob berilmasa tugma "yuklanmoqda" holatida qoladi
+            await event.answer(text=Messages.too_requests.value, show_alert=True)
+        elif await self.limiter.allow(f"warn:{user_id}", WARNING_RATE, 1):
+            await event.answer(text=Messages.too_requests.value)
@@ -0,0 +1,34 @@
+from typing import Any, Awaitable, Callable, Dict, Union
+
+from aiogram.dispatcher.middlewares.base import BaseMiddleware
+from aiogram.types import CallbackQuery, Message
+
+from bot.selectors import load_user_context
+from bot.services.delivery import aunblock_user
+
+
+class UserContextMiddleware(BaseMiddleware):
+    """
+    Foydalanuvchini update boshida bir marta yuklab data["user_ctx"] ga qo'yadi.
+
+    Outer middleware sifatida ulanadi, shuning uchun ChannelMembershipMiddleware
+    va handlerlar uni tayyor holda oladi.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[Union[Message, CallbackQuery], Dict[str, Any]], Awaitable[Any]],
+        event: Union[Message, CallbackQuery],
+        data: Dict[str, Any],
+    ) -> Any:
+        from_user = data.get("event_from_user")
+        if from_user is not None:
+            user_ctx = await load_user_context(from_user.id)
+            user = user_ctx.user
+            if user is not None and user.is_blocked and user.blocked_at is not None:
+                # Yetkazib bo'lmaydi deb belgilangan foydalanuvchi qayta yozdi
+                await aunblock_user(from_user.id)
+                user.is_blocked = False
+                user.blocked_at = None
+            data["user_ctx"] = user_ctx
+        return await handler(event, data)
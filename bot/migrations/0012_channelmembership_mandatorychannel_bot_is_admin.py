@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0011_telegramuser_deadline_for_activation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mandatorychannel',
+            name='bot_is_admin',
+            field=models.BooleanField(default=False, help_text="Bot kanalda admin (chat_member update'lari keladi). my_chat_member orqali avtomatik yangilanadi", verbose_name='Bot admin'),
+        ),
+        migrations.CreateModel(
+            name='ChannelMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.BigIntegerField(verbose_name='Telegram ID')),
+                ('status', models.CharField(max_length=20, verbose_name='Status')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Yangilangan sana')),
+                ('channel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='bot.mandatorychannel', verbose_name='Kanal')),
+            ],
+            options={
+                'verbose_name': "Kanal a'zoligi",
+                'verbose_name_plural': "Kanal a'zoliklari",
+                'constraints': [models.UniqueConstraint(fields=('user_id', 'channel'), name='unique_channel_membership')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0012_channelmembership_mandatorychannel_bot_is_admin'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mandatorychannel',
+            name='resolved_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='ID aniqlangan sana'),
+        ),
+        migrations.AddField(
+            model_name='mandatorychannel',
+            name='resolved_chat_id',
+            field=models.BigIntegerField(blank=True, help_text='getChat orqali aniqlangan raqamli ID (avtomatik)', null=True, verbose_name='Aniqlangan chat ID'),
+        ),
+    ]
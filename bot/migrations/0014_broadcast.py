@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0013_mandatorychannel_resolved_chat_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Broadcast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_chat_id', models.BigIntegerField(verbose_name='Xabar chat ID')),
+                ('message_id', models.BigIntegerField(verbose_name='Xabar ID')),
+                ('status', models.CharField(choices=[('PENDING', 'Kutilmoqda'), ('RUNNING', 'Yuborilmoqda'), ('PAUSED', "To'xtatilgan"), ('CANCELLED', 'Bekor qilingan'), ('COMPLETED', 'Yakunlangan')], default='PENDING', max_length=20, verbose_name='Holat')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Jami')),
+                ('sent_count', models.PositiveIntegerField(default=0, verbose_name='Yuborildi')),
+                ('failed_count', models.PositiveIntegerField(default=0, verbose_name='Xatolik')),
+                ('lease_token', models.CharField(blank=True, max_length=32, null=True)),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Yaratilgan sana')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Boshlangan sana')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Tugagan sana')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='broadcasts', to='bot.telegramuser', verbose_name='Yaratgan admin')),
+            ],
+            options={
+                'verbose_name': 'Reklama',
+                'verbose_name_plural': 'Reklamalar',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BroadcastDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('PENDING', 'Kutilmoqda'), ('SENDING', 'Yuborilmoqda'), ('SENT', 'Yuborildi'), ('FAILED', 'Xatolik')], default='PENDING', max_length=10, verbose_name='Holat')),
+                ('error', models.CharField(blank=True, default='', max_length=255, verbose_name='Xatolik')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Yangilangan sana')),
+                ('broadcast', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='bot.broadcast', verbose_name='Reklama')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='broadcast_deliveries', to='bot.telegramuser', verbose_name='Foydalanuvchi')),
+            ],
+            options={
+                'verbose_name': 'Reklama yetkazilishi',
+                'verbose_name_plural': 'Reklama yetkazilishlari',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='broadcast',
+            index=models.Index(fields=['status', 'heartbeat_at'], name='bot_broadca_status_b3aa29_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='broadcastdelivery',
+            index=models.Index(fields=['broadcast', 'status', 'id'], name='bot_broadca_broadca_919fd2_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='broadcastdelivery',
+            constraint=models.UniqueConstraint(fields=('broadcast', 'user'), name='unique_broadcast_delivery'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0014_broadcast'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='broadcast',
+            name='filters',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Qabul qiluvchilar filtri'),
+        ),
+        migrations.AddField(
+            model_name='broadcast',
+            name='last_user_id',
+            field=models.BigIntegerField(default=0, verbose_name='Oxirgi foydalanuvchi ID'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0015_broadcast_filters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='telegramuser',
+            name='blocked_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Bloklangan sana'),
+        ),
+        migrations.AddIndex(
+            model_name='telegramuser',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_blocked', False)), fields=['id'], name='telegramuser_deliverable_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0016_telegramuser_blocked_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='telegramuser',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_blocked', False)), fields=['level', 'is_confirmed', 'gender', 'region'], name='telegramuser_segment_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='telegramuser',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_blocked', False)), fields=['region', 'level'], name='telegramuser_region_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='telegramuser',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_blocked', False)), fields=['registration_date'], name='telegramuser_regdate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payments',
+            index=models.Index(condition=models.Q(('course__isnull', False)), fields=['user', 'status'], name='payments_purchase_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0017_telegramuser_segment_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='broadcast',
+            name='status_chat_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='broadcast',
+            name='status_message_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0018_broadcast_status_message'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=500, verbose_name="Fayl yo'li")),
+                ('content_hash', models.CharField(max_length=64, verbose_name='SHA-256')),
+                ('file_type', models.CharField(default='photo', max_length=20, verbose_name='Turi')),
+                ('file_id', models.CharField(max_length=255, verbose_name='Telegram file_id')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Yaratilgan sana')),
+            ],
+            options={
+                'verbose_name': 'Media fayl',
+                'verbose_name_plural': 'Media fayllar',
+                'constraints': [models.UniqueConstraint(fields=('path', 'content_hash', 'file_type'), name='unique_media_file')],
+            },
+        ),
+    ]
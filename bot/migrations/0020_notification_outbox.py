@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:44
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def mark_existing_delivered(apps, schema_editor):
+    # Eski bildirishnomalar outbox'dan oldin yozilgan - ularni qayta yubormaslik kerak
+    Notification = apps.get_model("bot", "Notification")
+    Notification.objects.update(delivered_at=F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0019_mediafile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Urinishlar soni'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='dedupe_key',
+            field=models.CharField(blank=True, help_text='Bitta hodisa uchun bildirishnoma ikki marta yozilmasligi uchun', max_length=100, null=True, unique=True, verbose_name='Takrorlanmaslik kaliti'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='delivered_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Yetkazilgan sana'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='failed_at',
+            field=models.DateTimeField(blank=True, help_text="Urinishlar tugadi yoki foydalanuvchiga yetkazib bo'lmaydi", null=True, verbose_name='Bekor qilingan sana'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='last_error',
+            field=models.TextField(blank=True, default='', verbose_name='Oxirgi xato'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Keyingi urinish vaqti'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='payload',
+            field=models.JSONField(blank=True, help_text="sendMessage uchun qo'shimcha parametrlar (reply_markup, parse_mode)", null=True, verbose_name='Telegram parametrlari'),
+        ),
+        migrations.RunPython(mark_existing_delivered, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('delivered_at__isnull', True), ('failed_at__isnull', True)), fields=['next_attempt_at'], name='notification_outbox_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0020_notification_outbox'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('PAYMENT_PENDING', "To'lov kutilmoqda"), ('PAYMENT_CONFIRMED', "To'lov tasdiqlandi"), ('PAYMENT_REJECTED', "To'lov rad etildi"), ('KONKURS_JOINED', "Konkursga qo'shildi"), ('CHANNEL_INVITATION', 'Kanalga taklif'), ('SYSTEM_MESSAGE', 'Tizim xabari'), ('REFERRER_ISSUE', 'Referrer darajasi muammosi')], max_length=20, verbose_name='Bildirish turi'),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from asgiref.sync import sync_to_async
@@ -157,6 +157,9 @@ class TelegramUser(models.Model):
     is_looser = models.BooleanField(default=False, verbose_name="Yutqazuvchi")
     inactive_time = models.DateTimeField(auto_now=True)
     is_blocked = models.BooleanField(default=False, verbose_name="Bloklangan")
+    # Xabar yetkazib bo'lmagani aniqlangan vaqt (botni bloklagan, akkaunt o'chirilgan).
+    # Foydalanuvchi botga qayta yozsa is_blocked avtomatik olib tashlanadi
+    blocked_at = models.DateTimeField(null=True, blank=True, verbose_name="Bloklangan sana")
     is_active = models.BooleanField(default=True)
     deadline_for_activation = models.DateField(null=True, blank=True)
 
@@ -276,6 +279,30 @@ class TelegramUser(models.Model):
             models.Index(fields=["phone_number"]),
             models.Index(fields=["referral_code"]),
             models.Index(fields=["is_confirmed", "registration_date"]),
+            # Ommaviy yuborish (reklama, aktivlik tekshiruvi) faqat shu foydalanuvchilarga
+            models.Index(
+                fields=["id"],
+                condition=models.Q(is_active=True, is_blocked=False),
+                name="telegramuser_deliverable_idx",
+            ),
+            # /send_ad segment filtrlari va auditoriya sonini index-only scan bilan hisoblash.
+            # Ko'p segmentlar bosqich bo'yicha - level birinchi ustun
+            models.Index(
+                fields=["level", "is_confirmed", "gender", "region"],
+                condition=models.Q(is_active=True, is_blocked=False),
+                name="telegramuser_segment_idx",
+            ),
+            # Faqat viloyat (yoki viloyat + bosqich) bo'yicha segmentlar
+            models.Index(
+                fields=["region", "level"],
+                condition=models.Q(is_active=True, is_blocked=False),
+                name="telegramuser_region_idx",
+            ),
+            models.Index(
+                fields=["registration_date"],
+                condition=models.Q(is_active=True, is_blocked=False),
+                name="telegramuser_regdate_idx",
+            ),
         ]
 
 
@@ -471,108 +498,122 @@ class Payments(models.Model):
 
     def confirm_payment(self):
         """To'lovni tasdiqlash va foydalanuvchi levelini yangilash"""
-        self.status = "CONFIRMED"
-        self.is_confirmed = True
-        self.confirmed_date = timezone.now()
-
-        # Foydalanuvchi darajasini yangilash
-        current_level = self.user.level
-        print(f"Current user level: {current_level}")
-
-        try:
-            # Level formatini normalizatsiya qilish
-            if current_level.startswith("level_"):
-                current_level_num = int(current_level.split("_")[1])
-            elif "-bosqich" in current_level:
-                current_level_num = int(current_level.split("-")[0])
-            else:
-                current_level_num = 0
-
-            # Kurs to'lovi bo'lsa va course mavjud bo'lsa
-            if self.payment_type == "COURSE" and self.course:
-                # Course level dan keyingi levelni aniqlash
-                if self.course.level and self.course.level.startswith("level_"):
-                    course_level_num = int(self.course.level.split("_")[1])
-
-                    # Foydalanuvchi levelini course level bilan bog'lash
-                    # Agar course level foydalanuvchi levelidan yuqori bo'lsa
-                    if course_level_num > current_level_num:
-                        new_level = f"level_{course_level_num}"
-                        self.user.level = new_level
-                        self.user.save(update_fields=["level"])
-                        print(f"User level updated to: {new_level}")
-
-                    # CourseParticipant yaratish
-                    from .models import CourseParticipant
-
-                    CourseParticipant.objects.get_or_create(
-                        user=self.user, course=self.course, defaults={"payment": self}
-                    )
-
-            # Agar oddiy level advancement kerak bo'lsa (course yo'q)
-            elif self.payment_type == "COURSE" and not self.course:
-                # Keyingi levelga o'tkazish
-                next_level_num = current_level_num + 1
-                if next_level_num <= 7:  # 7-bosqichgacha
-                    new_level = f"level_{next_level_num}"
-                    self.user.level = new_level
-                    self.user.save(update_fields=["level"])
-                    print(f"User level updated to: {new_level}")
+        # Level, to'lov va bildirishnoma bitta tranzaksiyada yoziladi
+        with transaction.atomic():
+            self.status = "CONFIRMED"
+            self.is_confirmed = True
+            self.confirmed_date = timezone.now()
 
-            # Referal bonusi (agar kerak bo'lsa)
-            if self.user.invited_by:
-                referrer = self.user.invited_by
-                referrer.update_referral_count()
+            # Foydalanuvchi darajasini yangilash
+            current_level = self.user.level
+            print(f"Current user level: {current_level}")
 
-            # Notification yaratish
             try:
-                from .models import Notification
-
-                Notification.objects.create(
-                    recipient=self.user,
-                    sender=None,
-                    notification_type="PAYMENT_CONFIRMED",
-                    title="To'lov tasdiqlandi",
-                    message=f"Sizning to'lovingiz {self.amount} so'm miqdorida tasdiqlandi.",
-                    extra_data={
-                        "course_id": self.course.id if self.course else None,
-                        "payment_id": self.id,
-                    },
-                )
+                # Savepoint: xato bo'lsa ham to'lov tasdiqlanadi
+                with transaction.atomic():
+                    self._advance_user_level(current_level)
             except Exception as e:
-                print(f"Error creating notification: {e}")
+                print(f"Error in confirm_payment: {e}")
 
-        except Exception as e:
-            print(f"Error in confirm_payment: {e}")
-            # Xato bo'lsa ham to'lovni tasdiqlash
-            pass
+            # To'lovni saqlash
+            self.save()
 
-        # To'lovni saqlash
-        self.save()
+            # Outbox: commit'dan keyin dispatch_notifications yuboradi
+            from bot.services.outbox import enqueue_notification
+
+            payload = {"parse_mode": "HTML"}
+            if self.course and self.course.private_channel:
+                payload["reply_markup"] = {
+                    "inline_keyboard": [
+                        [{"text": "📲 Kurs kanaliga kirish", "url": self.course.private_channel}]
+                    ]
+                }
+            enqueue_notification(
+                self.user,
+                "PAYMENT_CONFIRMED",
+                "To'lov tasdiqlandi",
+                (
+                    f"✅ To'lov muvaffaqiyatli amalga oshirildi!\n"
+                    f"💰 Summa: {self.amount} so'm\n\n"
+                    f"🔐 Kurs kanaliga kirish uchun quyidagi tugmani bosing:"
+                ),
+                payload=payload,
+                extra_data={
+                    "course_id": self.course.id if self.course else None,
+                    "payment_id": self.id,
+                },
+                dedupe_key=f"payment:{self.pk}:confirmed",
+            )
         print(f"Payment confirmed for user: {self.user.full_name}")
 
+    def _advance_user_level(self, current_level):
+        # Level formatini normalizatsiya qilish
+        if current_level.startswith("level_"):
+            current_level_num = int(current_level.split("_")[1])
+        elif "-bosqich" in current_level:
+            current_level_num = int(current_level.split("-")[0])
+        else:
+            current_level_num = 0
+
+        # Kurs to'lovi bo'lsa va course mavjud bo'lsa
+        if self.payment_type == "COURSE" and self.course:
+            # Course level dan keyingi levelni aniqlash
+            if self.course.level and self.course.level.startswith("level_"):
+                course_level_num = int(self.course.level.split("_")[1])
+
+                # Foydalanuvchi levelini course level bilan bog'lash
+                # Agar course level foydalanuvchi levelidan yuqori bo'lsa
+                if course_level_num > current_level_num:
+                    new_level = f"level_{course_level_num}"
+                    self.user.level = new_level
+                    self.user.save(update_fields=["level"])
+                    print(f"User level updated to: {new_level}")
+
+                # CourseParticipant yaratish
+                from .models import CourseParticipant
+
+                CourseParticipant.objects.get_or_create(
+                    user=self.user, course=self.course, defaults={"payment": self}
+                )
+
+        # Agar oddiy level advancement kerak bo'lsa (course yo'q)
+        elif self.payment_type == "COURSE" and not self.course:
+            # Keyingi levelga o'tkazish
+            next_level_num = current_level_num + 1
+            if next_level_num <= 7:  # 7-bosqichgacha
+                new_level = f"level_{next_level_num}"
+                self.user.level = new_level
+                self.user.save(update_fields=["level"])
+                print(f"User level updated to: {new_level}")
+
+        # Referal bonusi (agar kerak bo'lsa)
+        if self.user.invited_by:
+            referrer = self.user.invited_by
+            referrer.update_referral_count()
+
     def reject_payment(self, reason):
         """To'lovni rad etish"""
-        self.status = "REJECTED"
-        self.is_confirmed = False
-        self.rejection_reason = reason
-        self.confirmed_date = timezone.now()
-        self.save()
-
-        # Notification yaratish
-        try:
-            from .models import Notification
-
-            Notification.objects.create(
-                recipient=self.user,
-                sender=None,
-                notification_type="PAYMENT_REJECTED",
-                title="To'lov rad etildi",
-                message=f"Sizning to'lovingiz {self.amount} so'm miqdorida rad etildi. Sababi: {reason}",
+        from bot.services.outbox import enqueue_notification
+        from bot.signals import get_menu_keyboard_json
+
+        with transaction.atomic():
+            # Bildirishnoma save'dan oldin: post_save signalidagi umumiy xabar
+            # shu dedupe_key bilan takror yozilmaydi, sabab esa foydalanuvchiga yetadi
+            enqueue_notification(
+                self.user,
+                "PAYMENT_REJECTED",
+                "To'lov rad etildi",
+                f"❌ Sizning to'lovingiz {self.amount} so'm miqdorida rad etildi. Sababi: {reason}",
+                payload={"parse_mode": "HTML", "reply_markup": get_menu_keyboard_json()},
                 extra_data={"payment_id": self.id},
+                dedupe_key=f"payment:{self.pk}:rejected",
             )
-        except Exception as e:
-            print(f"Error creating rejection notification: {e}")
+
+            self.status = "REJECTED"
+            self.is_confirmed = False
+            self.rejection_reason = reason
+            self.confirmed_date = timezone.now()
+            self.save()
 
     def __str__(self):
         if self.course:
@@ -586,6 +627,13 @@ class Payments(models.Model):
         indexes = [
             models.Index(fields=["status", "payment_date"]),
             models.Index(fields=["user", "course"]),
+            # /send_ad "purchased" segmenti: EXISTS(user, status=CONFIRMED, course bor)
+            # jadvalga tegmasdan shu indeksdan javob oladi
+            models.Index(
+                fields=["user", "status"],
+                condition=models.Q(course__isnull=False),
+                name="payments_purchase_idx",
+            ),
         ]
 
 
@@ -659,6 +707,20 @@ class MandatoryChannel(models.Model):
     is_active = models.BooleanField(
         default=True, verbose_name="Faol", help_text="Kanal faolmi"
     )
+    bot_is_admin = models.BooleanField(
+        default=False,
+        verbose_name="Bot admin",
+        help_text="Bot kanalda admin (chat_member update'lari keladi). my_chat_member orqali avtomatik yangilanadi",
+    )
+    resolved_chat_id = models.BigIntegerField(
+        null=True,
+        blank=True,
+        verbose_name="Aniqlangan chat ID",
+        help_text="getChat orqali aniqlangan raqamli ID (avtomatik)",
+    )
+    resolved_at = models.DateTimeField(
+        null=True, blank=True, verbose_name="ID aniqlangan sana"
+    )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Yaratilgan sana")
 
     def __str__(self):
@@ -670,6 +732,37 @@ class MandatoryChannel(models.Model):
         ordering = ["name"]
 
 
+class ChannelMembership(models.Model):
+    """
+    chat_member update'laridan yig'ilgan a'zolik indeksi.
+
+    Faqat bot admin bo'lgan kanallar uchun ishonchli - boshqa kanallarda
+    a'zolik getChatMember orqali tekshiriladi.
+    """
+
+    channel = models.ForeignKey(
+        MandatoryChannel,
+        on_delete=models.CASCADE,
+        related_name="memberships",
+        verbose_name="Kanal",
+    )
+    user_id = models.BigIntegerField(verbose_name="Telegram ID")
+    status = models.CharField(max_length=20, verbose_name="Status")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Yangilangan sana")
+
+    def __str__(self):
+        return f"{self.user_id} @ {self.channel_id}: {self.status}"
+
+    class Meta:
+        verbose_name = "Kanal a'zoligi"
+        verbose_name_plural = "Kanal a'zoliklari"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user_id", "channel"], name="unique_channel_membership"
+            ),
+        ]
+
+
 class PrivateChannel(models.Model):
     kurslar = models.ForeignKey(
         Kurslar,
@@ -709,6 +802,7 @@ class Notification(models.Model):
         ("KONKURS_JOINED", "Konkursga qo'shildi"),
         ("CHANNEL_INVITATION", "Kanalga taklif"),
         ("SYSTEM_MESSAGE", "Tizim xabari"),
+        ("REFERRER_ISSUE", "Referrer darajasi muammosi"),
     ]
 
     recipient = models.ForeignKey(
@@ -744,6 +838,35 @@ class Notification(models.Model):
         help_text="Bildirish bilan bog'liq qo'shimcha ma'lumotlar",
     )
 
+    # Outbox: qator biznes o'zgarish bilan bir tranzaksiyada yoziladi va
+    # dispatch_notifications vazifasi uni Telegramga yetkazadi
+    payload = models.JSONField(
+        null=True,
+        blank=True,
+        verbose_name="Telegram parametrlari",
+        help_text="sendMessage uchun qo'shimcha parametrlar (reply_markup, parse_mode)",
+    )
+    dedupe_key = models.CharField(
+        max_length=100,
+        null=True,
+        blank=True,
+        unique=True,
+        verbose_name="Takrorlanmaslik kaliti",
+        help_text="Bitta hodisa uchun bildirishnoma ikki marta yozilmasligi uchun",
+    )
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Urinishlar soni")
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now, verbose_name="Keyingi urinish vaqti"
+    )
+    delivered_at = models.DateTimeField(null=True, blank=True, verbose_name="Yetkazilgan sana")
+    failed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Bekor qilingan sana",
+        help_text="Urinishlar tugadi yoki foydalanuvchiga yetkazib bo'lmaydi",
+    )
+    last_error = models.TextField(blank=True, default="", verbose_name="Oxirgi xato")
+
     def mark_as_read(self):
         if not self.is_read:
             self.is_read = True
@@ -761,6 +884,12 @@ class Notification(models.Model):
         indexes = [
             models.Index(fields=["recipient", "is_read"]),
             models.Index(fields=["notification_type", "created_at"]),
+            # Dispatcher faqat yetkazilmagan qatorlarni navbat tartibida oladi
+            models.Index(
+                fields=["next_attempt_at"],
+                condition=models.Q(delivered_at__isnull=True, failed_at__isnull=True),
+                name="notification_outbox_idx",
+            ),
         ]
 
 
@@ -830,3 +959,132 @@ class ReferrerUpdateQueue(models.Model):
         indexes = [
             models.Index(fields=["is_processed", "created_at"]),
         ]
+
+
+class Broadcast(models.Model):
+    """Admin yuborgan reklama (/send_ad) - fon rejimida, checkpoint bilan yuboriladi"""
+
+    STATUS_CHOICES = [
+        ("PENDING", "Kutilmoqda"),
+        ("RUNNING", "Yuborilmoqda"),
+        ("PAUSED", "To'xtatilgan"),
+        ("CANCELLED", "Bekor qilingan"),
+        ("COMPLETED", "Yakunlangan"),
+    ]
+
+    created_by = models.ForeignKey(
+        TelegramUser,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="broadcasts",
+        verbose_name="Yaratgan admin",
+    )
+    from_chat_id = models.BigIntegerField(verbose_name="Xabar chat ID")
+    message_id = models.BigIntegerField(verbose_name="Xabar ID")
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default="PENDING", verbose_name="Holat"
+    )
+    # Qabul qiluvchilar ro'yxati saqlanmaydi - filter va keyset cursor (TelegramUser pk)
+    filters = models.JSONField(default=dict, blank=True, verbose_name="Qabul qiluvchilar filtri")
+    last_user_id = models.BigIntegerField(default=0, verbose_name="Oxirgi foydalanuvchi ID")
+    total = models.PositiveIntegerField(default=0, verbose_name="Jami")
+    sent_count = models.PositiveIntegerField(default=0, verbose_name="Yuborildi")
+    failed_count = models.PositiveIntegerField(default=0, verbose_name="Xatolik")
+
+    # Worker lease: bir vaqtda faqat bitta worker yuboradi, heartbeat eskirsa boshqasi davom ettiradi
+    lease_token = models.CharField(max_length=32, null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    # Admin'dagi holat xabari - worker progress bilan tahrirlaydi
+    status_chat_id = models.BigIntegerField(null=True, blank=True)
+    status_message_id = models.BigIntegerField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Yaratilgan sana")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Boshlangan sana")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Tugagan sana")
+
+    def __str__(self):
+        return f"Reklama #{self.pk} ({self.get_status_display()})"
+
+    class Meta:
+        verbose_name = "Reklama"
+        verbose_name_plural = "Reklamalar"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "heartbeat_at"]),
+        ]
+
+
+class BroadcastDelivery(models.Model):
+    """
+    Reklamaning bitta foydalanuvchiga yetkazilishi.
+
+    Yozuvlar worker chunk olganda SENDING holatida yaratiladi: yuborish
+    boshlangan, natija hali yozilmagan. Worker o'chib qolsa bu yozuvlar
+    qayta yuborilmaydi (at-most-once), FAILED deb belgilanadi.
+    """
+
+    STATUS_CHOICES = [
+        ("PENDING", "Kutilmoqda"),
+        ("SENDING", "Yuborilmoqda"),
+        ("SENT", "Yuborildi"),
+        ("FAILED", "Xatolik"),
+    ]
+
+    broadcast = models.ForeignKey(
+        Broadcast, on_delete=models.CASCADE, related_name="deliveries", verbose_name="Reklama"
+    )
+    user = models.ForeignKey(
+        TelegramUser,
+        on_delete=models.CASCADE,
+        related_name="broadcast_deliveries",
+        verbose_name="Foydalanuvchi",
+    )
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default="PENDING", verbose_name="Holat"
+    )
+    error = models.CharField(max_length=255, blank=True, default="", verbose_name="Xatolik")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Yangilangan sana")
+
+    def __str__(self):
+        return f"#{self.broadcast_id} → {self.user_id} ({self.status})"
+
+    class Meta:
+        verbose_name = "Reklama yetkazilishi"
+        verbose_name_plural = "Reklama yetkazilishlari"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["broadcast", "user"], name="unique_broadcast_delivery"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["broadcast", "status", "id"]),
+        ]
+
+
+class MediaFile(models.Model):
+    """
+    Telegram'ga bir marta yuklangan faylning file_id'si.
+
+    Kalit - fayl yo'li va tarkibining sha256 xeshi: rasm almashtirilsa xesh
+    o'zgaradi va fayl qayta yuklanadi.
+    """
+
+    path = models.CharField(max_length=500, verbose_name="Fayl yo'li")
+    content_hash = models.CharField(max_length=64, verbose_name="SHA-256")
+    file_type = models.CharField(max_length=20, default="photo", verbose_name="Turi")
+    file_id = models.CharField(max_length=255, verbose_name="Telegram file_id")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Yaratilgan sana")
+
+    def __str__(self):
+        return f"{self.path} ({self.file_type})"
+
+    class Meta:
+        verbose_name = "Media fayl"
+        verbose_name_plural = "Media fayllar"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["path", "content_hash", "file_type"], name="unique_media_file"
+            ),
+        ]
@@ -1,8 +1,10 @@
 import uuid
+from dataclasses import dataclass
 from datetime import datetime
+from typing import Optional
 from asgiref.sync import sync_to_async
 
-from django.db.models import Q, Count
+from django.db.models import Q, Count, Exists, OuterRef
 from core.settings import TELEGRAM_BOT_USERNAME
 from .models import (
     TelegramUser,
@@ -12,6 +14,7 @@ from .models import (
     ReferralPayment,
     Gifts,
 )
+from bot.utils.cache import reference_cache
 from bot.services.notification import (
     notify_new_referral,
     notify_referrer_changed,
@@ -35,13 +38,56 @@ LEVEL_MAPPING = {
 REVERSE_LEVEL_MAPPING = {v: k for k, v in LEVEL_MAPPING.items()}
 
 
+@dataclass
+class UserContext:
+    """
+    Bitta update uchun bir marta yuklangan foydalanuvchi ma'lumotlari.
+
+    UserContextMiddleware data["user_ctx"] ga qo'yadi; selectorlar uni
+    qabul qiladi va shu foydalanuvchi uchun qayta so'rov yubormaydi.
+    Update davomida foydalanuvchini o'zgartiradigan handlerlar (masalan,
+    registratsiya) undan keyin user_ctx ishlatmasligi kerak.
+    """
+
+    telegram_id: str
+    user: Optional[TelegramUser]
+    has_purchased_course: bool = False
+
+    def is_for(self, telegram_id) -> bool:
+        return str(telegram_id) == self.telegram_id
+
+
+@sync_to_async
+def load_user_context(telegram_id) -> UserContext:
+    """Foydalanuvchi, uning referreri va kurs sotib olganligi - bitta so'rovda"""
+    user = (
+        TelegramUser.objects.select_related("invited_by")
+        .annotate(
+            has_purchased_course=Exists(
+                Payments.objects.filter(
+                    user=OuterRef("pk"), course__isnull=False, status="CONFIRMED"
+                )
+            )
+        )
+        .filter(telegram_id=telegram_id)
+        .first()
+    )
+    return UserContext(
+        telegram_id=str(telegram_id),
+        user=user,
+        has_purchased_course=bool(user and user.has_purchased_course),
+    )
+
+
 @sync_to_async
 def fetch_user(chat_id: str):
     return TelegramUser.objects.select_related("invited_by").filter(telegram_id=chat_id).first()
 
 
-async def get_user(chat_id: str) -> TelegramUser | None:
+async def get_user(chat_id: str, user_ctx: Optional[UserContext] = None) -> TelegramUser | None:
     """Foydalanuvchini olish - None yoki TelegramUser qaytaradi"""
+    if user_ctx is not None and user_ctx.is_for(chat_id):
+        return user_ctx.user
     user = await fetch_user(chat_id)
     return user  # False o'rniga None qaytarish
 
@@ -59,20 +105,31 @@ def get_referrer_by_id(telegram_id: str):
     return TelegramUser.objects.filter(telegram_id=telegram_id).first()
 
 
-@sync_to_async
-def get_all_admins():
-    """Barcha adminlarni olish"""
+def _load_admin_ids():
     return list(
         TelegramUser.objects.filter(is_admin=True).values_list("telegram_id", flat=True)
     )
 
 
-@sync_to_async
-def get_all_channels():
-    """Barcha majburiy kanallarni olish"""
+def _load_channels():
     return list(MandatoryChannel.objects.filter(is_active=True))
 
 
+# Har update'da so'raladi, lekin juda kam o'zgaradi - bot.signals keshni yangilaydi
+reference_cache.register("admins", _load_admin_ids)
+reference_cache.register("channels", _load_channels)
+
+
+async def get_all_admins():
+    """Barcha adminlarni olish (jarayon keshidan)"""
+    return list(await reference_cache.get("admins"))
+
+
+async def get_all_channels():
+    """Barcha majburiy kanallarni olish (jarayon keshidan)"""
+    return list(await reference_cache.get("channels"))
+
+
 @sync_to_async
 def get_user_active_payments(user_id):
     """Foydalanuvchining faol (tasdiqlangan va muddati tugamagan) to'lovlarini olish"""
@@ -163,14 +220,20 @@ def reject_payment(payment_id, admin_user_id, reason):
 
 
 @sync_to_async
-def get_user_buy_course(telegram_id):
+def _get_user_buy_course(telegram_id):
+    return Payments.objects.filter(
+        user__telegram_id=telegram_id, course__isnull=False, status="CONFIRMED"
+    ).exists()
+
+
+async def get_user_buy_course(telegram_id, user_ctx: Optional[UserContext] = None):
     """
     Foydalanuvchi birorta kurs sotib olganmi yoki yo'qligini tekshiradi.
     True yoki False qaytaradi.
     """
-    return Payments.objects.filter(
-        user__telegram_id=telegram_id, course__isnull=False, status="CONFIRMED"
-    ).exists()
+    if user_ctx is not None and user_ctx.is_for(telegram_id):
+        return user_ctx.has_purchased_course
+    return await _get_user_buy_course(telegram_id)
 
 
 @sync_to_async
@@ -231,27 +294,38 @@ def get_course_by_user_level(user_level: str):
         return None
 
 
+def format_user_level(user) -> str:
+    """Foydalanuvchi levelini "N-bosqich" ko'rinishida qaytarish"""
+    if user and user.level:
+        # Levelni to'g'ri formatga keltirish
+        if user.level.startswith("level_"):
+            level_num = user.level.split("_")[1]
+            return f"{level_num}-bosqich"
+        elif "-bosqich" in user.level:
+            return user.level
+        else:
+            # Noto'g'ri format bo'lsa, 0-bosqich qaytaramiz
+            return "0-bosqich"
+    return "0-bosqich"  # Standart qiymat
+
+
 @sync_to_async
-def get_user_level(telegram_id):
-    """Foydalanuvchi levelini olish"""
+def _get_user_level(telegram_id):
     try:
         user = TelegramUser.objects.filter(telegram_id=telegram_id).first()
-        if user and user.level:
-            # Levelni to'g'ri formatga keltirish
-            if user.level.startswith("level_"):
-                level_num = user.level.split("_")[1]
-                return f"{level_num}-bosqich"
-            elif "-bosqich" in user.level:
-                return user.level
-            else:
-                # Noto'g'ri format bo'lsa, 0-bosqich qaytaramiz
-                return "0-bosqich"
-        return "0-bosqich"  # Standart qiymat
+        return format_user_level(user)
     except Exception as e:
         print(f"Error in get_user_level: {e}")
         return "0-bosqich"
 
 
+async def get_user_level(telegram_id, user_ctx: Optional[UserContext] = None):
+    """Foydalanuvchi levelini olish"""
+    if user_ctx is not None and user_ctx.is_for(telegram_id):
+        return format_user_level(user_ctx.user)
+    return await _get_user_level(telegram_id)
+
+
 @sync_to_async
 def get_level_kurs(level):
     """Level bo'yicha kursni olish - TUZATILDI"""
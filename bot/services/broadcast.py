@@ -0,0 +1,439 @@
+import asyncio
+import logging
+import uuid
+from datetime import timedelta
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from aiogram.exceptions import TelegramRetryAfter
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from bot.buttons.inline.broadcast import get_broadcast_keyboard
+from bot.models import Broadcast, BroadcastDelivery, TelegramUser
+from bot.services.delivery import is_undeliverable, mark_users_blocked
+from bot.services.segments import get_recipients
+from bot.services.send_scheduler import bulk_sending
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+
+logger = logging.getLogger(__name__)
+
+# Worker shu holatlarda yuborishni davom ettiradi
+ACTIVE_STATUSES = ("PENDING", "RUNNING")
+
+
+def _stale_before():
+    return timezone.now() - timedelta(seconds=settings.BROADCAST_HEARTBEAT_TIMEOUT)
+
+
+@sync_to_async
+def create_broadcast(created_by: TelegramUser, from_chat_id: int, message_id: int, filters: Dict[str, Any]) -> Broadcast:
+    """Reklama yaratish. Yetkazilish yozuvlari worker'da chunk'lab yaratiladi"""
+    return Broadcast.objects.create(
+        created_by=created_by,
+        from_chat_id=from_chat_id,
+        message_id=message_id,
+        filters=filters,
+        total=get_recipients(filters).order_by().count(),
+    )
+
+
+@sync_to_async
+def set_broadcast_status(broadcast_id: int, status: str, allowed_from: Tuple[str, ...]) -> bool:
+    """Pauza/davom ettirish/bekor qilish. Holat allowed_from'da bo'lmasa False"""
+    fields = {"status": status}
+    if status == "CANCELLED":
+        fields["finished_at"] = timezone.now()
+    return bool(
+        Broadcast.objects.filter(pk=broadcast_id, status__in=allowed_from).update(**fields)
+    )
+
+
+@sync_to_async
+def set_status_message(broadcast_id: int, chat_id: int, message_id: int):
+    Broadcast.objects.filter(pk=broadcast_id).update(
+        status_chat_id=chat_id, status_message_id=message_id
+    )
+
+
+@sync_to_async
+def get_broadcast(broadcast_id: int) -> Optional[Broadcast]:
+    return Broadcast.objects.filter(pk=broadcast_id).first()
+
+
+@sync_to_async
+def claim_broadcast(broadcast_id: int) -> Optional[str]:
+    """Worker lease olish: boshqa tirik worker yuborayotgan bo'lsa None"""
+    token = uuid.uuid4().hex
+    now = timezone.now()
+    claimed = (
+        Broadcast.objects.filter(pk=broadcast_id, status__in=ACTIVE_STATUSES)
+        .filter(Q(lease_token__isnull=True) | Q(heartbeat_at__lt=_stale_before()))
+        .update(lease_token=token, heartbeat_at=now, status="RUNNING")
+    )
+    if not claimed:
+        return None
+    Broadcast.objects.filter(pk=broadcast_id, started_at__isnull=True).update(started_at=now)
+    return token
+
+
+@sync_to_async
+def fail_interrupted_deliveries(broadcast_id: int) -> int:
+    """
+    Oldingi worker o'chib qolganda SENDING holatida qolganlar.
+
+    Ular yuborilgan bo'lishi mumkin, shuning uchun qayta yuborilmaydi.
+    """
+    with transaction.atomic():
+        interrupted = BroadcastDelivery.objects.filter(
+            broadcast_id=broadcast_id, status="SENDING"
+        ).update(status="FAILED", error="interrupted")
+        if interrupted:
+            Broadcast.objects.filter(pk=broadcast_id).update(
+                failed_count=F("failed_count") + interrupted
+            )
+    return interrupted
+
+
+@sync_to_async
+def heartbeat(broadcast_id: int, token: str) -> Optional[str]:
+    """Heartbeat yangilash. Joriy holatni qaytaradi, lease yo'qotilgan bo'lsa None"""
+    updated = Broadcast.objects.filter(pk=broadcast_id, lease_token=token).update(
+        heartbeat_at=timezone.now()
+    )
+    if not updated:
+        return None
+    return Broadcast.objects.filter(pk=broadcast_id).values_list("status", flat=True).first()
+
+
+@sync_to_async
+def take_delivery_chunk(broadcast: Broadcast, size: int) -> List[Tuple[int, str]]:
+    """
+    Keyingi qabul qiluvchilarni keyset cursor (pk > last_user_id) bo'yicha olish.
+
+    Yetkazilish yozuvlari SENDING holatida yaratiladi va cursor shu
+    tranzaksiyada suriladi. Natija: [(delivery_id, telegram_id)]
+    """
+    with transaction.atomic():
+        last_user_id = (
+            Broadcast.objects.select_for_update()
+            .values_list("last_user_id", flat=True)
+            .get(pk=broadcast.pk)
+        )
+        users = list(
+            get_recipients(broadcast.filters)
+            .filter(pk__gt=last_user_id)
+            .order_by("pk")
+            .values_list("pk", "telegram_id")[:size]
+        )
+        if not users:
+            return []
+
+        deliveries = BroadcastDelivery.objects.bulk_create([
+            BroadcastDelivery(broadcast_id=broadcast.pk, user_id=pk, status="SENDING")
+            for pk, _ in users
+        ])
+        Broadcast.objects.filter(pk=broadcast.pk).update(last_user_id=users[-1][0])
+    return [(delivery.pk, telegram_id) for delivery, (_, telegram_id) in zip(deliveries, users)]
+
+
+@sync_to_async
+def save_delivery_results(broadcast_id: int, results: List[Tuple[int, str, str]], blocked_ids: List[str] = ()):
+    """Chunk natijalarini yozish, hisoblagichlarni oshirish va yetkazib bo'lmaydiganlarni belgilash"""
+    deliveries = [
+        BroadcastDelivery(pk=pk, status=status, error=error) for pk, status, error in results
+    ]
+    sent = sum(1 for _, status, _ in results if status == "SENT")
+    with transaction.atomic():
+        BroadcastDelivery.objects.bulk_update(deliveries, ["status", "error"])
+        Broadcast.objects.filter(pk=broadcast_id).update(
+            sent_count=F("sent_count") + sent,
+            failed_count=F("failed_count") + len(results) - sent,
+        )
+        mark_users_blocked(blocked_ids)
+
+
+@sync_to_async
+def finish_broadcast(broadcast_id: int, token: str):
+    Broadcast.objects.filter(pk=broadcast_id, lease_token=token, status="RUNNING").update(
+        status="COMPLETED", finished_at=timezone.now()
+    )
+
+
+@sync_to_async
+def release_broadcast(broadcast_id: int, token: str):
+    Broadcast.objects.filter(pk=broadcast_id, lease_token=token).update(lease_token=None)
+
+
+def stale_broadcasts():
+    """Worker'siz qolgan faol reklamalar (yangi, pauzadan qaytgan yoki worker o'lgan)"""
+    return Broadcast.objects.filter(status__in=ACTIVE_STATUSES).filter(
+        Q(lease_token__isnull=True) | Q(heartbeat_at__lt=_stale_before())
+    )
+
+
+class AdaptiveRate:
+    """
+    AIMD rate controller for one broadcast.
+
+    Each success raises the rate by ``increase / rate`` (about ``increase``
+    msg/s per second of clean sending); a ``TelegramRetryAfter`` halves it
+    and pauses every worker for ``retry_after``. Concurrent 429s from the
+    same flood window only count once.
+    """
+
+    def __init__(self, initial: float, minimum: float, maximum: float, increase: float = 1, decrease: float = 0.5):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.rate = max(minimum, min(maximum, initial))
+        self.increase = increase
+        self.decrease = decrease
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+
+    async def wait(self):
+        """Keyingi yuborish vaqti kelguncha kutish (rate bo'yicha tekis taqsimlanadi)"""
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(now, self._next_slot, self._paused_until)
+        self._next_slot = slot + 1 / self.rate
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def on_success(self):
+        self.rate = min(self.maximum, self.rate + self.increase / self.rate)
+
+    def on_retry_after(self, retry_after: float):
+        now = asyncio.get_running_loop().time()
+        if now < self._paused_until:
+            return
+        self.rate = max(self.minimum, self.rate * self.decrease)
+        self._paused_until = now + retry_after
+        self._next_slot = self._paused_until
+        logger.warning(f"Broadcast hit flood control, pausing {retry_after}s, rate -> {self.rate:.1f} msg/s")
+
+
+def format_progress(broadcast: Broadcast, status: str, sent: int, failed: int, rate: float) -> str:
+    """Admin'ga ko'rsatiladigan holat matni"""
+    remaining = max(0, broadcast.total - sent - failed)
+    titles = {
+        "RUNNING": "📤 Yuborilmoqda",
+        "PAUSED": "⏸ To'xtatildi",
+        "CANCELLED": "❌ Bekor qilindi",
+        "COMPLETED": "✅ Reklama yuborish yakunlandi!",
+    }
+    lines = [
+        f"{titles.get(status, status)} (#{broadcast.pk})\n",
+        f"✅ Muvaffaqiyatli: {sent}",
+        f"❌ Muvaffaqiyatsiz: {failed}",
+        f"⏳ Qolgan: {remaining}",
+        f"📈 Umumiy: {broadcast.total}",
+    ]
+    if status == "RUNNING" and rate > 0:
+        eta = timedelta(seconds=int(remaining / rate))
+        lines.append(f"⚡️ Tezlik: {rate:.1f} xabar/s, taxminan {eta} qoldi")
+    return "\n".join(lines)
+
+
+class ProgressReporter:
+    """
+    Edits the admin's status message with broadcast progress.
+
+    Updates are coalesced: between edits only the latest counters are kept
+    and an edit goes out at most once per ``interval`` seconds (final states
+    are always written). editMessageText is not a send method, so these
+    edits never take tokens from the SendScheduler budget.
+    """
+
+    def __init__(self, bot: "Bot", broadcast: Broadcast, interval: float):
+        self.bot = bot
+        self.broadcast = broadcast
+        self.interval = interval
+        self._last_edit = 0.0
+        self._last_text = None
+
+    async def update(self, status: str, sent: int, failed: int, rate: float, force: bool = False):
+        if self.broadcast.status_message_id is None:
+            return
+        now = asyncio.get_running_loop().time()
+        if not force and now - self._last_edit < self.interval:
+            return
+
+        text = format_progress(self.broadcast, status, sent, failed, rate)
+        if text == self._last_text:
+            return
+
+        if status in ACTIVE_STATUSES or status == "PAUSED":
+            keyboard = get_broadcast_keyboard(self.broadcast.pk, paused=status == "PAUSED")
+        else:
+            keyboard = None
+
+        self._last_edit = now
+        try:
+            await self.bot.edit_message_text(
+                text=text,
+                chat_id=self.broadcast.status_chat_id,
+                message_id=self.broadcast.status_message_id,
+                reply_markup=keyboard,
+            )
+            self._last_text = text
+        except TelegramRetryAfter as e:
+            # Keyingi tahrirni flood control tugagandan keyin qilamiz
+            self._last_edit = now + e.retry_after
+        except Exception as e:
+            logger.warning(f"Broadcast {self.broadcast.pk} progress edit failed: {e}")
+
+
+class BroadcastRunner:
+    """
+    Sends one broadcast in chunks, checkpointing after every chunk.
+
+    Recipients are read from the filter with a keyset cursor on the user
+    pk, so memory stays flat however large the audience is. A chunk's
+    delivery rows are created in SENDING before the first message goes out
+    and its results are written in one transaction afterwards, so a crash
+    can only leave the current chunk in SENDING; the next run fails those
+    instead of sending them twice. The status is re-read at every checkpoint,
+    which is how pause and cancel reach a running worker.
+
+    Inside a chunk up to ``concurrency`` messages are in flight, paced by
+    an ``AdaptiveRate``; the global SendScheduler still caps all senders.
+    """
+
+    def __init__(
+        self,
+        broadcast_id: int,
+        bot: "Bot",
+        chunk_size: int = 100,
+        concurrency: int = 10,
+        rate: Optional[AdaptiveRate] = None,
+    ):
+        self.broadcast_id = broadcast_id
+        self.bot = bot
+        self.chunk_size = chunk_size
+        self.concurrency = max(1, concurrency)
+        self.rate = rate or AdaptiveRate(
+            initial=settings.BROADCAST_MAX_RATE,
+            minimum=settings.BROADCAST_MIN_RATE,
+            maximum=settings.BROADCAST_MAX_RATE,
+        )
+        self.sent = 0
+        self.failed = 0
+        self.blocked_ids: List[str] = []
+        self.base_sent = 0
+        self.base_failed = 0
+        self.started = None
+
+    @property
+    def throughput(self) -> float:
+        """Shu run davomida o'rtacha tezlik (xabar/s)"""
+        if self.started is None:
+            return 0.0
+        elapsed = asyncio.get_running_loop().time() - self.started
+        return (self.sent + self.failed) / elapsed if elapsed > 0 else 0.0
+
+    async def run(self):
+        token = await claim_broadcast(self.broadcast_id)
+        if token is None:
+            logger.info(f"Broadcast {self.broadcast_id} is not claimable, skipping")
+            return
+
+        interrupted = await fail_interrupted_deliveries(self.broadcast_id)
+        if interrupted:
+            logger.warning(
+                f"Broadcast {self.broadcast_id}: {interrupted} deliveries interrupted by a crash, not resent"
+            )
+        # Oldingi run'lar natijasi progress'ga qo'shiladi
+        broadcast = await get_broadcast(self.broadcast_id)
+        self.base_sent, self.base_failed = broadcast.sent_count, broadcast.failed_count
+        progress = ProgressReporter(self.bot, broadcast, settings.BROADCAST_PROGRESS_INTERVAL)
+
+        heartbeat_task = asyncio.create_task(self._heartbeat(token))
+        self.started = asyncio.get_running_loop().time()
+        try:
+            while True:
+                status = await heartbeat(self.broadcast_id, token)
+                if status not in ACTIVE_STATUSES:
+                    logger.info(f"Broadcast {self.broadcast_id} stopped (status={status})")
+                    if status is not None:
+                        await self._report(progress, status, force=True)
+                    break
+
+                chunk = await take_delivery_chunk(broadcast, self.chunk_size)
+                if not chunk:
+                    await finish_broadcast(self.broadcast_id, token)
+                    logger.info(f"Broadcast {self.broadcast_id} completed")
+                    await self._report(progress, "COMPLETED", force=True)
+                    break
+
+                self.blocked_ids = []
+                results = await self._send_chunk(broadcast, chunk)
+                await save_delivery_results(self.broadcast_id, results, self.blocked_ids)
+                logger.info(
+                    f"Broadcast {self.broadcast_id}: {self.sent} sent, {self.failed} failed, "
+                    f"{self.throughput:.1f} msg/s (limit {self.rate.rate:.1f})"
+                )
+                await self._report(progress, "RUNNING")
+        finally:
+            heartbeat_task.cancel()
+            await release_broadcast(self.broadcast_id, token)
+
+    async def _report(self, progress: ProgressReporter, status: str, force: bool = False):
+        await progress.update(
+            status,
+            sent=self.base_sent + self.sent,
+            failed=self.base_failed + self.failed,
+            rate=self.throughput,
+            force=force,
+        )
+
+    async def _send_chunk(self, broadcast: Broadcast, chunk: List[Tuple[int, str]]) -> List[Tuple[int, str, str]]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def send(delivery_id, chat_id):
+            async with semaphore:
+                return await self._send(broadcast, delivery_id, chat_id)
+
+        with bulk_sending():
+            return await asyncio.gather(*(send(delivery_id, chat_id) for delivery_id, chat_id in chunk))
+
+    async def _send(self, broadcast: Broadcast, delivery_id: int, chat_id, attempts: int = 3) -> Tuple[int, str, str]:
+        for attempt in range(attempts):
+            await self.rate.wait()
+            try:
+                # Copy the message without showing sender info (hides sender name)
+                await self.bot.copy_message(
+                    chat_id=chat_id,
+                    from_chat_id=broadcast.from_chat_id,
+                    message_id=broadcast.message_id,
+                    protect_content=False,
+                )
+                self.rate.on_success()
+                self.sent += 1
+                return delivery_id, "SENT", ""
+            except TelegramRetryAfter as e:
+                self.rate.on_retry_after(e.retry_after)
+                error = e
+            except Exception as e:
+                error = e
+                break
+
+        logger.warning(f"Failed to send ad to user {chat_id}: {error}")
+        if is_undeliverable(error):
+            self.blocked_ids.append(chat_id)
+        self.failed += 1
+        return delivery_id, "FAILED", str(error)[:255]
+
+    async def _heartbeat(self, token: str):
+        # Uzoq 429 kutishlarida ham lease eskirmasligi uchun
+        interval = max(1, settings.BROADCAST_HEARTBEAT_TIMEOUT / 4)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await heartbeat(self.broadcast_id, token)
+            except Exception as e:
+                logger.warning(f"Broadcast {self.broadcast_id} heartbeat failed: {e}")
@@ -0,0 +1,74 @@
+import logging
+from collections import OrderedDict
+
+from bot.utils.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateDeduplicator:
+    """
+    Drops Telegram updates that were already seen, keyed by ``update_id``.
+
+    A bounded in-memory LRU catches retries hitting the same process; with
+    ``use_redis`` a ``SET NX EX`` key makes the check shared between workers.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 10000,
+        use_redis: bool = False,
+        redis_ttl: int = 3600,
+        key_prefix: str = "tg:update:",
+    ):
+        self.maxsize = maxsize
+        self.use_redis = use_redis
+        self.redis_ttl = redis_ttl
+        self.key_prefix = key_prefix
+        self.dropped = 0
+        self._seen: OrderedDict = OrderedDict()
+
+    async def is_duplicate(self, update_id: int) -> bool:
+        """Update avval ko'rilganmi? Yangi bo'lsa uni ko'rilgan deb belgilaydi"""
+        if update_id in self._seen:
+            self._seen.move_to_end(update_id)
+            return self._drop(update_id)
+
+        self._remember(update_id)
+
+        if self.use_redis:
+            client = get_redis()
+            if client is not None:
+                try:
+                    created = await client.set(
+                        f"{self.key_prefix}{update_id}", 1, nx=True, ex=self.redis_ttl
+                    )
+                    if not created:
+                        return self._drop(update_id)
+                except Exception as e:
+                    # Redis ishlamasa faqat lokal LRU bilan davom etamiz
+                    logger.warning(f"Redis dedup check failed for update {update_id}: {e}")
+
+        return False
+
+    async def forget(self, update_id: int):
+        """Qayta ishlash muvaffaqiyatsiz bo'lsa, Telegram retry'ini qabul qilish uchun"""
+        self._seen.pop(update_id, None)
+
+        if self.use_redis:
+            client = get_redis()
+            if client is not None:
+                try:
+                    await client.delete(f"{self.key_prefix}{update_id}")
+                except Exception as e:
+                    logger.warning(f"Redis dedup forget failed for update {update_id}: {e}")
+
+    def _remember(self, update_id: int):
+        self._seen[update_id] = True
+        if len(self._seen) > self.maxsize:
+            self._seen.popitem(last=False)
+
+    def _drop(self, update_id: int) -> bool:
+        self.dropped += 1
+        logger.info(f"Duplicate update {update_id} dropped (total dropped: {self.dropped})")
+        return True
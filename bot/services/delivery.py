@@ -0,0 +1,67 @@
+import logging
+from typing import Iterable, Optional, Union
+
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+
+from bot.models import TelegramUser
+
+logger = logging.getLogger(__name__)
+
+# Bu xatolar vaqtinchalik emas - keyingi yuborishlar ham muvaffaqiyatsiz bo'ladi
+UNDELIVERABLE_DESCRIPTIONS = (
+    "bot was blocked by the user",
+    "user is deactivated",
+    "chat not found",
+    "bot can't initiate conversation",
+    "peer_id_invalid",
+)
+
+
+def is_undeliverable(error: Union[Exception, str, None], error_code: Optional[int] = None) -> bool:
+    """
+    Xato foydalanuvchiga umuman yetkazib bo'lmasligini bildiradimi.
+
+    error - aiogram exception yoki Bot API javobidagi description.
+    """
+    if error_code == 403:
+        return True
+    if isinstance(error, Exception):
+        # aiogram faqat shu yerda import qilinadi: exception kelgan bo'lsa u allaqachon
+        # yuklangan, Celery/manage.py esa delivery'ni import qilganda aiogram'ni yuklamaydi
+        from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+
+        if isinstance(error, TelegramForbiddenError):
+            return True
+        if not isinstance(error, TelegramBadRequest):
+            return False
+    description = str(error or "").lower()
+    return any(text in description for text in UNDELIVERABLE_DESCRIPTIONS)
+
+
+def mark_users_blocked(telegram_ids: Iterable) -> int:
+    """Yetkazib bo'lmaydigan foydalanuvchilarni bitta UPDATE bilan belgilash"""
+    telegram_ids = {str(telegram_id) for telegram_id in telegram_ids}
+    if not telegram_ids:
+        return 0
+    updated = TelegramUser.objects.filter(
+        telegram_id__in=telegram_ids, is_blocked=False
+    ).update(is_blocked=True, blocked_at=timezone.now())
+    if updated:
+        logger.info(f"Marked {updated} users as blocked (undeliverable)")
+    return updated
+
+
+def unblock_user(telegram_id) -> int:
+    """
+    Foydalanuvchi botga qayta yozdi - avtomatik qo'yilgan blokni olib tashlash.
+
+    blocked_at bo'lmasa blok admin tomonidan qo'yilgan, unga tegilmaydi.
+    """
+    return TelegramUser.objects.filter(
+        telegram_id=str(telegram_id), is_blocked=True, blocked_at__isnull=False
+    ).update(is_blocked=False, blocked_at=None)
+
+
+amark_users_blocked = sync_to_async(mark_users_blocked)
+aunblock_user = sync_to_async(unblock_user)
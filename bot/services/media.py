@@ -0,0 +1,135 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Optional, Tuple, Union
+
+from asgiref.sync import sync_to_async
+
+from bot.models import MediaFile
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+    from aiogram.types import Message
+
+logger = logging.getLogger(__name__)
+
+# Faqat shu xatolar saqlangan file_id yaroqsizligini bildiradi
+# (caption, parse_mode, reply_markup xatolarida file_id to'g'ri)
+STALE_FILE_ID_DESCRIPTIONS = (
+    "wrong file identifier",
+    "wrong remote file identifier",
+    "file reference expired",
+)
+
+
+def is_stale_file_id_error(error: Exception) -> bool:
+    """Bad Request saqlangan file_id tufaylimi"""
+    description = str(error).lower().replace("_", " ")
+    return any(text in description for text in STALE_FILE_ID_DESCRIPTIONS)
+
+
+@sync_to_async
+def get_media_file_id(path: str, content_hash: str, file_type: str) -> Optional[str]:
+    return (
+        MediaFile.objects.filter(path=path, content_hash=content_hash, file_type=file_type)
+        .values_list("file_id", flat=True)
+        .first()
+    )
+
+
+@sync_to_async
+def save_media_file_id(path: str, content_hash: str, file_type: str, file_id: str):
+    MediaFile.objects.update_or_create(
+        path=path,
+        content_hash=content_hash,
+        file_type=file_type,
+        defaults={"file_id": file_id},
+    )
+
+
+@sync_to_async
+def delete_media_file_id(path: str, content_hash: str, file_type: str):
+    MediaFile.objects.filter(path=path, content_hash=content_hash, file_type=file_type).delete()
+
+
+class MediaRegistry:
+    """
+    Sends local files by Telegram file_id once they have been uploaded.
+
+    The first send uploads the file and stores the returned file_id in
+    MediaFile under (path, sha256 of the content). Later sends reference the
+    file_id, so no bytes are uploaded again. The content hash is cached per
+    (mtime, size), so the file is only re-read when it changes on disk.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._digests: dict = {}
+        self._file_ids: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def digest(self, path: str) -> str:
+        """Fayl tarkibining sha256 xeshi (fayl o'zgarmagan bo'lsa keshdan)"""
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._digests.get(path)
+        if cached and cached[0] == signature:
+            return cached[1]
+
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(65536), b""):
+                sha.update(block)
+        digest = sha.hexdigest()
+        with self._lock:
+            self._digests[path] = (signature, digest)
+        return digest
+
+    async def send_photo(self, bot: "Bot", chat_id: Union[int, str], path: str, **kwargs) -> "Message":
+        """Rasm yuborish: file_id bo'lsa u bilan, aks holda yuklab file_id'ni saqlash"""
+        # aiogram faqat yuborishda kerak - bot.signals orqali django.setup()'da yuklanmasin
+        from aiogram.exceptions import TelegramBadRequest
+        from aiogram.types import FSInputFile
+
+        key = ("photo", path, await sync_to_async(self.digest)(path))
+        file_id = self._file_ids.get(key) or await get_media_file_id(path, key[2], "photo")
+
+        if file_id:
+            try:
+                message = await bot.send_photo(chat_id=chat_id, photo=file_id, **kwargs)
+                self._remember(key, file_id)
+                return message
+            except TelegramBadRequest as e:
+                if not is_stale_file_id_error(e):
+                    raise
+                # file_id endi yaroqsiz (masalan, bot token almashgan) - qayta yuklaymiz
+                logger.warning(f"Cached file_id for {path} rejected, re-uploading: {e}")
+                self._file_ids.pop(key, None)
+                await delete_media_file_id(path, key[2], "photo")
+
+        message = await bot.send_photo(chat_id=chat_id, photo=FSInputFile(path), **kwargs)
+        file_id = message.photo[-1].file_id
+        await save_media_file_id(path, key[2], "photo", file_id)
+        self._remember(key, file_id)
+        return message
+
+    def forget(self, path: str) -> int:
+        """Fayl o'zgardi/o'chirildi - uning barcha file_id'larini o'chirish (sinxron)"""
+        with self._lock:
+            self._digests.pop(path, None)
+        for key in [key for key in self._file_ids if key[1] == path]:
+            self._file_ids.pop(key, None)
+        deleted, _ = MediaFile.objects.filter(path=path).delete()
+        return deleted
+
+    def _remember(self, key: Tuple[str, str, str], file_id: str):
+        self._file_ids[key] = file_id
+        self._file_ids.move_to_end(key)
+        if len(self._file_ids) > self.maxsize:
+            self._file_ids.popitem(last=False)
+
+
+media_registry = MediaRegistry()
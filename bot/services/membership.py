@@ -0,0 +1,365 @@
+import asyncio
+import logging
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from bot.models import ChannelMembership, MandatoryChannel
+from bot.utils.cache import reference_cache
+from bot.utils.redis import get_redis
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+
+logger = logging.getLogger(__name__)
+
+# Bu statuslarda foydalanuvchi kanalga a'zo emas deb hisoblanadi
+NOT_MEMBER_STATUSES = ("left", "kicked")
+# Bu statuslarda bot chat_member update'larini oladi
+ADMIN_STATUSES = ("administrator", "creator")
+
+
+class MembershipCache:
+    """
+    (user_id, channel_id) membership cache with separate TTLs.
+
+    Positive results live longer than negative ones so a user who has just
+    joined is not blocked for long. L1 is a bounded per-process LRU, L2 is
+    Redis so all workers share results.
+    """
+
+    def __init__(
+        self,
+        positive_ttl: int = 300,
+        negative_ttl: int = 30,
+        maxsize: int = 50000,
+        key_prefix: str = "tg:member:",
+    ):
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.maxsize = maxsize
+        self.key_prefix = key_prefix
+        self._local: OrderedDict = OrderedDict()
+
+    async def get(self, user_id: int, channel_id: int) -> Optional[bool]:
+        """Keshdagi a'zolik holati (True/False) yoki kesh bo'sh bo'lsa None"""
+        key = (user_id, channel_id)
+        entry = self._local.get(key)
+        if entry is not None:
+            is_member, expires_at = entry
+            if expires_at > time.monotonic():
+                self._local.move_to_end(key)
+                return is_member
+            del self._local[key]
+
+        client = get_redis()
+        if client is None:
+            return None
+
+        try:
+            pipe = client.pipeline()
+            pipe.get(self._redis_key(user_id, channel_id))
+            pipe.ttl(self._redis_key(user_id, channel_id))
+            value, ttl = await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Redis membership cache read failed: {e}")
+            return None
+
+        if value is None:
+            return None
+
+        is_member = value == b"1"
+        if ttl and ttl > 0:
+            self._set_local(key, is_member, ttl)
+        return is_member
+
+    async def set(self, user_id: int, channel_id: int, is_member: bool):
+        ttl = self.positive_ttl if is_member else self.negative_ttl
+        self._set_local((user_id, channel_id), is_member, ttl)
+
+        client = get_redis()
+        if client is None:
+            return
+
+        try:
+            await client.set(
+                self._redis_key(user_id, channel_id), "1" if is_member else "0", ex=ttl
+            )
+        except Exception as e:
+            logger.warning(f"Redis membership cache write failed: {e}")
+
+    def _set_local(self, key: tuple, is_member: bool, ttl: int):
+        self._local[key] = (is_member, time.monotonic() + ttl)
+        self._local.move_to_end(key)
+        if len(self._local) > self.maxsize:
+            self._local.popitem(last=False)
+
+    def _redis_key(self, user_id: int, channel_id: int) -> str:
+        return f"{self.key_prefix}{channel_id}:{user_id}"
+
+
+membership_cache = MembershipCache(
+    positive_ttl=settings.MEMBERSHIP_CACHE_POSITIVE_TTL,
+    negative_ttl=settings.MEMBERSHIP_CACHE_NEGATIVE_TTL,
+)
+
+
+def _chat_filter(chat_id: int, username: Optional[str]) -> Q:
+    """Telegram chat'ga mos MandatoryChannel'lar (telegram_id yoki @username/link bo'yicha)"""
+    query = Q(resolved_chat_id=chat_id) | Q(telegram_id=str(chat_id))
+    if username:
+        query |= Q(telegram_id__iexact=f"@{username}") | Q(link__iendswith=f"/{username}")
+    return query
+
+
+@sync_to_async
+def set_bot_admin_status(chat_id: int, username: Optional[str], is_admin: bool) -> int:
+    """my_chat_member: bot kanalda admin bo'ldimi yoki yo'qmi"""
+    updated = MandatoryChannel.objects.filter(_chat_filter(chat_id, username)).update(
+        bot_is_admin=is_admin
+    )
+    if updated:
+        # update() signal yubormaydi - kanallar keshini qo'lda yangilaymiz
+        reference_cache.invalidate("channels")
+    return updated
+
+
+@sync_to_async
+def save_chat_membership(chat_id: int, username: Optional[str], user_id: int, status: str) -> List[int]:
+    """chat_member update'ini indeksga yozish. Mos kanal id'larini qaytaradi"""
+    channel_ids = list(
+        MandatoryChannel.objects.filter(_chat_filter(chat_id, username), is_active=True)
+        .values_list("id", flat=True)
+    )
+    for channel_id in channel_ids:
+        ChannelMembership.objects.update_or_create(
+            channel_id=channel_id, user_id=user_id, defaults={"status": status}
+        )
+    return channel_ids
+
+
+@sync_to_async
+def save_membership(channel_id: int, user_id: int, status: str):
+    ChannelMembership.objects.update_or_create(
+        channel_id=channel_id, user_id=user_id, defaults={"status": status}
+    )
+
+
+@sync_to_async
+def get_indexed_memberships(user_id: int, channel_ids: List[int], max_age: int) -> Dict[int, str]:
+    """
+    Indeksdagi yangi statuslar: {channel_id: status}.
+
+    max_age soniyadan eski yozuvlar qaytarilmaydi - chat_member update'i
+    kelmay qolgan bo'lsa (webhook allowed_updates'siz) a'zolik qayta tekshiriladi.
+    """
+    return dict(
+        ChannelMembership.objects.filter(
+            user_id=user_id,
+            channel_id__in=channel_ids,
+            updated_at__gte=timezone.now() - timedelta(seconds=max_age),
+        ).values_list("channel_id", "status")
+    )
+
+
+@dataclass
+class MembershipCheckResult:
+    """Bir foydalanuvchi uchun barcha majburiy kanallarni tekshirish natijasi"""
+
+    subscribed: List = field(default_factory=list)
+    not_subscribed: List = field(default_factory=list)
+    # Tekshirib bo'lmagan kanallar (API xatosi yoki timeout) - a'zo emas deb hisoblanadi
+    failed: List = field(default_factory=list)
+    timed_out: bool = False
+
+    @property
+    def missing(self) -> List:
+        """Foydalanuvchiga ko'rsatiladigan kanallar (a'zo emas + tekshirib bo'lmagan)"""
+        return self.not_subscribed + self.failed
+
+    @property
+    def is_subscribed(self) -> bool:
+        return not self.not_subscribed and not self.failed
+
+
+def get_chat_identifiers(channel) -> List:
+    """
+    Kanal uchun getChatMember identifikatorlari.
+
+    Avval aniqlangan raqamli ID (resolve_mandatory_channels), keyin
+    telegram_id, oxirida link'dagi username.
+    """
+    identifiers = []
+    if channel.resolved_chat_id:
+        identifiers.append(channel.resolved_chat_id)
+    if channel.telegram_id and channel.telegram_id != str(channel.resolved_chat_id):
+        identifiers.append(channel.telegram_id)
+    if channel.link and channel.link.startswith("https://t.me/"):
+        identifiers.append("@" + channel.link.split("/")[-1])
+    return identifiers
+
+
+class MembershipChecker:
+    """
+    Checks a user against all mandatory Telegram channels concurrently.
+
+    Lookup order per channel: membership cache, then the push-fed
+    ``ChannelMembership`` index (only for channels where the bot is admin and
+    receives chat_member updates; rows older than ``index_ttl`` are ignored),
+    then getChatMember, which also refreshes the index row. Polls run
+    concurrently; a per-channel semaphore caps in-flight calls for one
+    channel and ``timeout`` bounds the whole check. Channels that error out
+    or do not answer in time are reported in ``failed`` and treated as not
+    subscribed, like before.
+    """
+
+    def __init__(
+        self,
+        cache: MembershipCache,
+        per_channel: int = 10,
+        timeout: float = 5,
+        index_ttl: int = 21600,
+    ):
+        self.cache = cache
+        self.per_channel = max(1, per_channel)
+        self.timeout = timeout
+        self.index_ttl = index_ttl
+        # Semaforlar event loop'ga bog'lanadi, shuning uchun har loop uchun alohida
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[int, asyncio.Semaphore]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    async def check(
+        self,
+        bot: "Bot",
+        user_id: int,
+        channels: Sequence,
+        use_cache: bool = True,
+    ) -> MembershipCheckResult:
+        """
+        Faqat Telegram kanallarini tekshiradi.
+
+        use_cache=False bo'lsa kesh va indeksdan o'qimaydi (majburiy
+        yangilash), lekin yangi natijalarni baribir ularga yozadi.
+        """
+        result = MembershipCheckResult()
+        telegram_channels = [ch for ch in channels if ch.is_telegram]
+        if not telegram_channels:
+            return result
+
+        deadline = time.monotonic() + self.timeout
+        known: Dict[int, bool] = {}
+        if use_cache:
+            known = await self._lookup_known(user_id, telegram_channels)
+
+        to_poll = [ch for ch in telegram_channels if ch.id not in known]
+        tasks = {
+            asyncio.ensure_future(self._poll_channel(bot, user_id, channel)): channel
+            for channel in to_poll
+        }
+        pending = set()
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=max(0, deadline - time.monotonic()))
+
+        if pending:
+            result.timed_out = True
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            logger.warning(
+                f"Membership check for user {user_id} timed out after {self.timeout}s "
+                f"({len(pending)}/{len(telegram_channels)} channels unanswered)"
+            )
+
+        polled = {channel.id: task for task, channel in tasks.items()}
+        # Natija tartibi kanallar tartibiga mos bo'lishi uchun
+        for channel in telegram_channels:
+            if channel.id in known:
+                is_member = known[channel.id]
+            else:
+                task = polled[channel.id]
+                is_member = None if task in pending else task.result()
+
+            if is_member is None:
+                result.failed.append(channel)
+            elif is_member:
+                result.subscribed.append(channel)
+            else:
+                result.not_subscribed.append(channel)
+
+        return result
+
+    async def _lookup_known(self, user_id: int, channels: List) -> Dict[int, bool]:
+        """Kesh va indeksdan ma'lum bo'lgan a'zoliklar: {channel_id: is_member}"""
+        cached = await asyncio.gather(*(self.cache.get(user_id, ch.id) for ch in channels))
+        known = {ch.id: value for ch, value in zip(channels, cached) if value is not None}
+
+        # Indeks faqat bot admin bo'lgan kanallar uchun ishonchli
+        indexed_ids = [ch.id for ch in channels if ch.bot_is_admin and ch.id not in known]
+        if not indexed_ids:
+            return known
+
+        try:
+            indexed = await get_indexed_memberships(user_id, indexed_ids, self.index_ttl)
+        except Exception as e:
+            logger.warning(f"Membership index read failed: {e}")
+            return known
+
+        for channel_id, status in indexed.items():
+            is_member = status not in NOT_MEMBER_STATUSES
+            known[channel_id] = is_member
+            await self.cache.set(user_id, channel_id, is_member)
+        return known
+
+    async def _poll_channel(self, bot: "Bot", user_id: int, channel) -> Optional[bool]:
+        """getChatMember orqali tekshirish: True/False yoki aniqlab bo'lmasa None"""
+        identifiers = get_chat_identifiers(channel)
+        if not identifiers:
+            logger.error(f"Kanal {channel.name} uchun hech qanday to'g'ri identifikator topilmadi")
+            return None
+
+        async with self._semaphore_for(channel.id):
+            for chat_identifier in identifiers:
+                try:
+                    member = await bot.get_chat_member(chat_id=chat_identifier, user_id=user_id)
+                except Exception as e:
+                    logger.warning(f"getChatMember {chat_identifier} ({channel.name}) failed: {e}")
+                    continue
+
+                is_member = member.status not in NOT_MEMBER_STATUSES
+                # API xatolari keshlanmaydi, faqat aniq javob
+                await self.cache.set(user_id, channel.id, is_member)
+                if channel.bot_is_admin:
+                    # Indeksda yo'q edi - keyingi o'zgarishlar chat_member orqali keladi
+                    try:
+                        await save_membership(channel.id, user_id, member.status)
+                    except Exception as e:
+                        logger.warning(f"Membership index write failed: {e}")
+                return is_member
+
+        return None
+
+    def _semaphore_for(self, channel_id: int) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphores = self._semaphores.setdefault(loop, {})
+        semaphore = semaphores.get(channel_id)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.per_channel)
+            semaphores[channel_id] = semaphore
+        return semaphore
+
+
+membership_checker = MembershipChecker(
+    cache=membership_cache,
+    per_channel=settings.MEMBERSHIP_CHECK_PER_CHANNEL,
+    timeout=settings.MEMBERSHIP_CHECK_TIMEOUT,
+    index_ttl=settings.MEMBERSHIP_INDEX_TTL,
+)
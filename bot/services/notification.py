@@ -1,8 +1,21 @@
-import aiohttp
 import asyncio
+import weakref
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Iterable
+import aiohttp
 from datetime import datetime, timedelta
 from django.utils import timezone
-from core.settings import TELEGRAM_BOT_TOKEN
+from core.settings import (
+    TELEGRAM_BOT_TOKEN,
+    TELEGRAM_NOTIFY_BULK_CONCURRENCY,
+    TELEGRAM_NOTIFY_DNS_TTL,
+    TELEGRAM_NOTIFY_POOL_SIZE,
+    TELEGRAM_NOTIFY_TIMEOUT,
+    TELEGRAM_SEND_MAX_RETRY_AFTER,
+)
+from bot.services.delivery import amark_users_blocked, is_undeliverable
+from bot.services.send_scheduler import BULK, bulk_sending, send_lane, send_scheduler
+from bot.utils.event_loops import is_long_lived_loop
 import logging
 
 # Logger yaratish
@@ -14,9 +27,72 @@ BASE_URL = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}"
 
 class TelegramNotification:
     """Telegram API orqali xabar yuborish uchun klass"""
+
+    base_url = BASE_URL
+    # aiohttp sessiyasi event loop'ga bog'langan - har bir loop uchun bitta (connection pool)
+    _sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]" = (
+        weakref.WeakKeyDictionary()
+    )
+
+    @staticmethod
+    def _create_session() -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=TELEGRAM_NOTIFY_POOL_SIZE,
+            ttl_dns_cache=TELEGRAM_NOTIFY_DNS_TTL,
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=TELEGRAM_NOTIFY_TIMEOUT),
+        )
+
+    @classmethod
+    def get_session(cls) -> aiohttp.ClientSession:
+        """Joriy loop uchun umumiy (keep-alive) HTTP sessiya"""
+        loop = asyncio.get_running_loop()
+        session = cls._sessions.get(loop)
+        if session is None or session.closed:
+            session = cls._create_session()
+            cls._sessions[loop] = session
+        return session
+
+    @classmethod
+    @asynccontextmanager
+    async def session_scope(cls, session: aiohttp.ClientSession = None):
+        """
+        So'rovlar uchun HTTP sessiya.
+
+        Uzoq yashaydigan loop'da (register_long_lived_loop) umumiy pool
+        ishlatiladi. Boshqa loop'larda (signal/admin'dagi async_to_sync, WSGI
+        so'rovi) blok uchun vaqtinchalik sessiya ochilib oxirida yopiladi -
+        aks holda loop yopilgach sessiya yopilmay qoladi.
+        """
+        if session is not None:
+            yield session
+        elif is_long_lived_loop():
+            yield cls.get_session()
+        else:
+            session = cls._create_session()
+            try:
+                yield session
+            finally:
+                await session.close()
+
+    @classmethod
+    async def close(cls):
+        """Joriy loop sessiyasini yopish (shutdown hook)"""
+        session = cls._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None and not session.closed:
+            await session.close()
     
     @staticmethod
-    async def send_message(chat_id: str, text: str, parse_mode: str = "HTML", disable_web_page_preview: bool = True):
+    async def send_message(
+        chat_id: str,
+        text: str,
+        parse_mode: str = "HTML",
+        disable_web_page_preview: bool = True,
+        reply_markup: dict = None,
+        session: aiohttp.ClientSession = None,
+    ):
         """
         Telegram API orqali xabar yuborish
         
@@ -25,11 +101,13 @@ class TelegramNotification:
             text: Yuborilishi kerak bo'lgan xabar matni
             parse_mode: Xabar formatlash turi (HTML yoki Markdown)
             disable_web_page_preview: Web preview o'chirish
+            reply_markup: Klaviatura (JSON ko'rinishida)
+            session: Ko'p xabar yuboruvchilar uchun umumiy sessiya (session_scope)
         
         Returns:
             dict: API javob natijasi
         """
-        url = f"{BASE_URL}/sendMessage"
+        url = f"{TelegramNotification.base_url}/sendMessage"
         
         payload = {
             "chat_id": chat_id,
@@ -37,27 +115,13 @@ class TelegramNotification:
             "parse_mode": parse_mode,
             "disable_web_page_preview": disable_web_page_preview
         }
+        if reply_markup:
+            payload["reply_markup"] = reply_markup
         
+        lane = send_lane.get()
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=payload) as response:
-                    result = await response.json()
-                    
-                    if response.status == 200 and result.get("ok"):
-                        logger.info(f"Message sent successfully to {chat_id}")
-                        return {
-                            "success": True,
-                            "message_id": result["result"]["message_id"],
-                            "chat_id": chat_id
-                        }
-                    else:
-                        logger.error(f"Failed to send message to {chat_id}: {result}")
-                        return {
-                            "success": False,
-                            "error": result.get("description", "Unknown error"),
-                            "error_code": result.get("error_code")
-                        }
-                        
+            async with TelegramNotification.session_scope(session) as http:
+                return await TelegramNotification._post_message(http, url, payload, lane)
         except Exception as e:
             logger.error(f"Exception while sending message to {chat_id}: {str(e)}")
             return {
@@ -65,6 +129,47 @@ class TelegramNotification:
                 "error": str(e)
             }
 
+    @staticmethod
+    async def _post_message(session: aiohttp.ClientSession, url: str, payload: dict, lane) -> dict:
+        """sendMessage so'rovi: send_scheduler navbati va 429 bo'lsa qayta urinish"""
+        chat_id = payload["chat_id"]
+        attempt = 0
+        while True:
+            attempt += 1
+            await send_scheduler.acquire(chat_id, lane)
+            async with session.post(url, json=payload) as response:
+                result = await response.json()
+
+            if response.status == 200 and result.get("ok"):
+                logger.info(f"Message sent successfully to {chat_id}")
+                return {
+                    "success": True,
+                    "message_id": result["result"]["message_id"],
+                    "chat_id": chat_id
+                }
+
+            retry_after = result.get("parameters", {}).get("retry_after")
+            if response.status == 429 and retry_after:
+                # Flood control: chat (BULK bo'lsa butun lane) to'xtatiladi
+                await send_scheduler.block(
+                    chat_id, retry_after, lane=BULK if lane == BULK else None
+                )
+                if (
+                    lane != BULK
+                    and attempt <= 2
+                    and retry_after <= TELEGRAM_SEND_MAX_RETRY_AFTER
+                ):
+                    logger.warning(f"Flood control for {chat_id}, retrying in {retry_after}s")
+                    continue
+
+            logger.error(f"Failed to send message to {chat_id}: {result}")
+            return {
+                "success": False,
+                "error": result.get("description", "Unknown error"),
+                "error_code": result.get("error_code"),
+                "retry_after": retry_after,
+            }
+
     @staticmethod
     async def send_referrer_warning(referrer_telegram_id: str, advanced_user_name: str, 
                                    advanced_user_level: str, referrer_level: str):
@@ -231,48 +336,114 @@ Admin tomonidan sizning o'rningizga boshqa referrer belgilanadi.
         return await TelegramNotification.send_message(user_telegram_id, message)
 
     @staticmethod
-    async def send_bulk_message(user_ids: list, message: str):
+    async def _send_bulk_one(user_id, message: str, session: aiohttp.ClientSession = None) -> dict:
+        """Bitta qabul qiluvchi (BULK lane, 429 bo'lsa bir marta qayta urinish)"""
+        try:
+            with bulk_sending():
+                result = await TelegramNotification.send_message(user_id, message, session=session)
+                if not result["success"] and result.get("retry_after"):
+                    # Lane blok tugaguncha acquire kutadi, keyin bir marta qayta urinamiz
+                    result = await TelegramNotification.send_message(
+                        user_id, message, session=session
+                    )
+        except Exception as e:
+            logger.error(f"Error sending to {user_id}: {str(e)}")
+            result = {"success": False, "error": str(e)}
+        result["user_id"] = user_id
+        return result
+
+    @staticmethod
+    async def iter_bulk_message(
+        user_ids: Iterable,
+        message: str,
+        concurrency: int = TELEGRAM_NOTIFY_BULK_CONCURRENCY,
+        failures_only: bool = True,
+    ) -> AsyncIterator[dict]:
+        """
+        Xabarni parallel yuborib, xatolarni tayyor bo'lishi bilan qaytarish.
+
+        Bir vaqtda ko'pi bilan concurrency ta so'rov; user_ids oldindan
+        ro'yxatga aylantirilmaydi, shuning uchun generator ham berish mumkin.
+        Tezlik va 429 send_scheduler'da boshqariladi.
+
+        Standart holatda faqat muvaffaqiyatsiz natijalar ({"user_id", "error",
+        "error_code", ...}) qaytadi - katta ro'yxatda chaqiruvchi har bir
+        muvaffaqiyatli yuborishni olmaydi. failures_only=False bo'lsa barcha
+        natijalar ("success" bilan) qaytadi.
+        """
+        user_ids = iter(user_ids)
+        pending = set()
+
+        # Butun yuborish uchun bitta sessiya (vaqtinchalik loop'da oxirida yopiladi)
+        async with TelegramNotification.session_scope() as session:
+
+            def refill():
+                for user_id in user_ids:
+                    pending.add(asyncio.create_task(
+                        TelegramNotification._send_bulk_one(user_id, message, session)
+                    ))
+                    if len(pending) >= concurrency:
+                        return
+
+            refill()
+            try:
+                while pending:
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    pending.difference_update(done)
+                    refill()
+                    for task in done:
+                        result = task.result()
+                        if failures_only and result["success"]:
+                            continue
+                        yield result
+            finally:
+                # Chaqiruvchi iteratsiyani erta to'xtatsa qolgan so'rovlar bekor qilinadi
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    @staticmethod
+    async def send_bulk_message(
+        user_ids: Iterable, message: str, concurrency: int = TELEGRAM_NOTIFY_BULK_CONCURRENCY
+    ):
         """
         Bir nechta foydalanuvchiga xabar yuborish
         
         Args:
-            user_ids: Foydalanuvchilar telegram ID lari ro'yxati
+            user_ids: Foydalanuvchilar telegram ID lari
             message: Yuborilishi kerak bo'lgan xabar
+            concurrency: Bir vaqtdagi so'rovlar soni
         
         Returns:
-            dict: Yuborish natijasi statistikasi
+            dict: Yuborish natijasi statistikasi (failed_users - faqat xatolar)
         """
+        total = 0
         successful_sends = 0
-        failed_sends = 0
         failed_users = []
+        blocked_ids = []
+
+        async for result in TelegramNotification.iter_bulk_message(
+            user_ids, message, concurrency, failures_only=False
+        ):
+            total += 1
+            if result["success"]:
+                successful_sends += 1
+                continue
+
+            failed_users.append({
+                "user_id": result["user_id"],
+                "error": result["error"]
+            })
+            if is_undeliverable(result["error"], result.get("error_code")):
+                blocked_ids.append(result["user_id"])
         
-        for user_id in user_ids:
-            try:
-                result = await TelegramNotification.send_message(user_id, message)
-                if result["success"]:
-                    successful_sends += 1
-                else:
-                    failed_sends += 1
-                    failed_users.append({
-                        "user_id": user_id,
-                        "error": result["error"]
-                    })
-                
-                # Rate limiting uchun kichik kutish
-                await asyncio.sleep(0.1)
-                
-            except Exception as e:
-                failed_sends += 1
-                failed_users.append({
-                    "user_id": user_id,
-                    "error": str(e)
-                })
-                logger.error(f"Error sending to {user_id}: {str(e)}")
+        # Keyingi ommaviy yuborishlar ularni o'tkazib yuboradi
+        await amark_users_blocked(blocked_ids)
         
         return {
-            "total": len(user_ids),
+            "total": total,
             "successful": successful_sends,
-            "failed": failed_sends,
+            "failed": len(failed_users),
             "failed_users": failed_users
         }
 
@@ -369,4 +540,34 @@ async def send_message_to_all_admins(message: str):
             "failed": 1,
             "failed_users": [],
             "error": str(e)
-        }
\ No newline at end of file
+        }
+
+
+async def queue_message_to_all_admins(
+    message: str, notification_type: str = "SYSTEM_MESSAGE", title: str = "Admin xabari"
+):
+    """
+    Adminlarga xabarni outbox orqali jamlab yuborish
+
+    Bir turdagi xabarlar har bir admin uchun NOTIFICATION_COALESCE_WINDOW
+    davomida yig'iladi va bitta digest bo'lib yuboriladi (send_message_to_all_admins
+    esa har bir hodisani darhol alohida yuboradi).
+
+    Args:
+        message: Xabar matni
+        notification_type: Jamlash turi (Notification.NOTIFICATION_TYPES)
+        title: Digest sarlavhasi
+
+    Returns:
+        dict: Navbatga qo'yilgan adminlar soni
+    """
+    from bot.services.outbox import acoalesce_for_admins
+
+    try:
+        queued = await acoalesce_for_admins(notification_type, title, message)
+        if not queued:
+            logger.warning("No admins found in database")
+        return {"total": queued, "queued": queued}
+    except Exception as e:
+        logger.error(f"Error queueing message to all admins: {str(e)}")
+        return {"total": 0, "queued": 0, "error": str(e)}
@@ -0,0 +1,290 @@
+import asyncio
+import logging
+import textwrap
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from bot.models import Notification, TelegramUser
+from bot.services.delivery import is_undeliverable, mark_users_blocked
+from bot.services.notification import TelegramNotification
+
+logger = logging.getLogger(__name__)
+
+# sendMessage matni uchun Telegram chegarasi
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+
+def enqueue_notification(
+    recipient: TelegramUser,
+    notification_type: str,
+    title: str,
+    message: str,
+    *,
+    payload: Optional[dict] = None,
+    extra_data: Optional[dict] = None,
+    sender: Optional[TelegramUser] = None,
+    dedupe_key: Optional[str] = None,
+    delay: float = 0,
+) -> Notification:
+    """
+    Bildirishnomani outbox'ga yozish (chaqiruvchining tranzaksiyasi ichida).
+
+    Telegramga yuborish commit'dan keyin dispatch_notifications'da bo'ladi:
+    tranzaksiya bekor qilinsa xabar ham ketmaydi, yozuvchi esa tarmoqni kutmaydi.
+    dedupe_key berilsa bitta hodisa uchun ikkinchi qator yozilmaydi.
+    """
+    fields = {
+        "recipient": recipient,
+        "sender": sender,
+        "notification_type": notification_type,
+        "title": title,
+        "message": message,
+        "payload": payload,
+        "extra_data": extra_data,
+        "next_attempt_at": timezone.now() + timedelta(seconds=delay),
+    }
+    if dedupe_key:
+        notification, created = Notification.objects.get_or_create(
+            dedupe_key=dedupe_key, defaults=fields
+        )
+    else:
+        notification, created = Notification.objects.create(**fields), True
+
+    if created:
+        transaction.on_commit(lambda: wake_dispatcher(delay))
+    return notification
+
+
+def render_digest(title: str, items: List[str]) -> str:
+    """Yig'ilgan xabarlarni bitta matnga birlashtirish"""
+    if len(items) == 1:
+        return items[0]
+    header = f"📬 <b>{title}</b> — {len(items)} ta xabar"
+    return header + "\n\n" + "\n\n➖➖➖➖➖\n\n".join(items)
+
+
+def coalesce_notification(
+    recipient: TelegramUser,
+    notification_type: str,
+    title: str,
+    message: str,
+    *,
+    window: float = None,
+    max_items: int = None,
+) -> Notification:
+    """
+    Bildirishnomani (recipient, type) bo'yicha ochiq digest'ga qo'shish.
+
+    Digest qatori window soniya kutadi va shu vaqtda kelgan xabarlar unga
+    qo'shiladi. max_items ga yetsa yoki matn Telegram chegarasidan oshsa
+    digest oynani kutmasdan yuboriladi. To'lgan yoki dispatcher olgan
+    (attempts > 0) qatorga qo'shilmaydi - yangi digest ochiladi.
+    """
+    window = settings.NOTIFICATION_COALESCE_WINDOW if window is None else window
+    max_items = max_items or settings.NOTIFICATION_COALESCE_MAX_ITEMS
+    message = textwrap.dedent(message).strip()
+
+    with transaction.atomic():
+        digest = (
+            Notification.objects.select_for_update()
+            .filter(
+                recipient=recipient,
+                notification_type=notification_type,
+                extra_data__coalesced=True,
+                attempts=0,
+                delivered_at__isnull=True,
+                failed_at__isnull=True,
+            )
+            .order_by("-pk")
+            .first()
+        )
+        if digest is not None and len(digest.extra_data["items"]) < max_items:
+            items = digest.extra_data["items"] + [message]
+            text = render_digest(title, items)
+            if len(text) <= TELEGRAM_MESSAGE_LIMIT:
+                digest.extra_data["items"] = items
+                digest.message = text
+                update_fields = ["extra_data", "message"]
+                if len(items) >= max_items:
+                    # Bufer to'ldi - oynani kutmasdan yuborish
+                    digest.next_attempt_at = timezone.now()
+                    update_fields.append("next_attempt_at")
+                    transaction.on_commit(wake_dispatcher)
+                digest.save(update_fields=update_fields)
+                return digest
+
+            # Yangi xabar sig'maydi - joriy digest darhol ketadi, yangisi ochiladi
+            digest.next_attempt_at = timezone.now()
+            digest.save(update_fields=["next_attempt_at"])
+            transaction.on_commit(wake_dispatcher)
+
+        return enqueue_notification(
+            recipient,
+            notification_type,
+            title,
+            message,
+            payload={"parse_mode": "HTML"},
+            extra_data={"coalesced": True, "items": [message]},
+            delay=window if max_items > 1 else 0,
+        )
+
+
+def coalesce_for_admins(notification_type: str, title: str, message: str) -> int:
+    """Xabarni har bir admin uchun digest'ga qo'shish, adminlar sonini qaytaradi"""
+    admins = list(TelegramUser.objects.filter(is_admin=True).only("pk"))
+    for admin in admins:
+        coalesce_notification(admin, notification_type, title, message)
+    return len(admins)
+
+
+def wake_dispatcher(countdown: float = 0):
+    """Dispatcher'ni darhol ishga tushirish (bo'lmasa beat har daqiqada oladi)"""
+    from bot.tasks import dispatch_notifications
+
+    try:
+        dispatch_notifications.apply_async(countdown=countdown)
+    except Exception as e:
+        logger.warning(f"Could not enqueue notification dispatch: {e}")
+
+
+def retry_delay(attempts: int) -> float:
+    """Eksponensial backoff: BACKOFF, 2*BACKOFF, 4*BACKOFF ... MAX_BACKOFF gacha"""
+    delay = settings.NOTIFICATION_OUTBOX_BACKOFF * 2 ** max(0, attempts - 1)
+    return min(delay, settings.NOTIFICATION_OUTBOX_MAX_BACKOFF)
+
+
+def claim_notifications(limit: int) -> List[dict]:
+    """
+    Navbatdagi qatorlarni olish (SELECT ... FOR UPDATE SKIP LOCKED).
+
+    Olingan qatorlarning next_attempt_at'i lease muddatiga suriladi: boshqa
+    dispatcher ularni o'tkazib yuboradi, bu worker o'lib qolsa esa lease
+    tugagach qatorlar qayta olinadi (at-least-once).
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            Notification.objects.select_for_update(skip_locked=True)
+            .filter(delivered_at__isnull=True, failed_at__isnull=True, next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "pk")
+            .values_list("pk", flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        Notification.objects.filter(pk__in=ids).update(
+            attempts=F("attempts") + 1,
+            next_attempt_at=now + timedelta(seconds=settings.NOTIFICATION_OUTBOX_LEASE),
+        )
+
+    return list(
+        Notification.objects.filter(pk__in=ids)
+        .order_by("created_at", "pk")
+        .values("pk", "recipient__telegram_id", "message", "payload", "attempts")
+    )
+
+
+def save_notification_results(results: List[dict]):
+    """Yetkazilganlarga delivered_at, qolganlariga backoff yoki failed_at yozish"""
+    now = timezone.now()
+    delivered = [result["pk"] for result in results if result["success"]]
+    if delivered:
+        Notification.objects.filter(pk__in=delivered).update(delivered_at=now, last_error="")
+
+    blocked_ids = []
+    for result in results:
+        if result["success"]:
+            continue
+        error = str(result.get("error") or "")[:1000]
+        if is_undeliverable(result.get("error"), result.get("error_code")):
+            blocked_ids.append(result["chat_id"])
+            update = {"failed_at": now}
+        elif result["attempts"] >= settings.NOTIFICATION_OUTBOX_MAX_ATTEMPTS:
+            update = {"failed_at": now}
+        else:
+            delay = max(retry_delay(result["attempts"]), result.get("retry_after") or 0)
+            update = {"next_attempt_at": now + timedelta(seconds=delay)}
+        Notification.objects.filter(pk=result["pk"]).update(last_error=error, **update)
+
+    mark_users_blocked(blocked_ids)
+
+
+acoalesce_for_admins = sync_to_async(coalesce_for_admins)
+aclaim_notifications = sync_to_async(claim_notifications)
+asave_notification_results = sync_to_async(save_notification_results)
+
+
+async def _deliver_to_recipient(rows: List[dict], session=None) -> List[dict]:
+    """Bitta qabul qiluvchining xabarlari ketma-ket (tartib saqlanadi)"""
+    results = []
+    undeliverable = None
+    for row in rows:
+        chat_id = row["recipient__telegram_id"]
+        if undeliverable is not None:
+            # Oldingi xabar yetmadi - qolganlari ham yetmaydi
+            result = dict(undeliverable)
+        else:
+            payload = row["payload"] or {}
+            result = await TelegramNotification.send_message(
+                chat_id,
+                row["message"],
+                parse_mode=payload.get("parse_mode", "HTML"),
+                reply_markup=payload.get("reply_markup"),
+                session=session,
+            )
+            if not result["success"] and is_undeliverable(
+                result.get("error"), result.get("error_code")
+            ):
+                undeliverable = result
+        results.append({**result, "pk": row["pk"], "chat_id": chat_id, "attempts": row["attempts"]})
+    return results
+
+
+async def dispatch_pending(
+    batch_size: int = None, concurrency: int = None, max_batches: int = 20
+) -> Dict[str, int]:
+    """
+    Outbox'ni bo'shatish: partiyalab olish, qabul qiluvchilar bo'yicha
+    parallel yuborish va natijani yozish.
+    """
+    batch_size = batch_size or settings.NOTIFICATION_OUTBOX_BATCH_SIZE
+    concurrency = concurrency or settings.TELEGRAM_NOTIFY_BULK_CONCURRENCY
+    semaphore = asyncio.Semaphore(concurrency)
+    stats = {"delivered": 0, "failed": 0}
+
+    async def deliver(rows, session):
+        async with semaphore:
+            return await _deliver_to_recipient(rows, session)
+
+    # Butun dispatch uchun bitta sessiya (Celery loop'i vazifa oxirida yopiladi)
+    async with TelegramNotification.session_scope() as session:
+        for _ in range(max_batches):
+            rows = await aclaim_notifications(batch_size)
+            if not rows:
+                break
+
+            by_recipient = defaultdict(list)
+            for row in rows:
+                by_recipient[row["recipient__telegram_id"]].append(row)
+
+            results = []
+            groups = by_recipient.values()
+            for chunk in await asyncio.gather(*(deliver(group, session) for group in groups)):
+                results.extend(chunk)
+            await asave_notification_results(results)
+
+            delivered = sum(1 for result in results if result["success"])
+            stats["delivered"] += delivered
+            stats["failed"] += len(results) - delivered
+
+    if stats["delivered"] or stats["failed"]:
+        logger.info(
+            f"Outbox dispatch: {stats['delivered']} delivered, {stats['failed']} failed"
+        )
+    return stats
@@ -0,0 +1,77 @@
+import logging
+import time
+from collections import OrderedDict
+
+from bot.utils.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Token bucket: to'ldirish va olish bitta atomik amalda. Vaqt Redis serveridan
+# olinadi, shuning uchun workerlar soatidagi farq natijaga ta'sir qilmaydi
+TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return allowed
+"""
+
+
+class TokenBucketLimiter:
+    """
+    Token-bucket rate limiter shared by all workers through a Redis Lua script.
+
+    ``rate`` is tokens per second and ``capacity`` the burst size. When Redis
+    is not configured or fails, buckets are kept in a bounded in-process LRU
+    so the limiter keeps working (per process) instead of letting floods in.
+    """
+
+    def __init__(self, maxsize: int = 50000, key_prefix: str = "tg:rl:"):
+        self.maxsize = maxsize
+        self.key_prefix = key_prefix
+        self._local: OrderedDict = OrderedDict()
+        self._script = None
+
+    async def allow(self, key: str, rate: float, capacity: float) -> bool:
+        """Bitta token olishga urinish. Limit oshgan bo'lsa False"""
+        client = get_redis()
+        if client is not None:
+            try:
+                if self._script is None:
+                    self._script = client.register_script(TOKEN_BUCKET_LUA)
+                allowed = await self._script(
+                    keys=[f"{self.key_prefix}{key}"], args=[rate, capacity], client=client
+                )
+                return bool(allowed)
+            except Exception as e:
+                logger.warning(f"Redis rate limit check failed for {key}: {e}")
+
+        return self._allow_local(key, rate, capacity)
+
+    def _allow_local(self, key: str, rate: float, capacity: float) -> bool:
+        now = time.monotonic()
+        tokens, ts = self._local.pop(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - ts) * rate)
+
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+
+        self._local[key] = (tokens, now)
+        if len(self._local) > self.maxsize:
+            self._local.popitem(last=False)
+        return allowed
@@ -0,0 +1,144 @@
+"""
+/send_ad auditoriyasi (segment): filter spetsifikatsiyasi va queryset.
+
+Filter Broadcast.filters'da JSON sifatida saqlanadi, qabul qiluvchilar
+ro'yxati esa hech qayerda saqlanmaydi - worker ularni get_recipients()
+dan keyset cursor bilan o'qiydi.
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict
+
+from asgiref.sync import sync_to_async
+from django.db.models import Exists, OuterRef, QuerySet
+from django.utils import timezone
+
+from bot.constants import GENDER, LEVEL_CHOICES, REGIONS
+from bot.models import Payments, TelegramUser
+
+DEFAULT_RECIPIENT_FILTERS = {"is_active": True}
+
+# Filter kaliti -> TelegramUser lookup (to'g'ridan-to'g'ri maydonlar)
+RECIPIENT_LOOKUPS = {
+    "is_active": "is_active",
+    "region": "region",
+    "level": "level",
+    "gender": "gender",
+    "is_confirmed": "is_confirmed",
+}
+
+# /send_ad argumentlari: region=tashkent level=1 gender=F confirmed=yes
+# purchased=no from=2024-01-01 to=2024-12-31
+ARGUMENT_KEYS = {
+    "region": "region",
+    "level": "level",
+    "gender": "gender",
+    "confirmed": "is_confirmed",
+    "purchased": "has_purchased_course",
+    "from": "registered_from",
+    "to": "registered_to",
+}
+
+YES = {"yes", "ha", "1", "true"}
+NO = {"no", "yoq", "yo'q", "0", "false"}
+
+
+def _day_start(value: str) -> datetime:
+    return timezone.make_aware(datetime.combine(date.fromisoformat(value), time.min))
+
+
+def _purchased_course():
+    return Exists(
+        Payments.objects.filter(user=OuterRef("pk"), course__isnull=False, status="CONFIRMED")
+    )
+
+
+def get_recipients(filters: Dict[str, Any]) -> QuerySet:
+    """Reklama qabul qiluvchilari queryset'i (filters - Broadcast.filters)"""
+    # Botni bloklagan / o'chirilgan akkauntlarga yubormaymiz (telegramuser_deliverable_idx)
+    queryset = TelegramUser.objects.filter(is_blocked=False)
+    lookups = {}
+    for key, value in filters.items():
+        if key in RECIPIENT_LOOKUPS:
+            lookups[RECIPIENT_LOOKUPS[key]] = value
+        elif key == "registered_from":
+            lookups["registration_date__gte"] = _day_start(value)
+        elif key == "registered_to":
+            lookups["registration_date__lt"] = _day_start(value) + timedelta(days=1)
+        elif key == "has_purchased_course":
+            queryset = queryset.filter(_purchased_course() if value else ~_purchased_course())
+        else:
+            raise ValueError(f"Unknown recipient filter: {key}")
+    return queryset.filter(**lookups)
+
+
+@sync_to_async
+def count_recipients(filters: Dict[str, Any]) -> int:
+    # ORDER BY'siz COUNT - segment indekslari bo'yicha index-only scan
+    return get_recipients(filters).order_by().count()
+
+
+def _parse_bool(name: str, value: str) -> bool:
+    value = value.lower()
+    if value in YES:
+        return True
+    if value in NO:
+        return False
+    raise ValueError(f"{name}: yes yoki no bo'lishi kerak")
+
+
+def parse_recipient_filters(args: str) -> Dict[str, Any]:
+    """
+    /send_ad argumentlarini filter spetsifikatsiyasiga aylantirish.
+
+    Noto'g'ri argumentda ValueError (xabar foydalanuvchiga ko'rsatiladi).
+    """
+    filters = dict(DEFAULT_RECIPIENT_FILTERS)
+    for part in (args or "").split():
+        name, _, value = part.partition("=")
+        name = name.lower()
+        if name not in ARGUMENT_KEYS or not value:
+            raise ValueError(f"Noma'lum filter: {part}")
+
+        if name == "region":
+            if value.lower() not in dict(REGIONS):
+                raise ValueError(f"region: {', '.join(dict(REGIONS))}")
+            value = value.lower()
+        elif name == "level":
+            value = value if value.startswith("level_") else f"level_{value}"
+            if value not in dict(LEVEL_CHOICES):
+                raise ValueError("level: 0-7")
+        elif name == "gender":
+            value = value.upper()
+            if value not in dict(GENDER):
+                raise ValueError("gender: M yoki F")
+        elif name in ("confirmed", "purchased"):
+            value = _parse_bool(name, value)
+        else:
+            try:
+                date.fromisoformat(value)
+            except ValueError:
+                raise ValueError(f"{name}: sana YYYY-MM-DD formatida bo'lishi kerak")
+
+        filters[ARGUMENT_KEYS[name]] = value
+    return filters
+
+
+def describe_recipient_filters(filters: Dict[str, Any]) -> str:
+    """Admin uchun segment tavsifi"""
+    labels = []
+    if "region" in filters:
+        labels.append(f"📍 Viloyat: {dict(REGIONS)[filters['region']]}")
+    if "level" in filters:
+        labels.append(f"📶 Bosqich: {dict(LEVEL_CHOICES)[filters['level']]}")
+    if "gender" in filters:
+        labels.append(f"👤 Jins: {dict(GENDER)[filters['gender']]}")
+    if "is_confirmed" in filters:
+        labels.append(f"✅ Tasdiqlangan: {'ha' if filters['is_confirmed'] else 'yoq'}")
+    if "has_purchased_course" in filters:
+        labels.append(f"🎓 Kurs sotib olgan: {'ha' if filters['has_purchased_course'] else 'yoq'}")
+    if "registered_from" in filters or "registered_to" in filters:
+        labels.append(
+            f"📅 Ro'yxatdan o'tgan: {filters.get('registered_from', '...')} — "
+            f"{filters.get('registered_to', '...')}"
+        )
+    return "\n".join(labels) or "👥 Barcha faol foydalanuvchilar"
@@ -0,0 +1,296 @@
+"""
+Telegram'ga chiquvchi xabarlar tezligini yagona joyda boshqarish.
+
+Bot API limitlari: umumiy ~30 xabar/s, bitta chatga ~1 xabar/s, guruhga
+20 xabar/daqiqa. Barcha yuboruvchilar (aiogram session middleware,
+TelegramNotification, signals) shu scheduler orqali navbat oladi.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Optional, Tuple, TypeVar, Union
+
+from django.conf import settings
+
+from bot.utils.redis import get_redis, get_sync_redis
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Priority lanes: foydalanuvchiga javoblar reklama/ommaviy xabarlardan oldin
+INTERACTIVE = "interactive"
+BULK = "bulk"
+
+send_lane: ContextVar[str] = ContextVar("send_lane", default=INTERACTIVE)
+
+# KEYS: global bucket, chat bucket, chat block, lane block
+# ARGV: global rate, global capacity, chat rate, chat capacity, reserve
+# 0 - ruxsat berildi, aks holda necha millisekund kutish kerakligi
+SEND_SLOT_LUA = """
+local chat_blocked = redis.call('PTTL', KEYS[3])
+local lane_blocked = redis.call('PTTL', KEYS[4])
+if chat_blocked > 0 or lane_blocked > 0 then
+    return math.max(chat_blocked, lane_blocked)
+end
+
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+
+local function refill(key, rate, capacity)
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    return math.min(capacity, tokens + math.max(0, now - ts) * rate)
+end
+
+local global_rate = tonumber(ARGV[1])
+local global_capacity = tonumber(ARGV[2])
+local chat_rate = tonumber(ARGV[3])
+local chat_capacity = tonumber(ARGV[4])
+local reserve = tonumber(ARGV[5])
+
+local global_tokens = refill(KEYS[1], global_rate, global_capacity)
+local chat_tokens = refill(KEYS[2], chat_rate, chat_capacity)
+
+local wait = 0
+if chat_tokens < 1 then
+    wait = (1 - chat_tokens) / chat_rate
+end
+if global_tokens < 1 + reserve then
+    wait = math.max(wait, (1 + reserve - global_tokens) / global_rate)
+end
+if wait > 0 then
+    return math.ceil(wait * 1000)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(global_tokens - 1), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(global_capacity / global_rate) + 1)
+redis.call('HSET', KEYS[2], 'tokens', tostring(chat_tokens - 1), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[2], math.ceil(chat_capacity / chat_rate) + 1)
+return 0
+"""
+
+
+@contextmanager
+def bulk_sending():
+    """Shu blok ichidagi yuborishlar BULK lane'da (interaktiv javoblardan keyin)"""
+    token = send_lane.set(BULK)
+    try:
+        yield
+    finally:
+        send_lane.reset(token)
+
+
+def is_group_chat(chat_id: Union[int, str]) -> bool:
+    # Guruh/kanal ID'lari manfiy, @username faqat kanal/guruhda bo'ladi
+    try:
+        return int(chat_id) < 0
+    except (TypeError, ValueError):
+        return True
+
+
+class SendScheduler:
+    """
+    Rate limiter for outbound Telegram messages shared by all workers.
+
+    Every send takes one token from a global bucket and one from the chat's
+    bucket in a single Redis Lua call. BULK sends may only take a global
+    token while ``bulk_reserve`` tokens stay available, so interactive
+    replies get through even during a broadcast. ``block`` pauses a chat
+    (and optionally a lane) after a 429. Without Redis the same logic runs
+    in-process, which only limits this process.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = 30,
+        chat_rate: float = 1,
+        chat_burst: float = 3,
+        group_per_minute: float = 20,
+        bulk_reserve: float = 5,
+        maxsize: int = 50000,
+        key_prefix: str = "tg:send:",
+    ):
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_per_minute / 60
+        self.bulk_reserve = bulk_reserve
+        self.maxsize = maxsize
+        self.key_prefix = key_prefix
+        self._script = None
+        self._sync_script = None
+        self._local: OrderedDict = OrderedDict()
+        self._blocks: dict = {}
+        self._lock = threading.Lock()
+
+    async def acquire(self, chat_id: Union[int, str], lane: Optional[str] = None):
+        """chat_id'ga yuborish uchun navbat kelguncha kutish"""
+        lane = lane or send_lane.get()
+        while True:
+            wait = await self._try_take(chat_id, lane)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def acquire_sync(self, chat_id: Union[int, str], lane: Optional[str] = None):
+        """Sinxron kod (signals, Celery) uchun acquire"""
+        lane = lane or send_lane.get()
+        while True:
+            wait = self._try_take_sync(chat_id, lane)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    async def block(self, chat_id: Union[int, str], seconds: float, lane: Optional[str] = None):
+        """429 (retry_after) dan keyin chatga (va lane berilsa, butun lane'ga) yuborishni to'xtatish"""
+        self._block_local(chat_id, seconds, lane)
+        client = get_redis()
+        if client is None:
+            return
+        try:
+            pipe = client.pipeline()
+            for key in self._block_keys(chat_id, lane):
+                pipe.set(key, 1, px=max(1, int(seconds * 1000)))
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Redis send block failed for chat {chat_id}: {e}")
+
+    def block_sync(self, chat_id: Union[int, str], seconds: float, lane: Optional[str] = None):
+        self._block_local(chat_id, seconds, lane)
+        client = get_sync_redis()
+        if client is None:
+            return
+        try:
+            pipe = client.pipeline()
+            for key in self._block_keys(chat_id, lane):
+                pipe.set(key, 1, px=max(1, int(seconds * 1000)))
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Redis send block failed for chat {chat_id}: {e}")
+
+    async def _try_take(self, chat_id, lane: str) -> float:
+        client = get_redis()
+        if client is not None:
+            try:
+                if self._script is None:
+                    self._script = client.register_script(SEND_SLOT_LUA)
+                keys, args = self._script_params(chat_id, lane)
+                wait_ms = await self._script(keys=keys, args=args, client=client)
+                return int(wait_ms) / 1000
+            except Exception as e:
+                logger.warning(f"Redis send scheduler failed, using local limits: {e}")
+        return self._take_local(chat_id, lane)
+
+    def _try_take_sync(self, chat_id, lane: str) -> float:
+        client = get_sync_redis()
+        if client is not None:
+            try:
+                if self._sync_script is None:
+                    self._sync_script = client.register_script(SEND_SLOT_LUA)
+                keys, args = self._script_params(chat_id, lane)
+                wait_ms = self._sync_script(keys=keys, args=args, client=client)
+                return int(wait_ms) / 1000
+            except Exception as e:
+                logger.warning(f"Redis send scheduler failed, using local limits: {e}")
+        return self._take_local(chat_id, lane)
+
+    def _chat_limits(self, chat_id) -> Tuple[float, float]:
+        if is_group_chat(chat_id):
+            return self.group_rate, self.chat_burst
+        return self.chat_rate, self.chat_burst
+
+    def _reserve(self, lane: str) -> float:
+        return self.bulk_reserve if lane == BULK else 0
+
+    def _block_keys(self, chat_id, lane: Optional[str]):
+        keys = [f"{self.key_prefix}block:chat:{chat_id}"]
+        if lane:
+            keys.append(f"{self.key_prefix}block:lane:{lane}")
+        return keys
+
+    def _script_params(self, chat_id, lane: str):
+        chat_rate, chat_capacity = self._chat_limits(chat_id)
+        keys = [
+            f"{self.key_prefix}global",
+            f"{self.key_prefix}chat:{chat_id}",
+            f"{self.key_prefix}block:chat:{chat_id}",
+            f"{self.key_prefix}block:lane:{lane}",
+        ]
+        args = [self.global_rate, self.global_rate, chat_rate, chat_capacity, self._reserve(lane)]
+        return keys, args
+
+    def _block_local(self, chat_id, seconds: float, lane: Optional[str]):
+        until = time.monotonic() + seconds
+        with self._lock:
+            for key in self._block_keys(chat_id, lane):
+                self._blocks[key] = max(until, self._blocks.get(key, 0))
+
+    def _take_local(self, chat_id, lane: str) -> float:
+        now = time.monotonic()
+        chat_rate, chat_capacity = self._chat_limits(chat_id)
+        reserve = self._reserve(lane)
+
+        with self._lock:
+            blocked_until = max(
+                self._blocks.get(f"{self.key_prefix}block:chat:{chat_id}", 0),
+                self._blocks.get(f"{self.key_prefix}block:lane:{lane}", 0),
+            )
+            if blocked_until > now:
+                return blocked_until - now
+
+            global_tokens = self._refill("global", self.global_rate, self.global_rate, now)
+            chat_tokens = self._refill(f"chat:{chat_id}", chat_rate, chat_capacity, now)
+
+            wait = 0.0
+            if chat_tokens < 1:
+                wait = (1 - chat_tokens) / chat_rate
+            if global_tokens < 1 + reserve:
+                wait = max(wait, (1 + reserve - global_tokens) / self.global_rate)
+            if wait > 0:
+                return wait
+
+            self._store("global", global_tokens - 1, now)
+            self._store(f"chat:{chat_id}", chat_tokens - 1, now)
+            return 0.0
+
+    def _refill(self, key: str, rate: float, capacity: float, now: float) -> float:
+        tokens, ts = self._local.get(key, (capacity, now))
+        return min(capacity, tokens + (now - ts) * rate)
+
+    def _store(self, key: str, tokens: float, now: float):
+        self._local[key] = (tokens, now)
+        self._local.move_to_end(key)
+        if len(self._local) > self.maxsize:
+            self._local.popitem(last=False)
+
+
+async def send_bulk(call: Callable[[], Awaitable[T]], attempts: int = 3) -> T:
+    """
+    Ommaviy yuborish: BULK lane'da chaqirish, TelegramRetryAfter bo'lsa qayta urinish.
+
+    Kutish scheduler ichida (block) bo'ladi, shuning uchun bu yerda sleep yo'q.
+    """
+    from aiogram.exceptions import TelegramRetryAfter
+
+    with bulk_sending():
+        for attempt in range(attempts):
+            try:
+                return await call()
+            except TelegramRetryAfter:
+                if attempt == attempts - 1:
+                    raise
+
+
+send_scheduler = SendScheduler(
+    global_rate=settings.TELEGRAM_SEND_GLOBAL_RATE,
+    chat_rate=settings.TELEGRAM_SEND_CHAT_RATE,
+    chat_burst=settings.TELEGRAM_SEND_CHAT_BURST,
+    group_per_minute=settings.TELEGRAM_SEND_GROUP_PER_MINUTE,
+    bulk_reserve=settings.TELEGRAM_SEND_BULK_RESERVE,
+)
@@ -0,0 +1,291 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue as queue_module
+import time
+import zlib
+from typing import Dict, List
+
+from aiogram.types import Update
+
+from bot.services.update_queue import UpdateQueue, get_update_chat_id
+
+logger = logging.getLogger(__name__)
+
+# Shared memory slotlari oldindan ajratiladi, shuning uchun worker soni chegaralangan
+MAX_WORKERS = 64
+
+
+def shard_for(key: int, worker_ids: List[int]) -> int:
+    """
+    Rendezvous hashing: chat uchun worker tanlash.
+
+    Worker soni o'zgarganda faqat qo'shilgan/olib tashlangan workerga
+    tegishli chatlar ko'chadi, qolganlari o'z workerida qoladi.
+    """
+    return max(worker_ids, key=lambda worker_id: zlib.crc32(f"{worker_id}:{key}".encode()))
+
+
+def run_worker(worker_id: int, inbox, heartbeats, processed, concurrency: int):
+    """Worker process entry point: o'z Bot va Dispatcher'i bilan update'larni qayta ishlaydi"""
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+    django.setup()
+    asyncio.run(_worker_main(worker_id, inbox, heartbeats, processed, concurrency))
+
+
+async def _worker_main(worker_id: int, inbox, heartbeats, processed, concurrency: int):
+    # Dispatcher shu process ichida bot.handlers.router'dan quriladi
+    from bot.loader import get_bot, get_dispatcher
+    from bot.services.notification import TelegramNotification
+    from bot.utils.event_loops import register_long_lived_loop
+    from bot.utils.redis import close_redis
+    from bot.views import process_update
+
+    register_long_lived_loop()
+    get_dispatcher()
+
+    async def handle(update: Update):
+        try:
+            await process_update(update)
+        finally:
+            processed[worker_id] += 1
+
+    async def heartbeat():
+        # Event loop bloklangan bo'lsa heartbeat to'xtaydi va supervisor workerni qayta ishga tushiradi
+        while True:
+            heartbeats[worker_id] = time.time()
+            await asyncio.sleep(1)
+
+    updates = UpdateQueue(handler=handle, maxsize=concurrency * 100, workers=concurrency)
+    updates.start()
+    heartbeat_task = asyncio.create_task(heartbeat())
+    loop = asyncio.get_running_loop()
+
+    try:
+        while True:
+            try:
+                payload = await loop.run_in_executor(None, inbox.get, True, 1)
+            except queue_module.Empty:
+                continue
+            if payload is None:
+                break
+            await updates.put(Update.model_validate_json(payload))
+    finally:
+        await updates.stop(drain=True)
+        heartbeat_task.cancel()
+        await get_bot().session.close()
+        await TelegramNotification.close()
+        await close_redis()
+
+
+class ShardSupervisor:
+    """
+    Spreads updates over N worker processes by chat id.
+
+    Every chat is pinned to one worker, so per-chat ordering is preserved
+    while the load uses several CPU cores. The supervisor restarts workers
+    that die or stop sending heartbeats, and ``resize`` drains in-flight
+    updates before the hash ring changes so ordering survives a rebalance.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        concurrency: int = 8,
+        inbox_size: int = 1000,
+        heartbeat_timeout: float = 30,
+    ):
+        self.size = max(1, min(MAX_WORKERS, workers))
+        self.concurrency = concurrency
+        self.inbox_size = inbox_size
+        self.heartbeat_timeout = heartbeat_timeout
+
+        self._ctx = multiprocessing.get_context("spawn")
+        self.heartbeats = self._ctx.Array("d", MAX_WORKERS, lock=False)
+        self.processed = self._ctx.Array("q", MAX_WORKERS, lock=False)
+        self.enqueued = [0] * MAX_WORKERS
+        self.processes: Dict[int, multiprocessing.Process] = {}
+        self.inboxes: Dict[int, multiprocessing.Queue] = {}
+        self.worker_ids: List[int] = []
+        self._lock = asyncio.Lock()
+
+    def start(self):
+        for worker_id in range(self.size):
+            self._spawn(worker_id)
+        self.worker_ids = list(range(self.size))
+        logger.info(f"Shard supervisor started {self.size} worker processes")
+
+    async def dispatch(self, update: Update):
+        """Update'ni chat id bo'yicha tegishli worker process'ga yuborish"""
+        async with self._lock:
+            chat_id = get_update_chat_id(update)
+            key = chat_id if chat_id is not None else update.update_id
+            worker_id = shard_for(key, self.worker_ids)
+
+            payload = update.model_dump_json(exclude_unset=True)
+            loop = asyncio.get_running_loop()
+            # Inbox to'la bo'lsa kutamiz (backpressure)
+            await loop.run_in_executor(None, self.inboxes[worker_id].put, payload)
+            self.enqueued[worker_id] += 1
+
+    def pending(self) -> int:
+        return sum(self.enqueued[w] - self.processed[w] for w in self.worker_ids)
+
+    async def join(self):
+        """Yuborilgan barcha update'lar qayta ishlanishini kutish"""
+        async with self._lock:
+            await self._drain()
+
+    async def _drain(self):
+        # self._lock ushlab turilganda chaqiriladi
+        last_check = time.monotonic()
+        while self.pending() > 0:
+            await asyncio.sleep(0.05)
+            if time.monotonic() - last_check >= 1:
+                # O'lgan worker join'ni cheksiz kutishga majburlamasligi uchun
+                await self._check_health()
+                last_check = time.monotonic()
+
+    async def check_health(self):
+        """O'lgan yoki heartbeat yubormayotgan workerlarni qayta ishga tushirish"""
+        async with self._lock:
+            await self._check_health()
+
+    async def _check_health(self):
+        # Lock ostida: restart paytida dispatch bu workerning inbox'iga yozmaydi
+        now = time.time()
+        for worker_id in list(self.worker_ids):
+            process = self.processes[worker_id]
+            alive = process.is_alive()
+            if alive and now - self.heartbeats[worker_id] <= self.heartbeat_timeout:
+                continue
+
+            reason = "heartbeat timeout" if alive else f"exit code {process.exitcode}"
+            logger.error(f"Shard worker {worker_id} is unhealthy ({reason}), restarting")
+            if alive:
+                await self._shutdown(worker_id, process, timeout=5)
+
+            moved = self._replace_inbox(worker_id)
+            lost = self.enqueued[worker_id] - self.processed[worker_id] - moved
+            if lost > 0:
+                logger.warning(f"Shard worker {worker_id}: {lost} in-flight updates lost")
+            self.enqueued[worker_id] = self.processed[worker_id] + moved
+
+            self._spawn(worker_id)
+
+    async def monitor(self, interval: float = 5):
+        """Health check'ni davriy ishga tushirish"""
+        while True:
+            await asyncio.sleep(interval)
+            await self.check_health()
+
+    async def resize(self, size: int):
+        """Worker sonini o'zgartirish (rebalance)"""
+        size = max(1, min(MAX_WORKERS, size))
+        async with self._lock:
+            if size == len(self.worker_ids):
+                return
+
+            logger.info(f"Resizing shard workers: {len(self.worker_ids)} -> {size}")
+            # Eski taqsimot bo'yicha yuborilganlar tugamaguncha ring o'zgarmaydi
+            await self._drain()
+
+            new_ids = list(range(size))
+            for worker_id in new_ids:
+                if worker_id not in self.processes:
+                    self._spawn(worker_id)
+            retired = [worker_id for worker_id in self.worker_ids if worker_id not in new_ids]
+            await asyncio.gather(*(self._retire(worker_id) for worker_id in retired))
+
+            self.worker_ids = new_ids
+            self.size = size
+
+    async def stop(self):
+        async with self._lock:
+            await self._drain()
+            await asyncio.gather(*(self._retire(worker_id) for worker_id in self.worker_ids))
+            self.worker_ids = []
+
+    def _spawn(self, worker_id: int):
+        inbox = self.inboxes.get(worker_id)
+        if inbox is None:
+            inbox = self._ctx.Queue(maxsize=self.inbox_size)
+            self.inboxes[worker_id] = inbox
+
+        # Process ishga tushguncha heartbeat timeout bo'lmasligi uchun
+        self.heartbeats[worker_id] = time.time()
+        process = self._ctx.Process(
+            target=run_worker,
+            args=(worker_id, inbox, self.heartbeats, self.processed, self.concurrency),
+            name=f"bot-shard-{worker_id}",
+            daemon=True,
+        )
+        process.start()
+        self.processes[worker_id] = process
+
+    async def _retire(self, worker_id: int):
+        process = self.processes.pop(worker_id)
+        inbox = self.inboxes.pop(worker_id)
+        await self._shutdown(worker_id, process, timeout=30, inbox=inbox)
+        inbox.close()
+        inbox.cancel_join_thread()
+
+    async def _shutdown(self, worker_id: int, process, timeout: float, inbox=None):
+        """
+        Workerni to'xtatish: avval None (sentinel), chiqmasa terminate.
+
+        inbox.get() ichida terminate qilingan process queue lock'ini ushlab
+        qolishi mumkin, shuning uchun terminate faqat oxirgi chora. Kutish
+        event loop'ni bloklamaydi - boshqa shardlarga dispatch davom etadi.
+        """
+        inbox = inbox or self.inboxes[worker_id]
+        try:
+            inbox.put_nowait(None)
+        except queue_module.Full:
+            pass
+        if await wait_for_exit(process, timeout):
+            return
+
+        logger.warning(f"Shard worker {worker_id} did not stop in time, terminating")
+        process.terminate()
+        if not await wait_for_exit(process, 5):
+            process.kill()
+            await wait_for_exit(process, 5)
+
+    def _replace_inbox(self, worker_id: int) -> int:
+        """
+        Qayta ishga tushadigan worker uchun yangi inbox.
+
+        Eski queue'ning lock'i o'lgan process'da qolgan bo'lishi mumkin.
+        Qolgan update'lar get_nowait bilan (bloklanmasdan) ko'chiriladi,
+        ko'chirilganlar soni qaytariladi.
+        """
+        old = self.inboxes.pop(worker_id)
+        new = self._ctx.Queue(maxsize=self.inbox_size)
+        moved = 0
+        while True:
+            try:
+                payload = old.get_nowait()
+            except queue_module.Empty:
+                break
+            except (OSError, ValueError, EOFError):
+                break
+            if payload is None:
+                continue
+            new.put_nowait(payload)
+            moved += 1
+        old.close()
+        old.cancel_join_thread()
+        self.inboxes[worker_id] = new
+        return moved
+
+
+async def wait_for_exit(process, timeout: float) -> bool:
+    """Process tugashini event loop'ni bloklamasdan kutish (exitcode polling)"""
+    deadline = time.monotonic() + timeout
+    while process.exitcode is None and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+    return process.exitcode is not None
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Awaitable, Callable, List, Optional
+
+if TYPE_CHECKING:
+    # aiogram faqat type hint uchun - views import qilinganda yuklanmasligi uchun
+    from aiogram.types import Update
+
+logger = logging.getLogger(__name__)
+
+
+def get_update_chat_id(update: "Update") -> Optional[int]:
+    """Update qaysi chatga tegishli ekanini aniqlash (tartibni saqlash uchun)"""
+    try:
+        event = update.event
+    except Exception:
+        return None
+
+    chat = getattr(event, "chat", None)
+    if chat is None:
+        # CallbackQuery uchun chat xabar ichida bo'ladi
+        chat = getattr(getattr(event, "message", None), "chat", None)
+    if chat is not None:
+        return chat.id
+
+    user = getattr(event, "from_user", None)
+    return user.id if user else None
+
+
+class UpdateQueue:
+    """
+    Bounded in-process queue for incoming Telegram updates.
+
+    Updates are sharded by chat id onto ``workers`` sub-queues and every
+    sub-queue is drained by a single task, so updates from the same chat are
+    handled in order while different chats are processed concurrently.
+
+    The worker tasks live on the event loop that enqueued the first update,
+    so this is meant for ASGI servers (uvicorn, daphne) with a long-lived loop.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[["Update"], Awaitable[None]],
+        maxsize: int = 1000,
+        workers: int = 8,
+    ):
+        self.handler = handler
+        self.maxsize = maxsize
+        self.workers = max(1, workers)
+        self._queues: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self):
+        """Worker tasklarini joriy event loop'da ishga tushirish"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks:
+            return
+
+        if self._tasks:
+            logger.warning(
+                f"Update queue restarted on a new event loop, {self.qsize()} updates dropped"
+            )
+
+        per_worker = max(1, self.maxsize // self.workers)
+        self._loop = loop
+        self._queues = [asyncio.Queue(maxsize=per_worker) for _ in range(self.workers)]
+        self._tasks = [
+            loop.create_task(self._worker(queue, index))
+            for index, queue in enumerate(self._queues)
+        ]
+        logger.info(f"Update queue started with {self.workers} workers")
+
+    def is_running(self) -> bool:
+        """Worker tasklari joriy event loop'da ishlayaptimi"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+        return self._loop is loop and bool(self._tasks)
+
+    def put_nowait(self, update: "Update") -> bool:
+        """Update'ni navbatga qo'yish. Navbat to'la bo'lsa False qaytaradi"""
+        self.start()
+
+        try:
+            self._queue_for(update).put_nowait(update)
+            return True
+        except asyncio.QueueFull:
+            logger.warning(f"Update queue is full, rejecting update {update.update_id}")
+            return False
+
+    async def put(self, update: "Update"):
+        """Update'ni navbatga qo'yish, navbat to'la bo'lsa joy bo'shashini kutadi"""
+        self.start()
+        await self._queue_for(update).put(update)
+
+    def _queue_for(self, update: "Update") -> asyncio.Queue:
+        chat_id = get_update_chat_id(update)
+        key = chat_id if chat_id is not None else update.update_id
+        return self._queues[key % self.workers]
+
+    def qsize(self) -> int:
+        return sum(queue.qsize() for queue in self._queues)
+
+    async def join(self):
+        """Navbatdagi barcha update'lar qayta ishlanishini kutish"""
+        for queue in self._queues:
+            await queue.join()
+
+    async def stop(self, drain: bool = True):
+        """Worker'larni to'xtatish (drain=True bo'lsa avval navbatni bo'shatadi)"""
+        if drain:
+            await self.join()
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        self._tasks = []
+        self._queues = []
+        self._loop = None
+
+    async def _worker(self, queue: asyncio.Queue, index: int):
+        while True:
+            update = await queue.get()
+            try:
+                await self.handler(update)
+            except Exception as e:
+                logger.error(
+                    f"Worker {index} failed to process update {update.update_id}: {e}",
+                    exc_info=True,
+                )
+            finally:
+                queue.task_done()
@@ -1,23 +1,41 @@
 import requests
-import time
 from django.utils import timezone
 
 from asgiref.sync import async_to_sync
+from django.db import transaction
 from django.dispatch import receiver
-from django.db.models.signals import post_save
-from aiogram.types import (
-    InlineKeyboardMarkup,
-    InlineKeyboardButton,
-)
-from bot.buttons.default.menu import get_menu_keyboard
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
 from bot.selectors import create_referral_payment_request
-from core.settings import TELEGRAM_BOT_TOKEN, TELEGRAM_BOT_USERNAME
-from .models import Payments, ReferralPayment
+from bot.services.media import media_registry
+from bot.services.outbox import enqueue_notification
+from bot.services.send_scheduler import send_scheduler
+from bot.utils.cache import reference_cache
+from core.settings import TELEGRAM_BOT_TOKEN, TELEGRAM_BOT_USERNAME, TELEGRAM_SEND_MAX_RETRY_AFTER
+from .models import Gifts, Payments, ReferralPayment, MandatoryChannel, TelegramUser
 
 BASE_URL = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
 
 
+def post_message(payload: dict, attempts: int = 3) -> requests.Response:
+    """sendMessage: tezlik send_scheduler orqali cheklanadi, 429 bo'lsa kutib qayta uriniladi"""
+    chat_id = payload["chat_id"]
+    for attempt in range(attempts):
+        send_scheduler.acquire_sync(chat_id)
+        response = requests.post(BASE_URL, json=payload)
+        if response.status_code != 429 or attempt == attempts - 1:
+            return response
+
+        retry_after = response.json().get("parameters", {}).get("retry_after", 1)
+        # Keyingi acquire_sync (shu yoki boshqa worker'da) blok tugaguncha kutadi
+        send_scheduler.block_sync(chat_id, retry_after)
+        if retry_after > TELEGRAM_SEND_MAX_RETRY_AFTER:
+            return response
+    return response
+
+
 def get_menu_keyboard_json() -> dict:
+    from bot.buttons.default.menu import get_menu_keyboard
+
     keyboard = get_menu_keyboard()
     return keyboard.model_dump(exclude_none=True)
 
@@ -28,6 +46,9 @@ def handle_payment_confirmation(sender, instance, created, **kwargs):
         return
 
     if instance.status == "CONFIRMED":
+        # aiogram faqat kerak bo'lganda import qilinadi (Celery/manage.py startup uchun)
+        from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+
         instance._signal_handled = True
 
         if instance.user.is_looser and instance.user.inactive_time > timezone.now():
@@ -41,33 +62,6 @@ def handle_payment_confirmation(sender, instance, created, **kwargs):
             print(f"[ERROR] confirm_payment() ishlashida xato: {e}")
 
         try:
-            # Foydalanuvhiga To'langan kursni Private Kanal linkini yuborish
-            chat_id = instance.user.telegram_id
-            message = (
-                f"✅ To'lov muvaffaqiyatli amalga oshirildi!\n"
-                f"💰 Summa: {instance.amount} so'm\n\n"
-                f"🔐 Kurs kanaliga kirish uchun quyidagi tugmani bosing:"
-            )
-            reply_markup = InlineKeyboardMarkup(
-                inline_keyboard=[
-                    [
-                        InlineKeyboardButton(
-                            text="📲 Kurs kanaliga kirish",
-                            url=instance.course.private_channel,
-                        )
-                    ]
-                ]
-            ).model_dump(exclude_none=True)
-            payload = {
-                "chat_id": chat_id,
-                "text": message,
-                "reply_markup": reply_markup,
-                "parse_mode": "HTML",
-            }
-            response = requests.post(BASE_URL, json=payload)
-            response.raise_for_status()
-            time.sleep(10)
-
             referral_payment_amount = instance.course.referral_payment_amount
 
             referral_recipient = None
@@ -93,29 +87,34 @@ def handle_payment_confirmation(sender, instance, created, **kwargs):
                     "To'lov qilganingizdan so'ng pastdagi tugmani bosing:"
                 )
 
-                referral_payment = async_to_sync(create_referral_payment_request)(
-                    user_id=chat_id, amount=referral_payment_amount
-                )
-
-                reply_markup = InlineKeyboardMarkup(
-                    inline_keyboard=[
-                        [
-                            InlineKeyboardButton(
-                                text="✅ To'lov qildim",
-                                callback_data=f"payment_made_{referral_payment.id}",
-                            )
+                # Referral to'lov so'rovi va uning xabari bitta tranzaksiyada
+                with transaction.atomic():
+                    referral_payment = async_to_sync(create_referral_payment_request)(
+                        user_id=instance.user.telegram_id, amount=referral_payment_amount
+                    )
+
+                    reply_markup = InlineKeyboardMarkup(
+                        inline_keyboard=[
+                            [
+                                InlineKeyboardButton(
+                                    text="✅ To'lov qildim",
+                                    callback_data=f"payment_made_{referral_payment.id}",
+                                )
+                            ]
                         ]
-                    ]
-                ).model_dump(exclude_none=True)
-
-                payload = {
-                    "chat_id": chat_id,
-                    "text": payment_message,
-                    "reply_markup": reply_markup,
-                    "parse_mode": "HTML",
-                }
-                response = requests.post(BASE_URL, json=payload)
-                response.raise_for_status()
+                    ).model_dump(exclude_none=True)
+
+                    # Kurs kanali xabaridan keyin kelishi uchun biroz kechiktiriladi
+                    enqueue_notification(
+                        instance.user,
+                        "SYSTEM_MESSAGE",
+                        "Referral to'lovi",
+                        payment_message,
+                        payload={"parse_mode": "HTML", "reply_markup": reply_markup},
+                        extra_data={"referral_payment_id": referral_payment.id},
+                        dedupe_key=f"payment:{instance.pk}:referral",
+                        delay=10,
+                    )
             else:
                 # Agar referral recipient topilmasa (masalan, to'g'ridan-to'g'ri admin tomonidan qo'shilgan)
                 print(
@@ -123,28 +122,24 @@ def handle_payment_confirmation(sender, instance, created, **kwargs):
                 )
 
         except Exception as e:
-            print(f"Telegramga yuborishda xatolik: {e}")
+            print(f"Bildirishnomani yozishda xatolik: {e}")
 
     elif instance.status == "REJECTED":
         instance._signal_handled = True
 
         try:
-            chat_id = instance.user.telegram_id
-            message = "❌ To'lov rad etildi. Iltimos, qayta urinib ko'ring."
-            reply_markup = get_menu_keyboard_json()
-
-            payload = {
-                "chat_id": chat_id,
-                "text": message,
-                "reply_markup": reply_markup,
-                "parse_mode": "HTML",
-            }
-
-            response = requests.post(BASE_URL, json=payload)
-            response.raise_for_status()
-
+            # reject_payment() sabab bilan yozgan bo'lsa dedupe_key tufayli takrorlanmaydi
+            enqueue_notification(
+                instance.user,
+                "PAYMENT_REJECTED",
+                "To'lov rad etildi",
+                "❌ To'lov rad etildi. Iltimos, qayta urinib ko'ring.",
+                payload={"parse_mode": "HTML", "reply_markup": get_menu_keyboard_json()},
+                extra_data={"payment_id": instance.id},
+                dedupe_key=f"payment:{instance.pk}:rejected",
+            )
         except Exception as e:
-            print(f"Telegramga yuborishda xatolik: {e}")
+            print(f"Bildirishnomani yozishda xatolik: {e}")
 
 
 @receiver(post_save, sender=ReferralPayment)
@@ -179,5 +174,79 @@ def handle_referral_payment_confirmation(sender, instance, created, **kwargs):
             "reply_markup": get_menu_keyboard_json(),
             "parse_mode": "HTML",
         }
-        response = requests.post(BASE_URL, json=payload)
+        response = post_message(payload)
         response.raise_for_status()
+
+
+@receiver(pre_save, sender=MandatoryChannel)
+def reset_resolved_chat_id(sender, instance, **kwargs):
+    """telegram_id yoki link o'zgarsa, eski aniqlangan ID endi to'g'ri emas"""
+    if not instance.pk:
+        return
+    previous = MandatoryChannel.objects.filter(pk=instance.pk).values("telegram_id", "link").first()
+    if previous and (
+        previous["telegram_id"] != instance.telegram_id or previous["link"] != instance.link
+    ):
+        instance.resolved_chat_id = None
+        instance.resolved_at = None
+
+
+@receiver(post_save, sender=MandatoryChannel)
+def schedule_channel_resolution(sender, instance, **kwargs):
+    """Yangi yoki o'zgargan kanal ID'sini darhol aniqlash (beat'ni kutmasdan)"""
+    if not (instance.is_active and instance.is_telegram) or instance.resolved_chat_id:
+        return
+
+    from bot.tasks import resolve_mandatory_channels
+
+    def enqueue():
+        try:
+            resolve_mandatory_channels.delay(instance.pk)
+        except Exception as e:
+            print(f"Kanal ID aniqlash vazifasini yuborishda xatolik: {e}")
+
+    transaction.on_commit(enqueue)
+
+
+@receiver(post_save, sender=MandatoryChannel)
+@receiver(post_delete, sender=MandatoryChannel)
+def invalidate_channels_cache(sender, instance, **kwargs):
+    transaction.on_commit(lambda: reference_cache.invalidate("channels"))
+
+
+@receiver(post_init, sender=TelegramUser)
+def remember_admin_flag(sender, instance, **kwargs):
+    # Saqlashda is_admin o'zgarganini bilish uchun. __dict__ - deferred maydon
+    # (.only()) bo'lsa qo'shimcha so'rov yubormaslik uchun
+    instance._initial_is_admin = instance.__dict__.get("is_admin")
+
+
+@receiver(post_save, sender=TelegramUser)
+def invalidate_admins_cache_on_save(sender, instance, created, **kwargs):
+    current = instance.__dict__.get("is_admin")
+    initial = getattr(instance, "_initial_is_admin", None)
+    if (created and current) or (not created and current is not None and current != initial):
+        transaction.on_commit(lambda: reference_cache.invalidate("admins"))
+    instance._initial_is_admin = current
+
+
+@receiver(post_delete, sender=TelegramUser)
+def invalidate_admins_cache_on_delete(sender, instance, **kwargs):
+    if instance.__dict__.get("is_admin", True):
+        transaction.on_commit(lambda: reference_cache.invalidate("admins"))
+
+
+@receiver(pre_save, sender=Gifts)
+def forget_replaced_gift_image(sender, instance, **kwargs):
+    """Sovg'a rasmi almashtirilsa eski rasmning file_id'si kerak emas"""
+    if not instance.pk:
+        return
+    previous = Gifts.objects.filter(pk=instance.pk).values_list("image", flat=True).first()
+    if previous and previous != instance.image.name:
+        media_registry.forget(instance.image.storage.path(previous))
+
+
+@receiver(post_delete, sender=Gifts)
+def forget_deleted_gift_image(sender, instance, **kwargs):
+    if instance.image:
+        media_registry.forget(instance.image.path)
@@ -1,11 +1,12 @@
-import time
 from celery import shared_task
 from django.utils import timezone
 from datetime import timedelta
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
 from .models import TelegramUser
-from bot.views import bot
+from bot.loader import get_bot
+from bot.services.delivery import is_undeliverable, mark_users_blocked
+from bot.services.send_scheduler import send_bulk
+from bot.utils.redis import close_redis
 import asyncio
 
 
@@ -48,13 +49,17 @@ def update_loosers_referalls_to_admin(self):
 @shared_task(bind=True)
 def check_active_users(self):
     """Aktiv foydalanuvchilarni tekshirish va aktivlik tasdiqlash so'rovini yuborish"""
+    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+
+    bot = get_bot()
     try:
         # Get users who haven't confirmed activity in the last 48 hours
         deadline_for_activation = timezone.now() + timedelta(hours=48)
 
         users_to_check = TelegramUser.objects.filter(
-            is_active=True, is_admin=False
+            is_active=True, is_blocked=False, is_admin=False
         )
+        blocked_ids = []
 
         print(
             f"[INFO] Checking {users_to_check.count()} users for activity confirmation"
@@ -91,8 +96,8 @@ def check_active_users(self):
                         reply_markup=keyboard,
                     )
 
-                loop.run_until_complete(send_activity_check())
-                time.sleep(1)  # Sleep to avoid hitting rate limits
+                # Tezlik send_scheduler'da (BULK lane)
+                loop.run_until_complete(send_bulk(send_activity_check))
                 # Update last activity check time
                 user.deadline_for_activation = deadline_for_activation
                 user.save()
@@ -103,7 +108,13 @@ def check_active_users(self):
                 print(
                     f"[ERROR] Failed to send activity check to user {user.telegram_id}: {e}"
                 )
+                if is_undeliverable(e):
+                    blocked_ids.append(user.telegram_id)
                 continue
+        mark_users_blocked(blocked_ids)
+        # Sessiya shu loop'ga bog'langan - keyingi task yangi loop'da yangisini ochadi
+        loop.run_until_complete(bot.session.close())
+        loop.run_until_complete(close_redis())
         loop.close()
     except Exception as e:
         print(f"[ERROR] Error in check_active_users: {e}")
@@ -112,6 +123,7 @@ def check_active_users(self):
 @shared_task(bind=True)
 def deactivate_inactive_users(self):
     """48 soat ichida aktivlik tasdiqlanmagan foydalanuvchilarni deaktiv qilish"""
+    bot = get_bot()
     try:
         deadline_for_activation = timezone.now()
 
@@ -122,6 +134,7 @@ def deactivate_inactive_users(self):
         asyncio.set_event_loop(loop)
         print(f"[INFO] Deactivating {inactive_users.count()} inactive users")
         admin_user = TelegramUser.objects.filter(is_admin=True).first()
+        blocked_ids = []
         for user in inactive_users:
             try:
                 user.is_active = False
@@ -135,21 +148,131 @@ def deactivate_inactive_users(self):
                     invitee.invited_by = admin_user
                     invitee.save()
 
-                # Notify user about deactivation
-
-                loop.run_until_complete(
-                    bot.send_message(
-                        chat_id=user.telegram_id,
-                        text="❌ Siz 48 soat ichida aktivlik tasdiqlanmaganingiz uchun loyihamizdan chetlashtirildingiz.",
+                # Notify user about deactivation (botni bloklaganlarga yuborilmaydi)
+                if not user.is_blocked:
+                    loop.run_until_complete(
+                        send_bulk(
+                            lambda: bot.send_message(
+                                chat_id=user.telegram_id,
+                                text="❌ Siz 48 soat ichida aktivlik tasdiqlanmaganingiz uchun loyihamizdan chetlashtirildingiz.",
+                            )
+                        )
                     )
-                )
-                time.sleep(1)
 
                 print(f"[SUCCESS] User {user.telegram_id} deactivated")
 
             except Exception as e:
                 print(f"[ERROR] Failed to deactivate user {user.telegram_id}: {e}")
+                if is_undeliverable(e):
+                    blocked_ids.append(user.telegram_id)
                 continue
+        mark_users_blocked(blocked_ids)
+        # Sessiya shu loop'ga bog'langan - keyingi task yangi loop'da yangisini ochadi
+        loop.run_until_complete(bot.session.close())
+        loop.run_until_complete(close_redis())
         loop.close()
     except Exception as e:
         print(f"[ERROR] Error in deactivate_inactive_users: {e}")
+
+
+@shared_task(bind=True)
+def resolve_mandatory_channels(self, channel_id=None):
+    """Majburiy kanallarning raqamli chat ID'sini getChat orqali aniqlab saqlash"""
+    from bot.models import MandatoryChannel
+    from bot.services.membership import ADMIN_STATUSES, get_chat_identifiers
+    from bot.utils.cache import reference_cache
+
+    channels = MandatoryChannel.objects.filter(is_active=True, is_telegram=True)
+    if channel_id is not None:
+        channels = channels.filter(pk=channel_id)
+
+    bot = get_bot()
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        for channel in channels:
+            chat = None
+            for identifier in get_chat_identifiers(channel):
+                try:
+                    chat = loop.run_until_complete(bot.get_chat(chat_id=identifier))
+                    break
+                except Exception as e:
+                    print(f"[WARNING] getChat {identifier} failed for channel {channel.name}: {e}")
+
+            if chat is None:
+                print(f"[ERROR] Could not resolve channel {channel.name}")
+                continue
+
+            update_fields = {"resolved_chat_id": chat.id, "resolved_at": timezone.now()}
+            try:
+                # Bot adminligi ham shu yerda yangilanadi (my_chat_member kelmagan eski kanallar uchun)
+                member = loop.run_until_complete(
+                    bot.get_chat_member(chat_id=chat.id, user_id=bot.id)
+                )
+                update_fields["bot_is_admin"] = member.status in ADMIN_STATUSES
+            except Exception as e:
+                print(f"[WARNING] Bot status check failed for channel {channel.name}: {e}")
+
+            # update() - post_save signalini qayta ishga tushirmaslik uchun
+            MandatoryChannel.objects.filter(pk=channel.pk).update(**update_fields)
+            print(f"[SUCCESS] Channel {channel.name} resolved to {chat.id}")
+
+        reference_cache.invalidate("channels")
+    finally:
+        # Sessiya shu loop'ga bog'langan - keyingi task yangi loop'da yangisini ochadi
+        loop.run_until_complete(bot.session.close())
+        loop.run_until_complete(close_redis())
+        loop.close()
+
+
+@shared_task(bind=True)
+def run_broadcast(self, broadcast_id):
+    """Reklamani chunk'lab yuborish (BroadcastRunner)"""
+    from django.conf import settings
+    from bot.services.broadcast import BroadcastRunner
+
+    bot = get_bot()
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        runner = BroadcastRunner(
+            broadcast_id,
+            bot,
+            chunk_size=settings.BROADCAST_CHUNK_SIZE,
+            concurrency=settings.BROADCAST_CONCURRENCY,
+        )
+        loop.run_until_complete(runner.run())
+    except Exception as e:
+        print(f"[ERROR] Error in run_broadcast #{broadcast_id}: {e}")
+    finally:
+        loop.run_until_complete(bot.session.close())
+        loop.run_until_complete(close_redis())
+        loop.close()
+
+
+@shared_task(bind=True)
+def resume_stale_broadcasts(self):
+    """Worker o'chib qolgan yoki navbatga qo'yilmay qolgan reklamalarni davom ettirish"""
+    from bot.services.broadcast import stale_broadcasts
+
+    for broadcast_id in stale_broadcasts().values_list("pk", flat=True):
+        run_broadcast.delay(broadcast_id)
+        print(f"[INFO] Broadcast #{broadcast_id} resumed")
+
+
+@shared_task(bind=True)
+def dispatch_notifications(self):
+    """Outbox'dagi yetkazilmagan bildirishnomalarni Telegramga yuborish"""
+    from bot.services.notification import TelegramNotification
+    from bot.services.outbox import dispatch_pending
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(dispatch_pending())
+    except Exception as e:
+        print(f"[ERROR] Error in dispatch_notifications: {e}")
+    finally:
+        loop.run_until_complete(TelegramNotification.close())
+        loop.run_until_complete(close_redis())
+        loop.close()
@@ -0,0 +1,21 @@
+from itertools import count
+
+from bot.models import TelegramUser
+
+_sequence = count(1)
+
+
+def make_user(**fields) -> TelegramUser:
+    """Testlar uchun minimal TelegramUser"""
+    number = next(_sequence)
+    defaults = {
+        "telegram_id": str(1000000 + number),
+        "full_name": f"User {number}",
+        "age": "18-24",
+        "phone_number": f"+99890{number:07d}",
+        "region": "tashkent",
+        "profession": "student",
+        "gender": "M",
+    }
+    defaults.update(fields)
+    return TelegramUser.objects.create(**defaults)
@@ -0,0 +1,62 @@
+from django.test import TestCase
+
+from bot.models import Broadcast, BroadcastDelivery
+from bot.services.broadcast import fail_interrupted_deliveries, take_delivery_chunk
+from bot.tests.factories import make_user
+
+
+class DeliveryCursorTests(TestCase):
+    def setUp(self):
+        self.users = [make_user() for _ in range(5)]
+        # Segmentga kirmaydiganlar cursor'ni buzmasligi kerak
+        make_user(is_blocked=True)
+        make_user(is_active=False)
+        self.broadcast = Broadcast.objects.create(
+            from_chat_id=1, message_id=1, filters={"is_active": True}
+        )
+
+    async def test_chunks_follow_keyset_cursor(self):
+        first = await take_delivery_chunk(self.broadcast, 2)
+        second = await take_delivery_chunk(self.broadcast, 2)
+        third = await take_delivery_chunk(self.broadcast, 2)
+        rest = await take_delivery_chunk(self.broadcast, 2)
+
+        chat_ids = [chat_id for _, chat_id in first + second + third]
+        self.assertEqual(chat_ids, [user.telegram_id for user in self.users])
+        self.assertEqual(rest, [])
+
+        broadcast = await Broadcast.objects.aget(pk=self.broadcast.pk)
+        self.assertEqual(broadcast.last_user_id, self.users[-1].pk)
+        self.assertEqual(
+            await BroadcastDelivery.objects.filter(broadcast=broadcast, status="SENDING").acount(), 5
+        )
+
+    async def test_resume_reads_cursor_from_database(self):
+        await take_delivery_chunk(self.broadcast, 2)
+
+        # Yangi worker eski obyektni emas, bazadagi cursor'ni ishlatadi
+        resumed = await Broadcast.objects.aget(pk=self.broadcast.pk)
+        resumed.last_user_id = 0
+        chunk = await take_delivery_chunk(resumed, 10)
+
+        self.assertEqual(
+            [chat_id for _, chat_id in chunk], [user.telegram_id for user in self.users[2:]]
+        )
+
+    async def test_interrupted_deliveries_fail_instead_of_resend(self):
+        chunk = await take_delivery_chunk(self.broadcast, 2)
+
+        interrupted = await fail_interrupted_deliveries(self.broadcast.pk)
+        # Ikkinchi chaqiruv hech narsani qayta hisoblamaydi
+        repeated = await fail_interrupted_deliveries(self.broadcast.pk)
+        remaining = await take_delivery_chunk(self.broadcast, 10)
+
+        self.assertEqual((interrupted, repeated), (2, 0))
+        broadcast = await Broadcast.objects.aget(pk=self.broadcast.pk)
+        self.assertEqual(broadcast.failed_count, 2)
+        for delivery_id, _ in chunk:
+            delivery = await BroadcastDelivery.objects.aget(pk=delivery_id)
+            self.assertEqual((delivery.status, delivery.error), ("FAILED", "interrupted"))
+        self.assertEqual(
+            [chat_id for _, chat_id in remaining], [user.telegram_id for user in self.users[2:]]
+        )
@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from bot.services.dedup import UpdateDeduplicator
+
+
+class FakeRedis:
+    """SET NX / DELETE - workerlar uchun umumiy kalitlar"""
+
+    def __init__(self):
+        self.keys = {}
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.keys:
+            return None
+        self.keys[key] = value
+        return True
+
+    async def delete(self, key):
+        self.keys.pop(key, None)
+
+
+class UpdateDeduplicatorTests(SimpleTestCase):
+    async def test_drops_repeated_update(self):
+        deduplicator = UpdateDeduplicator(maxsize=10)
+
+        self.assertFalse(await deduplicator.is_duplicate(1))
+        self.assertTrue(await deduplicator.is_duplicate(1))
+        self.assertEqual(deduplicator.dropped, 1)
+
+    async def test_forget_accepts_retry(self):
+        deduplicator = UpdateDeduplicator(maxsize=10)
+        await deduplicator.is_duplicate(1)
+
+        await deduplicator.forget(1)
+
+        self.assertFalse(await deduplicator.is_duplicate(1))
+
+    async def test_forget_clears_shared_redis_key(self):
+        redis = FakeRedis()
+        with mock.patch("bot.services.dedup.get_redis", return_value=redis):
+            first = UpdateDeduplicator(maxsize=10, use_redis=True)
+            second = UpdateDeduplicator(maxsize=10, use_redis=True)
+
+            self.assertFalse(await first.is_duplicate(7))
+            # Boshqa worker shu update'ni ko'rmagan, lekin Redis ko'rgan
+            self.assertTrue(await second.is_duplicate(7))
+
+            await first.forget(7)
+            self.assertFalse(await UpdateDeduplicator(maxsize=10, use_redis=True).is_duplicate(7))
+
+
+class ProcessUpdateForgetTests(SimpleTestCase):
+    async def test_failed_update_is_processed_again_on_retry(self):
+        from bot import views
+
+        calls = []
+
+        class FlakyDispatcher:
+            async def feed_update(self, bot, update):
+                calls.append(update.update_id)
+                if len(calls) == 1:
+                    raise RuntimeError("handler failed")
+
+        async def close():
+            pass
+
+        bot = SimpleNamespace(session=SimpleNamespace(close=close))
+        update = SimpleNamespace(update_id=42)
+        with mock.patch.object(views, "update_deduplicator", UpdateDeduplicator(maxsize=10)), \
+                mock.patch.object(views, "get_dispatcher", return_value=FlakyDispatcher()), \
+                mock.patch.object(views, "get_bot", return_value=bot):
+            with self.assertRaises(RuntimeError), self.assertLogs("bot.views", "ERROR"):
+                await views.process_update(update)
+            # Telegram qayta yuboradi - bu safar qayta ishlanadi
+            await views.process_update(update)
+            # Muvaffaqiyatdan keyingi takror esa tashlanadi
+            await views.process_update(update)
+
+        self.assertEqual(calls, [42, 42])
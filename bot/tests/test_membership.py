@@ -0,0 +1,71 @@
+import asyncio
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase, override_settings
+
+from bot.services.membership import MembershipCache, MembershipChecker
+
+
+def channel(pk, name):
+    return SimpleNamespace(
+        id=pk,
+        name=name,
+        is_telegram=True,
+        bot_is_admin=False,
+        resolved_chat_id=-100 - pk,
+        telegram_id="",
+        link="",
+    )
+
+
+class FakeBot:
+    """slow_chats'dagi kanallar javob bermaydi"""
+
+    def __init__(self, slow_chats=(), status="member"):
+        self.slow_chats = set(slow_chats)
+        self.status = status
+
+    async def get_chat_member(self, chat_id, user_id):
+        if chat_id in self.slow_chats:
+            await asyncio.sleep(10)
+        return SimpleNamespace(status=self.status)
+
+
+@override_settings(REDIS_URL="")
+class MembershipCheckerTimeoutTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = MembershipCache()
+        self.checker = MembershipChecker(self.cache, timeout=0.1)
+        self.fast = channel(1, "fast")
+        self.slow = channel(2, "slow")
+
+    async def test_unanswered_channels_are_reported_failed(self):
+        bot = FakeBot(slow_chats={self.slow.resolved_chat_id})
+
+        with self.assertLogs("bot.services.membership", "WARNING"):
+            result = await self.checker.check(bot, 7, [self.fast, self.slow])
+
+        self.assertTrue(result.timed_out)
+        self.assertEqual(result.subscribed, [self.fast])
+        self.assertEqual(result.failed, [self.slow])
+        self.assertFalse(result.is_subscribed)
+        self.assertEqual(result.missing, [self.slow])
+
+    async def test_timeout_results_are_not_cached(self):
+        bot = FakeBot(slow_chats={self.slow.resolved_chat_id})
+        with self.assertLogs("bot.services.membership", "WARNING"):
+            await self.checker.check(bot, 7, [self.fast, self.slow])
+
+        self.assertTrue(await self.cache.get(7, self.fast.id))
+        self.assertIsNone(await self.cache.get(7, self.slow.id))
+
+        # Kanal endi javob beradi - qayta tekshiriladi
+        result = await self.checker.check(FakeBot(), 7, [self.fast, self.slow])
+        self.assertFalse(result.timed_out)
+        self.assertEqual(result.subscribed, [self.fast, self.slow])
+
+    async def test_left_user_is_not_subscribed(self):
+        result = await self.checker.check(FakeBot(status="left"), 7, [self.fast])
+
+        self.assertEqual(result.not_subscribed, [self.fast])
+        self.assertFalse(await self.cache.get(7, self.fast.id))
@@ -0,0 +1,47 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from bot.services.notification import TelegramNotification
+
+
+async def fake_send_message(chat_id, text, session=None, **kwargs):
+    # Juft ID'larga yetadi, toq ID'lar botni bloklagan
+    if chat_id % 2 == 0:
+        return {"success": True, "message_id": chat_id, "chat_id": chat_id}
+    return {
+        "success": False,
+        "error": "Forbidden: bot was blocked by the user",
+        "error_code": 403,
+    }
+
+
+@mock.patch.object(TelegramNotification, "send_message", staticmethod(fake_send_message))
+class IterBulkMessageTests(SimpleTestCase):
+    async def test_yields_only_failures_by_default(self):
+        results = [
+            result
+            async for result in TelegramNotification.iter_bulk_message(range(10), "x", concurrency=3)
+        ]
+
+        self.assertEqual(sorted(result["user_id"] for result in results), [1, 3, 5, 7, 9])
+        self.assertTrue(all(not result["success"] for result in results))
+        self.assertTrue(all(result["error"] for result in results))
+
+    async def test_failures_only_false_yields_every_result(self):
+        results = [
+            result
+            async for result in TelegramNotification.iter_bulk_message(
+                range(10), "x", concurrency=3, failures_only=False
+            )
+        ]
+
+        self.assertEqual(sorted(result["user_id"] for result in results), list(range(10)))
+
+    @mock.patch("bot.services.notification.amark_users_blocked")
+    async def test_send_bulk_message_summary_counts_successes(self, mark_blocked):
+        result = await TelegramNotification.send_bulk_message(range(10), "x", concurrency=3)
+
+        self.assertEqual((result["total"], result["successful"], result["failed"]), (10, 5, 5))
+        mark_blocked.assert_awaited_once()
+        self.assertEqual(sorted(mark_blocked.await_args.args[0]), [1, 3, 5, 7, 9])
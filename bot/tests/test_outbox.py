@@ -0,0 +1,121 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from bot.models import Notification
+from bot.services.outbox import claim_notifications, retry_delay, save_notification_results
+from bot.tests.factories import make_user
+
+
+@override_settings(
+    NOTIFICATION_OUTBOX_BACKOFF=30,
+    NOTIFICATION_OUTBOX_MAX_BACKOFF=3600,
+    NOTIFICATION_OUTBOX_MAX_ATTEMPTS=3,
+    NOTIFICATION_OUTBOX_LEASE=120,
+)
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+
+    def notify(self, **fields):
+        return Notification.objects.create(
+            recipient=self.user,
+            notification_type="SYSTEM_MESSAGE",
+            title="t",
+            message="m",
+            **fields,
+        )
+
+    def result(self, notification, success=False, **fields):
+        notification.refresh_from_db()
+        return {
+            "pk": notification.pk,
+            "chat_id": self.user.telegram_id,
+            "attempts": notification.attempts,
+            "success": success,
+            **fields,
+        }
+
+    def test_retry_delay_is_exponential_and_capped(self):
+        self.assertEqual([retry_delay(n) for n in (1, 2, 3, 4)], [30, 60, 120, 240])
+        self.assertEqual(retry_delay(20), 3600)
+
+    def test_claim_leases_rows(self):
+        due = self.notify()
+        self.notify(next_attempt_at=timezone.now() + timedelta(minutes=5))
+        self.notify(delivered_at=timezone.now())
+
+        claimed = claim_notifications(10)
+        again = claim_notifications(10)
+
+        self.assertEqual([row["pk"] for row in claimed], [due.pk])
+        self.assertEqual(claimed[0]["attempts"], 1)
+        # Lease tugamaguncha boshqa dispatcher bu qatorni olmaydi
+        self.assertEqual(again, [])
+        due.refresh_from_db()
+        self.assertGreater(due.next_attempt_at, timezone.now() + timedelta(seconds=100))
+
+    def test_failed_send_is_retried_with_backoff(self):
+        notification = self.notify()
+        claim_notifications(10)
+
+        before = timezone.now()
+        save_notification_results([self.result(notification, error="Bad Gateway", error_code=502)])
+
+        notification.refresh_from_db()
+        self.assertIsNone(notification.failed_at)
+        self.assertEqual(notification.last_error, "Bad Gateway")
+        self.assertAlmostEqual(
+            (notification.next_attempt_at - before).total_seconds(), 30, delta=2
+        )
+
+    def test_retry_after_overrides_shorter_backoff(self):
+        notification = self.notify()
+        claim_notifications(10)
+
+        before = timezone.now()
+        save_notification_results([
+            self.result(notification, error="Too Many Requests", error_code=429, retry_after=300)
+        ])
+
+        notification.refresh_from_db()
+        self.assertAlmostEqual(
+            (notification.next_attempt_at - before).total_seconds(), 300, delta=2
+        )
+
+    def test_fails_after_max_attempts(self):
+        notification = self.notify(attempts=2)
+        claim_notifications(10)
+
+        save_notification_results([self.result(notification, error="Bad Gateway", error_code=502)])
+
+        notification.refresh_from_db()
+        self.assertEqual(notification.attempts, 3)
+        self.assertIsNotNone(notification.failed_at)
+        self.assertEqual(claim_notifications(10), [])
+
+    def test_undeliverable_fails_at_once_and_blocks_user(self):
+        notification = self.notify()
+        claim_notifications(10)
+
+        save_notification_results([
+            self.result(
+                notification, error="Forbidden: bot was blocked by the user", error_code=403
+            )
+        ])
+
+        notification.refresh_from_db()
+        self.user.refresh_from_db()
+        self.assertIsNotNone(notification.failed_at)
+        self.assertTrue(self.user.is_blocked)
+
+    def test_success_marks_delivered(self):
+        notification = self.notify(last_error="old")
+        claim_notifications(10)
+
+        save_notification_results([self.result(notification, success=True)])
+
+        notification.refresh_from_db()
+        self.assertIsNotNone(notification.delivered_at)
+        self.assertEqual(notification.last_error, "")
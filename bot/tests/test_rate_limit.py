@@ -0,0 +1,41 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from bot.services.rate_limit import TokenBucketLimiter
+
+
+class BrokenRedis:
+    def register_script(self, script):
+        raise ConnectionError("redis is down")
+
+
+class TokenBucketFallbackTests(SimpleTestCase):
+    @override_settings(REDIS_URL="")
+    async def test_local_bucket_without_redis(self):
+        limiter = TokenBucketLimiter()
+
+        results = [await limiter.allow("user:1", rate=0.01, capacity=2) for _ in range(3)]
+
+        self.assertEqual(results, [True, True, False])
+        # Kalitlar alohida hisoblanadi
+        self.assertTrue(await limiter.allow("user:2", rate=0.01, capacity=2))
+
+    async def test_falls_back_to_local_bucket_when_redis_fails(self):
+        limiter = TokenBucketLimiter()
+
+        with mock.patch("bot.services.rate_limit.get_redis", return_value=BrokenRedis()), \
+                self.assertLogs("bot.services.rate_limit", "WARNING"):
+            results = [await limiter.allow("user:1", rate=0.01, capacity=1) for _ in range(2)]
+
+        # Redis ishlamasa ham limit o'chmaydi
+        self.assertEqual(results, [True, False])
+
+    @override_settings(REDIS_URL="")
+    async def test_local_lru_is_bounded(self):
+        limiter = TokenBucketLimiter(maxsize=2)
+
+        for key in ("a", "b", "c"):
+            await limiter.allow(key, rate=1, capacity=1)
+
+        self.assertEqual(list(limiter._local), ["b", "c"])
@@ -0,0 +1,61 @@
+from django.test import SimpleTestCase, TestCase
+
+from bot.models import Kurslar, Payments
+from bot.services.segments import get_recipients, parse_recipient_filters
+from bot.tests.factories import make_user
+
+
+class ParseRecipientFiltersTests(SimpleTestCase):
+    def test_no_arguments_targets_all_active_users(self):
+        self.assertEqual(parse_recipient_filters(None), {"is_active": True})
+
+    def test_parses_every_argument(self):
+        filters = parse_recipient_filters(
+            "region=Tashkent level=2 gender=f confirmed=ha purchased=no "
+            "from=2024-01-01 to=2024-12-31"
+        )
+
+        self.assertEqual(filters, {
+            "is_active": True,
+            "region": "tashkent",
+            "level": "level_2",
+            "gender": "F",
+            "is_confirmed": True,
+            "has_purchased_course": False,
+            "registered_from": "2024-01-01",
+            "registered_to": "2024-12-31",
+        })
+
+    def test_rejects_bad_arguments(self):
+        for args in (
+            "city=tashkent",
+            "region=",
+            "region=moscow",
+            "level=9",
+            "gender=X",
+            "confirmed=maybe",
+            "from=01.01.2024",
+        ):
+            with self.subTest(args=args), self.assertRaises(ValueError):
+                parse_recipient_filters(args)
+
+
+class GetRecipientsTests(TestCase):
+    def test_filters_segment_and_skips_blocked(self):
+        buyer = make_user(level="level_2")
+        make_user(level="level_2")
+        make_user(level="level_2", is_blocked=True)
+        make_user(level="level_3")
+        course = Kurslar.objects.create(
+            name="c", price=1, description="", level="level_2", referral_payment_amount=1
+        )
+        Payments.objects.bulk_create([
+            Payments(user=buyer, course=course, amount=1, status="CONFIRMED")
+        ])
+
+        filters = parse_recipient_filters("level=2")
+        self.assertEqual(get_recipients(filters).count(), 2)
+        filters = parse_recipient_filters("level=2 purchased=yes")
+        self.assertEqual(list(get_recipients(filters)), [buyer])
+        filters = parse_recipient_filters("level=2 purchased=no")
+        self.assertEqual(get_recipients(filters).count(), 1)
@@ -0,0 +1,48 @@
+from django.test import SimpleTestCase, override_settings
+
+from bot.services.send_scheduler import BULK, INTERACTIVE, SendScheduler
+
+
+@override_settings(REDIS_URL="")
+class SendSchedulerLocalTests(SimpleTestCase):
+    def setUp(self):
+        self.scheduler = SendScheduler(
+            global_rate=10, chat_rate=1, chat_burst=100, group_per_minute=20, bulk_reserve=3
+        )
+
+    async def take_until_wait(self, lane, limit=50):
+        taken = 0
+        for chat_id in range(1, limit + 1):
+            if await self.scheduler._try_take(chat_id, lane) > 0:
+                break
+            taken += 1
+        return taken
+
+    async def test_bulk_leaves_reserve_for_interactive(self):
+        # 10 tokendan 3 tasi interaktiv javoblar uchun qoladi
+        self.assertEqual(await self.take_until_wait(BULK), 7)
+        self.assertGreater(await self.scheduler._try_take(999, BULK), 0)
+
+        self.assertEqual(await self.take_until_wait(INTERACTIVE), 3)
+
+    async def test_chat_bucket_limits_one_chat(self):
+        scheduler = SendScheduler(global_rate=30, chat_rate=1, chat_burst=2)
+
+        self.assertEqual(await scheduler._try_take(5, INTERACTIVE), 0)
+        self.assertEqual(await scheduler._try_take(5, INTERACTIVE), 0)
+        self.assertAlmostEqual(await scheduler._try_take(5, INTERACTIVE), 1, delta=0.05)
+        # Boshqa chat kutmaydi
+        self.assertEqual(await scheduler._try_take(6, INTERACTIVE), 0)
+
+    async def test_block_pauses_chat_and_lane(self):
+        await self.scheduler.block(5, 30, lane=BULK)
+
+        self.assertAlmostEqual(await self.scheduler._try_take(5, INTERACTIVE), 30, delta=0.5)
+        self.assertAlmostEqual(await self.scheduler._try_take(6, BULK), 30, delta=0.5)
+        self.assertEqual(await self.scheduler._try_take(6, INTERACTIVE), 0)
+
+    async def test_group_chats_use_per_minute_rate(self):
+        scheduler = SendScheduler(global_rate=30, chat_burst=1, group_per_minute=20)
+
+        self.assertEqual(await scheduler._try_take(-100123, INTERACTIVE), 0)
+        self.assertAlmostEqual(await scheduler._try_take(-100123, INTERACTIVE), 3, delta=0.05)
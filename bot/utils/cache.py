@@ -0,0 +1,114 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import redis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from bot.utils.redis import get_sync_redis
+
+logger = logging.getLogger(__name__)
+
+
+class VersionedCache:
+    """
+    Process-local cache for small, rarely changing datasets (channels, admins).
+
+    Every dataset has a version number. ``invalidate`` bumps it locally and
+    publishes the name on a Redis channel; a daemon thread in every process
+    listens on that channel and bumps its own copy. A value loaded while an
+    invalidation was in flight keeps the old version and is reloaded on the
+    next read. ``ttl`` is only a safety net for lost pub/sub messages and
+    queryset ``update()`` calls that bypass signals.
+    """
+
+    def __init__(self, channel: str, ttl: float = 300):
+        self.channel = channel
+        self.ttl = ttl
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._versions: Dict[str, int] = {}
+        # name -> (version, expires_at, value)
+        self._values: Dict[str, Tuple[int, float, Any]] = {}
+        self._lock = threading.Lock()
+        self._listener_pid: Optional[int] = None
+
+    def register(self, name: str, loader: Callable[[], Any]):
+        """Sinxron loader (ORM so'rovi) bilan ma'lumotlar to'plamini ro'yxatdan o'tkazish"""
+        self._loaders[name] = loader
+        self._versions.setdefault(name, 0)
+
+    async def get(self, name: str) -> Any:
+        self._ensure_listener()
+
+        version = self._versions[name]
+        entry = self._values.get(name)
+        if entry is not None and entry[0] == version and entry[1] > time.monotonic():
+            return entry[2]
+
+        value = await sync_to_async(self._loaders[name])()
+        self._values[name] = (version, time.monotonic() + self.ttl, value)
+        return value
+
+    def invalidate(self, name: str):
+        """Joriy jarayonda va (Redis orqali) barcha workerlarda keshni eskirgan deb belgilash"""
+        self._bump(name)
+
+        client = get_sync_redis()
+        if client is None:
+            return
+        try:
+            client.publish(self.channel, name)
+        except Exception as e:
+            logger.warning(f"Cache invalidation publish failed for {name}: {e}")
+
+    def _bump(self, name: str):
+        with self._lock:
+            self._versions[name] = self._versions.get(name, 0) + 1
+
+    def _ensure_listener(self):
+        # fork'dan keyin (Celery prefork) thread bola jarayonga o'tmaydi
+        pid = os.getpid()
+        if self._listener_pid == pid or not settings.REDIS_URL:
+            return
+
+        with self._lock:
+            if self._listener_pid == pid:
+                return
+            self._listener_pid = pid
+            threading.Thread(
+                target=self._listen, name="cache-invalidation", daemon=True
+            ).start()
+
+    def _listen(self):
+        backoff = 1
+        while True:
+            try:
+                # listen() bloklanadi, shuning uchun socket_timeout qo'yilmaydi
+                client = redis.Redis.from_url(
+                    settings.REDIS_URL,
+                    socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                )
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                # Ulanish uzilgan paytda xabarlar yo'qolgan bo'lishi mumkin
+                for name in list(self._versions):
+                    self._bump(name)
+                backoff = 1
+
+                for message in pubsub.listen():
+                    name = message["data"].decode()
+                    if name in self._versions:
+                        self._bump(name)
+            except Exception as e:
+                logger.warning(f"Cache invalidation listener error: {e}, retrying in {backoff}s")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 60)
+
+
+reference_cache = VersionedCache(
+    channel=settings.REFERENCE_CACHE_CHANNEL,
+    ttl=settings.REFERENCE_CACHE_TTL,
+)
@@ -0,0 +1,20 @@
+import asyncio
+import weakref
+
+# Uzoq yashaydigan loop'lar: ASGI lifespan, runbot polling, shard worker va
+# o'z loop'ini boshqaradigan Celery vazifalari. Ulardan tashqaridagi loop'lar
+# (WSGI so'rovi, signal/admin'dagi async_to_sync) chaqiruvdan keyin yopiladi.
+_long_lived_loops: "weakref.WeakSet[asyncio.AbstractEventLoop]" = weakref.WeakSet()
+
+
+def register_long_lived_loop():
+    """Joriy loop'ni uzoq yashaydigan deb belgilash (pool'langan sessiyalar yopilmaydi)"""
+    _long_lived_loops.add(asyncio.get_running_loop())
+
+
+def is_long_lived_loop() -> bool:
+    """Joriy loop ro'yxatdan o'tganmi (loop yo'q bo'lsa False)"""
+    try:
+        return asyncio.get_running_loop() in _long_lived_loops
+    except RuntimeError:
+        return False
@@ -0,0 +1,66 @@
+import asyncio
+import logging
+import weakref
+from typing import Optional
+
+import redis
+import redis.asyncio as aioredis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# asyncio klienti event loop'ga bog'langan, shuning uchun har bir loop uchun alohida
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aioredis.Redis]" = (
+    weakref.WeakKeyDictionary()
+)
+_sync_client: Optional[redis.Redis] = None
+
+
+def get_redis() -> Optional[aioredis.Redis]:
+    """Joriy event loop uchun asyncio Redis klientini olish (REDIS_URL bo'sh bo'lsa None)"""
+    if not settings.REDIS_URL:
+        return None
+
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = aioredis.Redis.from_url(
+            settings.REDIS_URL,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        )
+        _async_clients[loop] = client
+    return client
+
+
+async def close_redis():
+    """
+    Joriy loop'ning Redis klientini yopish.
+
+    WeakKeyDictionary loop bilan birga klientni unutadi, lekin connection
+    pool'ni yopmaydi - loop yopilishidan oldin (bot sessiyasi bilan bir joyda)
+    chaqiriladi.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    client = _async_clients.pop(loop, None)
+    if client is not None:
+        await client.aclose()
+
+
+def get_sync_redis() -> Optional[redis.Redis]:
+    """Sinxron kod (signal, Celery) uchun Redis klientini olish"""
+    global _sync_client
+
+    if not settings.REDIS_URL:
+        return None
+
+    if _sync_client is None:
+        _sync_client = redis.Redis.from_url(
+            settings.REDIS_URL,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        )
+    return _sync_client
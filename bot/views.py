@@ -1,31 +1,27 @@
-import os
 import logging
 
-from dotenv import load_dotenv
+from django.conf import settings
 from django.db import close_old_connections
 from django.http import JsonResponse, HttpResponseBadRequest
 from django.views.decorators.csrf import csrf_exempt
-from aiogram import Bot, Dispatcher
-from aiogram.types import Update
 from asgiref.sync import sync_to_async
 
-from bot.handlers import router
-from bot.middlewares.check_subscribe import ChannelMembershipMiddleware
+from bot.loader import get_bot, get_dispatcher
+from bot.services.dedup import UpdateDeduplicator
+from bot.services.notification import TelegramNotification
+from bot.services.update_queue import UpdateQueue
+from bot.utils.event_loops import is_long_lived_loop, register_long_lived_loop
+from bot.utils.redis import close_redis
 
 # Initialize logging
 logger = logging.getLogger(__name__)
 
-load_dotenv()
-TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-
-# Initialize bot and dispatcher
-bot = Bot(token=TELEGRAM_BOT_TOKEN)
-dp = Dispatcher()
-
-dp.callback_query.middleware(ChannelMembershipMiddleware(bot=bot, skip_admins=True))
-dp.message.middleware(ChannelMembershipMiddleware(bot=bot, skip_admins=True))
-
-dp.include_router(router)
+# Telegram sekin javobda update'ni qayta yuboradi - bir marta qayta ishlaymiz
+update_deduplicator = UpdateDeduplicator(
+    maxsize=settings.TELEGRAM_DEDUP_WINDOW,
+    use_redis=settings.TELEGRAM_DEDUP_USE_REDIS,
+    redis_ttl=settings.TELEGRAM_DEDUP_TTL,
+)
 
 
 @csrf_exempt
@@ -34,9 +30,18 @@ async def telegram_webhook(request):
         return HttpResponseBadRequest("Only POST method allowed")
 
     try:
+        from aiogram.types import Update
+
         # Validate the incoming update
         update = Update.model_validate_json(request.body)
 
+        if settings.TELEGRAM_WEBHOOK_MODE == "queue" and queue_mode_active():
+            # Ack-and-queue: update navbatga qo'yiladi, javob darhol qaytadi
+            if not update_queue.put_nowait(update):
+                # Navbat to'la - Telegram update'ni keyinroq qayta yuboradi
+                return JsonResponse({"ok": False, "error": "Update queue is full"}, status=503)
+            return JsonResponse({"ok": True})
+
         # Process update with proper error handling
         await process_update(update)
 
@@ -47,20 +52,79 @@ async def telegram_webhook(request):
         return HttpResponseBadRequest(f"Error processing update: {e}")
 
 
-async def process_update(update: Update):
+async def process_update(update):
     """Process update with proper resource management"""
+    bot = get_bot()
     try:
+        if await update_deduplicator.is_duplicate(update.update_id):
+            return
+
         # Clean Django DB connections before processing
         await sync_to_async(close_old_connections)()
 
         # Process the update through the dispatcher
-        await dp.feed_update(bot, update=update)
+        await get_dispatcher().feed_update(bot, update=update)
 
     except Exception as e:
         logger.error(f"Failed to process update {update.update_id}: {e}", exc_info=True)
+        # Telegram qayta yuborganda update yana qayta ishlanishi uchun
+        await update_deduplicator.forget(update.update_id)
         raise
     finally:
         # Clean up Django DB connections after processing
         await sync_to_async(close_old_connections)()
-        # Ensure bot session is properly closed if needed
-        await bot.session.close()
+        if not is_long_lived_loop():
+            # WSGI (runserver) har bir so'rov loop'ini yopadi - sessiya va Redis ham yopilishi kerak
+            await bot.session.close()
+            await close_redis()
+
+
+# Queue rejimi uchun update navbati (TELEGRAM_WEBHOOK_MODE="queue")
+update_queue = UpdateQueue(
+    handler=process_update,
+    maxsize=settings.TELEGRAM_UPDATE_QUEUE_SIZE,
+    workers=settings.TELEGRAM_UPDATE_WORKERS,
+)
+_inline_fallback_logged = False
+
+
+def queue_mode_active() -> bool:
+    """
+    Navbat faqat ASGI lifespan startup ishga tushirgan loop'da ishlatiladi.
+
+    WSGI (runserver) so'rov loop'i javobdan keyin yopiladi va unda ishga
+    tushgan worker'lar bilan birga "qabul qilindi" deyilgan update'lar ham
+    yo'qolardi - bunday holda update javobdan oldin qayta ishlanadi.
+    """
+    global _inline_fallback_logged
+
+    if is_long_lived_loop() and update_queue.is_running():
+        return True
+    if not _inline_fallback_logged:
+        logger.warning(
+            "TELEGRAM_WEBHOOK_MODE=queue needs an ASGI server with lifespan "
+            "(uvicorn core.asgi:application); processing updates inline"
+        )
+        _inline_fallback_logged = True
+    return False
+
+
+async def on_startup():
+    """ASGI lifespan startup: bot resurslarini tayyorlash"""
+    # Bu loop server ishlab turgan vaqt davomida yashaydi - sessiyalar pool'lanadi
+    register_long_lived_loop()
+    # Birinchi update handlerlar importini kutib qolmasligi uchun oldindan quramiz
+    get_dispatcher()
+    if settings.TELEGRAM_WEBHOOK_MODE == "queue":
+        update_queue.start()
+    logger.info("Bot startup complete")
+
+
+async def on_shutdown():
+    """ASGI lifespan shutdown: navbatni bo'shatish va bot sessiyasini yopish"""
+    if settings.TELEGRAM_WEBHOOK_MODE == "queue":
+        await update_queue.stop(drain=True)
+    await get_bot().session.close()
+    await TelegramNotification.close()
+    await close_redis()
+    logger.info("Bot session closed")
@@ -7,10 +7,47 @@ For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
 
+import logging
 import os
 
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+logger = logging.getLogger(__name__)
+
+
+async def lifespan(receive, send):
+    """Bot sessiyasini ASGI lifespan bilan boshqarish (startup/shutdown)"""
+    from bot.views import on_startup, on_shutdown
+
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            try:
+                await on_startup()
+            except Exception as e:
+                logger.exception("ASGI lifespan startup failed")
+                await send({"type": "lifespan.startup.failed", "message": str(e)})
+                return
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            try:
+                await on_shutdown()
+            except Exception as e:
+                # Server protokol xatosi o'rniga aniq failed xabarini oladi
+                logger.exception("ASGI lifespan shutdown failed")
+                await send({"type": "lifespan.shutdown.failed", "message": str(e)})
+                return
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    # Django ASGI handler faqat HTTP so'rovlarni qabul qiladi
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    await django_application(scope, receive, send)
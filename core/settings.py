@@ -18,6 +18,30 @@ TELEGRAM_BOT_USERNAME = os.getenv("TELEGRAM_BOT_USERNAME")
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 DEBUG = os.getenv("DJANGO_DEBUG", "True") == "True"
 
+# Webhook rejimi: "sync" - update javobdan oldin qayta ishlanadi,
+# "queue" - update navbatga qo'yiladi va javob darhol qaytadi (ASGI server lifespan
+# bilan kerak; lifespan navbatni ishga tushirmagan bo'lsa update'lar "sync" kabi ishlanadi)
+TELEGRAM_WEBHOOK_MODE = os.getenv("TELEGRAM_WEBHOOK_MODE", "sync")
+# manage.py setwebhook shu URL'ni allowed_updates (chat_member bilan) bilan ro'yxatdan o'tkazadi
+TELEGRAM_WEBHOOK_URL = os.getenv("TELEGRAM_WEBHOOK_URL")
+TELEGRAM_UPDATE_QUEUE_SIZE = int(os.getenv("TELEGRAM_UPDATE_QUEUE_SIZE", "1000"))
+TELEGRAM_UPDATE_WORKERS = int(os.getenv("TELEGRAM_UPDATE_WORKERS", "8"))
+# runbot: update'larni chat id bo'yicha bir nechta process'ga taqsimlash
+TELEGRAM_DISPATCH_PROCESSES = int(os.getenv("TELEGRAM_DISPATCH_PROCESSES", "1"))
+TELEGRAM_DISPATCH_HEARTBEAT_TIMEOUT = float(os.getenv("TELEGRAM_DISPATCH_HEARTBEAT_TIMEOUT", "30"))
+# Takroriy update'larni tashlab yuborish (update_id bo'yicha)
+TELEGRAM_DEDUP_WINDOW = int(os.getenv("TELEGRAM_DEDUP_WINDOW", "10000"))
+TELEGRAM_DEDUP_USE_REDIS = os.getenv("TELEGRAM_DEDUP_USE_REDIS", "False") == "True"
+TELEGRAM_DEDUP_TTL = int(os.getenv("TELEGRAM_DEDUP_TTL", "3600"))
+# Bot API uchun bir vaqtdagi ulanishlar soni (har bir worker process uchun)
+TELEGRAM_SESSION_POOL_SIZE = int(os.getenv("TELEGRAM_SESSION_POOL_SIZE", "100"))
+# TelegramNotification HTTP klienti: ulanishlar soni, DNS kesh (s) va so'rov timeout (s)
+TELEGRAM_NOTIFY_POOL_SIZE = int(os.getenv("TELEGRAM_NOTIFY_POOL_SIZE", "100"))
+TELEGRAM_NOTIFY_DNS_TTL = int(os.getenv("TELEGRAM_NOTIFY_DNS_TTL", "300"))
+TELEGRAM_NOTIFY_TIMEOUT = float(os.getenv("TELEGRAM_NOTIFY_TIMEOUT", "10"))
+# send_bulk_message: bir vaqtda yuborilayotgan xabarlar soni
+TELEGRAM_NOTIFY_BULK_CONCURRENCY = int(os.getenv("TELEGRAM_NOTIFY_BULK_CONCURRENCY", "10"))
+
 ALLOWED_HOSTS = ["*"]  # Allow all hosts for development; change in production
 LOGGING = {
     "version": 1,
@@ -94,6 +118,64 @@ CELERY_RESULT_BACKEND = "redis://redis:6379/1"
 celery_app.conf.broker_url = "redis://redis:6379/0"
 celery_app.conf.result_backend = "redis://redis:6379/1"
 
+# Bot uchun umumiy Redis (kesh, rate limit, dedup). Bo'sh bo'lsa Redis ishlatilmaydi
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/2")
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.5"))
+
+# Kanallar/adminlar ro'yxatining jarayon ichidagi keshi (soniya). Asosan signal + Redis
+# pub/sub orqali yangilanadi, TTL faqat xabar yo'qolgan holatlar uchun
+REFERENCE_CACHE_TTL = int(os.getenv("REFERENCE_CACHE_TTL", "300"))
+REFERENCE_CACHE_CHANNEL = os.getenv("REFERENCE_CACHE_CHANNEL", "bot:cache:invalidate")
+
+# Foydalanuvchi so'rovlari limiti (token bucket): soniyasiga token va burst hajmi
+THROTTLE_RATE = float(os.getenv("THROTTLE_RATE", "2"))
+THROTTLE_BURST = float(os.getenv("THROTTLE_BURST", "5"))
+# Redis ishlamaganda lokal bucketlar soni (LRU)
+THROTTLE_LOCAL_MAXSIZE = int(os.getenv("THROTTLE_LOCAL_MAXSIZE", "50000"))
+
+# Chiquvchi xabarlar limiti (Bot API): umumiy xabar/s, bitta chatga xabar/s va burst,
+# guruhga xabar/daqiqa. BULK_RESERVE - ommaviy yuborishda interaktiv javoblar uchun
+# qoldiriladigan tokenlar soni
+TELEGRAM_SEND_GLOBAL_RATE = float(os.getenv("TELEGRAM_SEND_GLOBAL_RATE", "30"))
+TELEGRAM_SEND_CHAT_RATE = float(os.getenv("TELEGRAM_SEND_CHAT_RATE", "1"))
+TELEGRAM_SEND_CHAT_BURST = float(os.getenv("TELEGRAM_SEND_CHAT_BURST", "3"))
+TELEGRAM_SEND_GROUP_PER_MINUTE = float(os.getenv("TELEGRAM_SEND_GROUP_PER_MINUTE", "20"))
+TELEGRAM_SEND_BULK_RESERVE = float(os.getenv("TELEGRAM_SEND_BULK_RESERVE", "5"))
+# Interaktiv yuborishda retry_after bundan uzun bo'lsa qayta urinmaymiz (soniya)
+TELEGRAM_SEND_MAX_RETRY_AFTER = float(os.getenv("TELEGRAM_SEND_MAX_RETRY_AFTER", "30"))
+
+# Reklama (broadcast) worker: bir chunk'dagi foydalanuvchilar soni va heartbeat
+# shuncha soniya yangilanmasa worker o'lgan deb hisoblanib, boshqasi davom ettiradi
+BROADCAST_CHUNK_SIZE = int(os.getenv("BROADCAST_CHUNK_SIZE", "100"))
+BROADCAST_HEARTBEAT_TIMEOUT = int(os.getenv("BROADCAST_HEARTBEAT_TIMEOUT", "120"))
+# Bir vaqtda yuborilayotgan xabarlar soni va AIMD tezlik chegaralari (xabar/s)
+BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", "10"))
+BROADCAST_MAX_RATE = float(os.getenv("BROADCAST_MAX_RATE", "25"))
+BROADCAST_MIN_RATE = float(os.getenv("BROADCAST_MIN_RATE", "1"))
+# Holat xabari (progress) ko'pi bilan shuncha soniyada bir marta tahrirlanadi
+BROADCAST_PROGRESS_INTERVAL = float(os.getenv("BROADCAST_PROGRESS_INTERVAL", "5"))
+
+# Bildirishnomalar outbox'i: bir partiyadagi qatorlar, maksimal urinishlar soni,
+# qayta urinish oralig'i (s, har safar ikki barobar, MAX_BACKOFF gacha) va lease (s)
+NOTIFICATION_OUTBOX_BATCH_SIZE = int(os.getenv("NOTIFICATION_OUTBOX_BATCH_SIZE", "50"))
+NOTIFICATION_OUTBOX_MAX_ATTEMPTS = int(os.getenv("NOTIFICATION_OUTBOX_MAX_ATTEMPTS", "8"))
+NOTIFICATION_OUTBOX_BACKOFF = float(os.getenv("NOTIFICATION_OUTBOX_BACKOFF", "30"))
+NOTIFICATION_OUTBOX_MAX_BACKOFF = float(os.getenv("NOTIFICATION_OUTBOX_MAX_BACKOFF", "3600"))
+NOTIFICATION_OUTBOX_LEASE = float(os.getenv("NOTIFICATION_OUTBOX_LEASE", "120"))
+# Admin xabarlarini jamlash: bir turdagi xabarlar har bir admin uchun shuncha soniya
+# yig'ilib bitta digest bo'lib ketadi, MAX_ITEMS ga yetsa oynani kutmasdan yuboriladi
+NOTIFICATION_COALESCE_WINDOW = float(os.getenv("NOTIFICATION_COALESCE_WINDOW", "120"))
+NOTIFICATION_COALESCE_MAX_ITEMS = int(os.getenv("NOTIFICATION_COALESCE_MAX_ITEMS", "20"))
+
+# Majburiy kanal a'zoligi keshi (soniya): a'zo bo'lsa uzoqroq, a'zo bo'lmasa qisqa
+MEMBERSHIP_CACHE_POSITIVE_TTL = int(os.getenv("MEMBERSHIP_CACHE_POSITIVE_TTL", "300"))
+MEMBERSHIP_CACHE_NEGATIVE_TTL = int(os.getenv("MEMBERSHIP_CACHE_NEGATIVE_TTL", "30"))
+# Bir kanalga bir vaqtda nechta getChatMember so'rovi va umumiy tekshiruv vaqti (soniya)
+MEMBERSHIP_CHECK_PER_CHANNEL = int(os.getenv("MEMBERSHIP_CHECK_PER_CHANNEL", "10"))
+MEMBERSHIP_CHECK_TIMEOUT = float(os.getenv("MEMBERSHIP_CHECK_TIMEOUT", "5"))
+# chat_member indeksidagi yozuv shuncha soniyadan eski bo'lsa ishonilmaydi (getChatMember)
+MEMBERSHIP_INDEX_TTL = int(os.getenv("MEMBERSHIP_INDEX_TTL", "21600"))
+
 CELERY_BEAT_SCHEDULE = {
     "update_loosers_referalls_to_admin": {
         "task": "bot.tasks.update_loosers_referalls_to_admin",
@@ -107,6 +189,18 @@ CELERY_BEAT_SCHEDULE = {
         "task": "bot.tasks.deactivate_inactive_users",
         "schedule": crontab(hour=2, minute=0),  # Har kuni soat 2:00 da
     },
+    "resolve_mandatory_channels": {
+        "task": "bot.tasks.resolve_mandatory_channels",
+        "schedule": crontab(minute=15, hour="*/6"),  # Har 6 soatda
+    },
+    "resume_stale_broadcasts": {
+        "task": "bot.tasks.resume_stale_broadcasts",
+        "schedule": crontab(),  # Har daqiqa
+    },
+    "dispatch_notifications": {
+        "task": "bot.tasks.dispatch_notifications",
+        "schedule": crontab(),  # Har daqiqa (qayta urinishlar va o'tkazib yuborilganlar)
+    },
 }
 
 # Application definition
@@ -153,6 +247,8 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "core.wsgi.application"
+# Production: uvicorn core.asgi:application (lifespan bot sessiyasi va navbatni boshqaradi)
+ASGI_APPLICATION = "core.asgi.application"
 
 
 # Database